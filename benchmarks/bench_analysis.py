@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Post-game analysis: its cost, and what queuing it adds to live play.
+
+Run from the project root:
+    python benchmarks/bench_analysis.py [--games 60] [--workers 1]
+
+Plays scripted games in-process through the JSON API, first with analysis
+off and then with it queued to background workers (see web/jobs.py), and
+compares command latency, for all commands and for the ones that end a
+game, where analysis is queued. Also times analyze_game itself, which is
+what every game-ending command would pay if it ran inline, and how long
+results take to be ready after the game ends.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.clue_game.analytics.postgame import analyze_game  # noqa: E402
+from web.web_app import create_app, games  # noqa: E402
+
+SUSPECTS = ('plum', 'green', 'peacock', 'scarlet', 'mustard', 'white')
+WEAPONS = ('rope', 'knife', 'wrench', 'revolver', 'candlestick', 'lead pipe')
+MAX_COMMANDS = 2000  # Games end when an AI accuses; the scripted human never does
+
+
+def next_command(state, rng):
+    """A plausible next command for the human seat, from the game's JSON state."""
+    if state['pending_disproval']:
+        return 'disprove ' + state['pending_disproval']['cards'][0].lower()
+    if not state['player_turn']:
+        return 'space'
+    if rng.random() < 0.4:
+        return 'move to ' + rng.choice(state['valid_moves']).lower()
+    return f"suggest {rng.choice(SUSPECTS)} with {rng.choice(WEAPONS)} in {state['location'].lower()}"
+
+
+def play(analysis, games_to_play, workers, seed):
+    """(command latencies, game-ending command latencies, finished game ids, test client)."""
+    app = create_app({'CLUE_ADMISSION': False, 'CLUE_GAME_POOL': False,
+                      'CLUE_ANALYSIS': analysis, 'CLUE_ANALYSIS_WORKERS': workers})
+    client = app.test_client()
+    rng = random.Random(seed)
+    latencies, ending, finished = [], [], []
+    for _ in range(games_to_play):
+        state = client.post('/api/v2/games', json={'num_ai': rng.randint(2, 5)}).get_json()
+        game_id = state['game_id']
+        for _ in range(MAX_COMMANDS):
+            start = time.perf_counter()
+            state = client.post(f"/api/v2/games/{game_id}/commands?since={state['next_seq']}",
+                                json={'command': next_command(state, rng)}).get_json()['state']
+            latencies.append(time.perf_counter() - start)
+            if state['game_over']:
+                ending.append(latencies[-1])
+                finished.append(game_id)
+                break
+    return latencies, ending, finished, client
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] * 1000 if values else float('nan')
+
+
+def report(label, values):
+    print(f"  {label:<22} {len(values):>6}  p50 {percentile(values, 0.5):7.2f} ms  "
+          f"p99 {percentile(values, 0.99):7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--games", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    for analysis in (False, True):
+        latencies, ending, finished, client = play(analysis, args.games, args.workers, args.seed)
+        print(f"Analysis {'queued' if analysis else 'off'}: {len(finished)} of {args.games} games finished")
+        report("commands", latencies)
+        report("game-ending commands", ending)
+
+    inline = []
+    for game_id in finished:
+        record = games[game_id].get_analysis_input()
+        start = time.perf_counter()
+        analyze_game(record)
+        inline.append(time.perf_counter() - start)
+    report("analyze_game inline", inline)
+
+    start = time.perf_counter()
+    for game_id in finished:
+        response = client.get(f'/api/analysis/{game_id}?wait=30')
+        if response.status_code != 200:
+            print(f"FAIL: analysis of {game_id}: {response.status_code} {response.get_json()}")
+            return 1
+    print(f"All {len(finished)} analyses ready {time.perf_counter() - start:.2f}s after play ended")
+    print(f"Queue: {client.get('/api/metrics').get_json()['analysis']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Command parsing and typeahead cost by kind of input.
+
+Run from the project root:
+    python benchmarks/bench_commands.py
+
+Times web.commands.parse_cards and complete on exact, multi-word,
+misspelled and junk input. Each unknown word costs one typo lookup, of
+at most longest name + MAX_EDITS letters, and a command makes at most
+MAX_TYPO_LOOKUPS of them; beyond that junk costs a scan linear in its
+length, so 10x and 100x longer junk, or one very long word, grows by the
+scan alone.
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from web.commands import complete, parse_cards  # noqa: E402
+
+PARSE_CASES = (
+    ('exact', "suggest miss scarlet with knife in hall"),
+    ('multi-word', "suggest prof. plum with the lead pipe in the billiard room"),
+    ('surnames', "accuse plum with pipe in dining"),
+    ('one typo', "accuse plum with candelstick in hall"),
+    ('typos', "accuse pofessor plum with candelstick in kitchn"),
+    ('junk x1', "suggest " + "qwerty " * 10),
+    ('junk x10', "suggest " + "qwerty " * 100),
+    ('junk x100', "suggest " + "qwerty " * 1000),
+    ('long words', "suggest " + "abcdefghijklmnopq " * 12),
+    ('one word', "suggest " + "q" * 10000),
+)
+COMPLETE_CASES = ("", "s", "move to b", "suggest mrs", "suggest plum with l", "suggest plum with lead pipe in ")
+
+
+def per_call_us(function, argument):
+    timer = timeit.Timer(lambda: function(argument))
+    number, _ = timer.autorange()
+    return min(timer.repeat(3, number)) / number * 1e6
+
+
+def main():
+    print(f"{'parse':<12} {'us':>9}  result")
+    for name, text in PARSE_CASES:
+        print(f"{name:<12} {per_call_us(parse_cards, text):>9.1f}  {parse_cards(text)}")
+    print(f"\n{'complete':<34} {'us':>7} {'results':>8}")
+    for text in COMPLETE_CASES:
+        print(f"{text!r:<34} {per_call_us(complete, text):>7.1f} {len(complete(text)):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Bytes on the wire and encode CPU per /api/command response.
+
+Run from the project root:
+    python benchmarks/bench_encoding.py [--repeat 2000]
+
+"before" is Flask's jsonify with no compression; "after" is
+web.encoding.encode_response for a client sending Accept-Encoding: gzip.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import jsonify  # noqa: E402
+
+from web.encoding import encode_response, orjson  # noqa: E402
+from web.web_app import WebClueGame, app, run_command  # noqa: E402
+
+COMMANDS = ('space', 'move', 'map', 'players', 'notebook', 'rules')
+
+
+def per_call_us(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    game = WebClueGame("bench", num_ai=3, seed=1)
+    for _ in range(12):
+        run_command(game, 'space')
+
+    print(f"JSON encoder: {'orjson' if orjson else 'stdlib json'}")
+    print(f"{'command':<10} {'before B':>9} {'after B':>8} {'before us':>10} {'after us':>9}")
+    headers = {'Accept-Encoding': 'gzip, deflate'}
+    for command in COMMANDS:
+        payload = run_command(game, command)
+        cache_key = f"rules:{payload['player_turn']}" if command == 'rules' else None
+        with app.test_request_context(headers=headers):
+            before = jsonify(payload).get_data()
+            after = encode_response(payload, cache_key=cache_key).get_data()
+            before_us = per_call_us(lambda: jsonify(payload).get_data(), args.repeat)
+            after_us = per_call_us(lambda: encode_response(payload, cache_key=cache_key).get_data(), args.repeat)
+        print(f"{command:<10} {len(before):>9} {len(after):>8} {before_us:>10.1f} {after_us:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
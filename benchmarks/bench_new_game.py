@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+New-game latency with and without the pre-dealt game pool.
+
+Run from the project root:
+    python benchmarks/bench_new_game.py [--requests 500] [--rate 50]
+
+Sends ``--requests`` POST /api/new_game requests through the Flask test
+client at about ``--rate`` per second, a mix of the menu's player counts and
+difficulties weighted towards the default, and reports request latency
+percentiles plus the pool's own hit rate and creation latency from
+/api/metrics.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from web.web_app import create_app  # noqa: E402
+
+MIX = [(2, 'Medium')] * 6 + [(1, 'Medium'), (3, 'Medium'), (2, 'Hard'), (4, 'Easy')]
+
+
+def run(pool, requests, rate, seed=1):
+    app = create_app({'CLUE_ADMISSION': False, 'CLUE_GAME_POOL': pool})
+    client = app.test_client()
+    rng = random.Random(seed)
+    interval = 1.0 / rate
+    latencies = []
+    for _ in range(requests):
+        num_ai, difficulty = rng.choice(MIX)
+        start = time.perf_counter()
+        client.post('/api/new_game', json={'num_ai': num_ai, 'difficulty': difficulty})
+        elapsed = time.perf_counter() - start
+        latencies.append(elapsed)
+        time.sleep(max(0.0, interval - elapsed))
+    latencies.sort()
+    return latencies, client.get('/api/metrics').get_json()['game_pool']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=50.0)
+    args = parser.parse_args()
+
+    print(f"{'pool':>5} {'p50 ms':>7} {'p99 ms':>7} {'max ms':>7} {'hit rate':>9} {'create p99 ms':>14}")
+    for pool in (False, True):
+        latencies, metrics = run(pool, args.requests, args.rate)
+        p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+        hit_rate = metrics['hit_rate'] if metrics else None
+        create_p99 = metrics['creation_ms']['p99'] if metrics else None
+        print(f"{'on' if pool else 'off':>5} {statistics.median(latencies) * 1000:>7.2f} {p99 * 1000:>7.2f} "
+              f"{latencies[-1] * 1000:>7.2f} {hit_rate if hit_rate is not None else '-':>9} "
+              f"{create_p99 if create_p99 is not None else '-':>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Opening book lookups: cost, memory and effect on play.
+
+Run from the project root, after building a book:
+    python -m src.clue_game.engine.opening_book opening_book.bin
+    python benchmarks/bench_opening_book.py opening_book.bin [--games 200]
+
+Times a lookup and the Hard AI's first decision with and without the book
+(without it, the decision is a full time-budgeted search), shows how
+little heap opening the book and looking up positions costs (the table is
+a file mapping, in the page cache), and plays Hard AIs with and without
+the book against each other, taking turns at who goes first, to check the
+book's openings are no worse than searching.
+"""
+
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.clue_game.engine import opening_book as book_module  # noqa: E402
+from src.clue_game.engine.game_logic import ClueEngine  # noqa: E402
+from src.clue_game.engine.simulator import simulate_game  # noqa: E402
+from src.clue_game.engine.strategies import MonteCarloStrategy  # noqa: E402
+
+SEEDS = range(50)
+
+
+def use_book(path):
+    """Point lookups at ``path``, or at no book."""
+    os.environ['CLUE_OPENING_BOOK'] = path or ''
+
+
+def first_decision_ms():
+    """Mean time of a Hard AI's first choose_action over SEEDS."""
+    total = 0.0
+    for seed in SEEDS:
+        engine = ClueEngine(num_ai=3, difficulty="Hard", seed=seed)
+        total += timeit.timeit(lambda: engine.choose_ai_action(0), number=1)
+    return total / len(SEEDS) * 1000
+
+
+def resident_kib(path):
+    """Resident KiB of this process's mappings of ``path`` (None without /proc)."""
+    try:
+        with open('/proc/self/smaps') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    total = 0
+    inside = False
+    for line in lines:
+        fields = line.split()
+        if '-' in fields[0] and len(fields) >= 5:
+            inside = fields[-1] == os.path.abspath(path)
+        elif inside and fields[0] == 'Rss:':
+            total += int(fields[1])
+    return total
+
+
+class NoBookMonteCarlo(MonteCarloStrategy):
+    def _opening(self, engine, ai_index):
+        return None
+
+
+def book_win_share(games):
+    """Share of decided games won by the seat using the book."""
+    wins = decided = 0
+    for seed in range(games):
+        book_seat = seed % 2
+        strategies = [MonteCarloStrategy(), NoBookMonteCarlo()]
+        if book_seat:
+            strategies.reverse()
+        winner = simulate_game(strategies, seed=seed)['winner']
+        if winner is not None:
+            decided += 1
+            wins += winner == book_seat
+    return wins / max(1, decided)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("book", help="book built by python -m src.clue_game.engine.opening_book")
+    parser.add_argument("--games", type=int, default=200)
+    args = parser.parse_args()
+
+    engines = [ClueEngine(num_ai=num_ai, seed=seed) for num_ai in range(1, 6) for seed in range(20)]
+    tracemalloc.start()
+    use_book(args.book)
+    book = book_module.opening_book()
+    if book is None:
+        print(f"Could not open {args.book}")
+        return 1
+    for engine in engines:
+        for ai_index in range(engine.num_ai):
+            book_module.lookup_seat(engine, ai_index)
+    heap = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    engine = engines[0]
+    timer = timeit.Timer(lambda: book_module.lookup_seat(engine, 0))
+    number, _ = timer.autorange()
+    print(f"lookup: {min(timer.repeat(3, number)) / number * 1e6:.1f} us "
+          f"({len(book.shapes)} game shapes, {book.playouts} playouts per position)")
+    mapped = resident_kib(args.book)
+    print(f"heap used opening the book and looking up {len(engines)} games' seats: {heap / 1024:.0f} KiB"
+          + (f"; mapped and resident: {mapped} KiB of {os.path.getsize(args.book) // 1024} KiB"
+             if mapped is not None else ""))
+
+    with_book = first_decision_ms()
+    use_book(None)
+    without_book = first_decision_ms()
+    print(f"Hard AI first decision: {with_book:.2f} ms with the book, {without_book:.2f} ms searching "
+          f"({MonteCarloStrategy().budget_ms} ms budget)")
+
+    use_book(args.book)
+    print(f"Hard AI with the book vs searching, {args.games} games: "
+          f"{book_win_share(args.games):.1%} of decided games won with it")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Spectator streams over real HTTP: delivery to viewers that read, and play.
+
+Run from the project root:
+    python benchmarks/bench_spectate.py [--viewers 0,10,50,100] [--commands 200]
+
+Starts the app under gunicorn with gunicorn.conf.py, the deployment's
+settings (admission control off, since every viewer shares one address).
+For each audience size it opens that many /api/v2/games/<id>/spectate
+connections, read as frames arrive by one selector loop, and plays a
+seeded game over HTTP. Reports command latency, how long after a command
+was sent its frame reached the viewers, frames any viewer missed, and
+the worker's RSS and thread count. Between audiences it waits for the
+server to notice the closed viewers, which takes up to a heartbeat.
+Finally opens one stream more than CLUE_MAX_STREAMS (the largest
+audience) and expects 503. Exits 1 if a viewer missed a frame or the cap
+was not enforced.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import re
+import selectors
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = "web.web_app:create_app({'CLUE_ADMISSION': False, 'CLUE_ANALYSIS': False})"
+FRAME_ID = re.compile(rb'(?:^|\n)id: (\d+)\n')
+SUSPECTS = ('plum', 'green', 'peacock', 'scarlet', 'mustard', 'white')
+WEAPONS = ('rope', 'knife', 'wrench', 'revolver', 'candlestick', 'lead pipe')
+SETTLE_SECONDS = 2.0
+DRAIN_SECONDS = 30.0  # Closed viewers hold their slot until the next heartbeat fails
+
+
+def start_server(port, max_streams):
+    env = dict(os.environ, CLUE_MAX_STREAMS=str(max_streams))
+    server = subprocess.Popen(['gunicorn', '--config=gunicorn.conf.py', f'--bind=127.0.0.1:{port}', APP],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(200):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise SystemExit("gunicorn did not start")
+
+
+def worker_stats(server):
+    """(RSS MiB, threads) of the server's worker process."""
+    try:
+        with open(f'/proc/{server.pid}/task/{server.pid}/children') as f:
+            worker = f.read().split()[0]
+        with open(f'/proc/{worker}/status') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        return int(fields['VmRSS'].split()[0]) / 1024, int(fields['Threads'])
+    except (OSError, IndexError, KeyError):
+        return float('nan'), 0
+
+
+class Viewers:
+    """Spectator connections read by one selector thread, recording when each frame arrives."""
+
+    def __init__(self, port, game_id, count):
+        self.selector = selectors.DefaultSelector()
+        self.arrivals = [{} for _ in range(count)]  # viewer -> {frame id: arrival time}
+        self.statuses = [None] * count
+        self._buffers = [b''] * count
+        self._stop = False
+        request = f'GET /api/v2/games/{game_id}/spectate HTTP/1.1\r\nHost: bench\r\n\r\n'.encode()
+        for viewer in range(count):
+            sock = socket.create_connection(('127.0.0.1', port))
+            sock.sendall(request)
+            sock.setblocking(False)
+            self.selector.register(sock, selectors.EVENT_READ, viewer)
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def _read(self):
+        while not self._stop:
+            for key, _ in self.selector.select(timeout=0.1):
+                viewer = key.data
+                try:
+                    data = key.fileobj.recv(65536)
+                except BlockingIOError:
+                    continue
+                now = time.perf_counter()
+                if not data:
+                    self.selector.unregister(key.fileobj)
+                    continue
+                buffer = self._buffers[viewer] + data
+                if self.statuses[viewer] is None and b'\r\n' in buffer:
+                    self.statuses[viewer] = int(buffer.split(b' ', 2)[1])
+                end = 0
+                for match in FRAME_ID.finditer(buffer):
+                    self.arrivals[viewer].setdefault(int(match.group(1)), now)
+                    end = match.end()
+                self._buffers[viewer] = buffer[max(end, len(buffer) - 64):]
+
+    def wait_connected(self, timeout=30.0):
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if all(self.arrivals):
+                return True
+            time.sleep(0.05)
+        return False
+
+    def close(self):
+        self._stop = True
+        self._thread.join()
+        for key in list(self.selector.get_map().values()):
+            key.fileobj.close()
+        self.selector.close()
+
+
+def call(connection, method, path, payload=None):
+    body = json.dumps(payload) if payload is not None else None
+    connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def next_command(state, number):
+    if state['pending_disproval']:
+        return 'disprove ' + state['pending_disproval']['cards'][0].lower()
+    if not state['player_turn']:
+        return 'space'
+    if number % 3:
+        return 'move to ' + state['valid_moves'][number % len(state['valid_moves'])].lower()
+    return f"suggest {SUSPECTS[number % 6]} with {WEAPONS[number % 5]} in {state['location'].lower()}"
+
+
+def drain(port):
+    """Wait until the server has noticed every closed viewer and freed its stream."""
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    deadline = time.perf_counter() + DRAIN_SECONDS
+    while call(connection, 'GET', '/api/metrics')[1]['spectator_streams'] and time.perf_counter() < deadline:
+        time.sleep(0.5)
+    connection.close()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] * 1000 if values else float('nan')
+
+
+def run(port, server, viewers, commands):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    _, state = call(connection, 'POST', '/api/v2/games', {'num_ai': 3, 'seed': 1})
+    game_id = state['game_id']
+    audience = Viewers(port, game_id, viewers)
+    if not audience.wait_connected():
+        audience.close()
+        raise SystemExit(f"only {sum(1 for a in audience.arrivals if a)} of {viewers} viewers connected")
+    latencies, sent = [], {}  # frame id -> when the command that produced it was sent
+    for number in range(commands):
+        if state['game_over']:
+            break
+        seq = state['next_seq']
+        start = time.perf_counter()
+        _, result = call(connection, 'POST', f'/api/v2/games/{game_id}/commands?since={seq}',
+                         {'command': next_command(state, number)})
+        latencies.append(time.perf_counter() - start)
+        state = result['state']
+        if state['next_seq'] != seq:
+            sent[state['next_seq']] = start
+    time.sleep(SETTLE_SECONDS)
+    rss, threads = worker_stats(server)
+    audience.close()
+    connection.close()
+    delivery = [arrived[frame] - sent[frame] for arrived in audience.arrivals for frame in sent if frame in arrived]
+    missed = sum(1 for arrived in audience.arrivals for frame in sent if frame not in arrived)
+    return latencies, delivery, missed, len(sent), rss, threads
+
+
+def cap_enforced(port, max_streams):
+    """Whether stream max_streams + 1 is refused with 503 while max_streams are open."""
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    _, state = call(connection, 'POST', '/api/v2/games', {'num_ai': 3, 'seed': 2})
+    audience = Viewers(port, state['game_id'], max_streams)
+    connected = audience.wait_connected()
+    connection.request('GET', f"/api/v2/games/{state['game_id']}/spectate")
+    status = connection.getresponse().status
+    audience.close()
+    connection.close()
+    return connected and status == 503
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--viewers", default="0,10,50,100", help="audience sizes, comma-separated")
+    parser.add_argument("--commands", type=int, default=200)
+    parser.add_argument("--port", type=int, default=5310)
+    args = parser.parse_args()
+    audiences = [int(viewers) for viewers in args.viewers.split(',')]
+    max_streams = max(audiences + [1])
+
+    server = start_server(args.port, max_streams)
+    failed = False
+    try:
+        print(f"gunicorn.conf.py with CLUE_MAX_STREAMS={max_streams}")
+        print(f"{'viewers':>8} {'frames':>7} {'cmd p50':>8} {'cmd p99':>8} {'dlv p50':>8} {'dlv p99':>8} "
+              f"{'missed':>7} {'rss MiB':>8} {'threads':>8}")
+        for viewers in audiences:
+            latencies, delivery, missed, frames, rss, threads = run(args.port, server, viewers, args.commands)
+            print(f"{viewers:>8} {frames:>7} {percentile(latencies, 0.5):>8.2f} {percentile(latencies, 0.99):>8.2f} "
+                  f"{percentile(delivery, 0.5):>8.2f} {percentile(delivery, 0.99):>8.2f} {missed:>7} "
+                  f"{rss:>8.1f} {threads:>8}", flush=True)
+            failed |= missed > 0
+            drain(args.port)
+        enforced = cap_enforced(args.port, max_streams)
+        print(f"Stream {max_streams + 1} refused with 503: {'yes' if enforced else 'NO'}")
+        failed |= not enforced
+    finally:
+        server.terminate()
+        server.wait()
+    print("(milliseconds; dlv is from sending a command to its frame reaching a viewer)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
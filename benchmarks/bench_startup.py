@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: cold time-to-first-response and per-worker private memory.
+
+Run from the project root:
+    python benchmarks/bench_startup.py [--runs 5] [--workers 4]
+
+Private memory is read from /proc/<pid>/smaps_rollup, so that part is Linux
+only. "preload" imports the app before forking (gunicorn --preload);
+"no-preload" imports it in every worker after the fork.
+"""
+
+import argparse
+import gc
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLD_START = """
+import time
+t0 = time.perf_counter()
+from web.web_app import app
+client = app.test_client()
+client.get('/')
+client.post('/api/new_game', json={'num_ai': 2})
+print(time.perf_counter() - t0)
+"""
+
+
+def cold_start_times(runs):
+    times = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", COLD_START], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+    return times
+
+
+def private_kb():
+    """Private (unshared) resident memory of this process in kB."""
+    total = 0
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                total += int(line.split()[1])
+    return total
+
+
+def serve_a_little(app):
+    client = app.test_client()
+    client.get('/')
+    game_id = client.post('/api/new_game', json={'num_ai': 3}).get_json()['game_id']
+    for command in ('notebook', 'map', 'rules', 'move'):
+        client.post('/api/command', json={'game_id': game_id, 'command': command})
+
+
+def worker_private_memory(workers, preload):
+    if preload:
+        from web.web_app import app
+        gc.freeze()
+    readers = []
+    for _ in range(workers):
+        r, w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(r)
+            if not preload:
+                from web.web_app import app
+            serve_a_little(app)
+            os.write(w, str(private_kb()).encode())
+            os._exit(0)
+        os.close(w)
+        readers.append((pid, r))
+    sizes = []
+    for pid, r in readers:
+        sizes.append(int(os.read(r, 64)))
+        os.close(r)
+        os.waitpid(pid, 0)
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+
+    times = cold_start_times(args.runs)
+    print(f"time-to-first-response: median {statistics.median(times) * 1000:.1f} ms, "
+          f"min {min(times) * 1000:.1f} ms over {args.runs} runs")
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("per-worker private memory: skipped (needs /proc/self/smaps_rollup)")
+        return
+
+    # Measure no-preload first, in a child, so this process stays un-imported
+    pid = os.fork()
+    if pid == 0:
+        sizes = worker_private_memory(args.workers, preload=False)
+        print(f"no-preload private memory per worker: {statistics.mean(sizes) / 1024:.1f} MiB")
+        os._exit(0)
+    os.waitpid(pid, 0)
+    sizes = worker_private_memory(args.workers, preload=True)
+    print(f"preload    private memory per worker: {statistics.mean(sizes) / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
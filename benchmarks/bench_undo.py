@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Memory per undo point, and undo/redo/fork latency against history length.
+
+Run from the project root:
+    python benchmarks/bench_undo.py [--actions 400]
+
+Plays a seeded game for up to ``--actions`` actions (fewer if it ends),
+measuring with tracemalloc what the game and its undo history keep alive
+per action. "deepcopy" is the naive alternative of snapshotting the
+whole game with copy.deepcopy before every action. Latencies are the median
+of repeated undo+redo pairs and forks at increasing history lengths.
+"""
+
+import argparse
+import copy
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from web.web_app import WebClueGame, games, run_command  # noqa: E402
+
+CHECKPOINTS = (10, 50, 100, 200, 400)
+
+
+def next_command(game, rng):
+    if game.waiting_for_disproval:
+        return 'disprove ' + game.pending_disproval_cards[0].lower()
+    if game.player_turn_active:
+        return 'move to ' + rng.choice(game.game.get_valid_moves()).lower()
+    return 'space'
+
+
+def play(game, rng, actions):
+    """Take ``actions`` undoable actions; returns False if the game ended first."""
+    while actions:
+        if game.game_over:
+            return False
+        step = game.step
+        run_command(game, next_command(game, rng), render=False)
+        actions -= game.step - step
+    return True
+
+
+def median_us(action, repeat=200):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        action()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e6
+
+
+def bytes_per_undo_point(actions, seed=1):
+    """tracemalloc bytes retained per action with undo history, then with deepcopy snapshots."""
+    rng = random.Random(seed)
+    game = WebClueGame("bench-undo", num_ai=3, seed=seed)
+    play(game, rng, 5)
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    taken = 0
+    while taken < actions and play(game, rng, 1):
+        taken += 1
+    grown = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    rng = random.Random(seed)
+    naive = WebClueGame("bench-deepcopy", num_ai=3, seed=seed)
+    play(naive, rng, 5)
+    snapshots = []
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    for _ in range(taken):
+        # The logs as the plain lists they used to be
+        snapshots.append(copy.deepcopy((naive.game, list(naive.game_log), list(naive.events))))
+        play(naive, rng, 1)
+    deep = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return taken, grown / max(taken, 1), deep / max(taken, 1)
+
+
+def latencies(checkpoints, seed=2):
+    """(history length, undo+redo us, fork us) at each checkpoint one long game reaches."""
+    rows = []
+    rng = random.Random(seed)
+    game = WebClueGame("bench-latency", num_ai=5, seed=seed)
+    for length in checkpoints:
+        if not play(game, rng, length - game.step):
+            break
+
+        def undo_redo():
+            run_command(game, 'undo', render=False)
+            run_command(game, 'redo', render=False)
+
+        def fork():
+            result = run_command(game, 'fork', render=False)
+            games.pop(result['fork_id'])
+
+        rows.append((game.step, median_us(undo_redo) / 2, median_us(fork)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--actions", type=int, default=400)
+    args = parser.parse_args()
+
+    taken, per_point, per_deepcopy = bytes_per_undo_point(args.actions)
+    print(f"{taken} actions: {per_point / 1024:.1f} KiB per undo point (logs included), "
+          f"{per_deepcopy / 1024:.1f} KiB per deepcopy snapshot")
+    print(f"{'history':>8} {'undo/redo us':>13} {'fork us':>8}")
+    for length, undo_us, fork_us in latencies([n for n in CHECKPOINTS if n <= args.actions]):
+        print(f"{length:>8} {undo_us:>13.1f} {fork_us:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
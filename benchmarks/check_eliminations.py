@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Replay check: AIs never accuse with an eliminated seat's cards.
+
+Run from the project root:
+    python benchmarks/check_eliminations.py [--games 40] [--seed 1]
+
+Plays seeded Medium and Hard games through the JSON API with a scripted
+human who never accuses, so the AIs' random and deductive accusations
+knock seats out. Each finished game is saved and replayed through
+/api/replay, and the replay must produce the same events. In the replay,
+no deductive or Monte Carlo AI may accuse with a card from a seat already
+eliminated: those cards were shown to the whole table, so a deduction
+that puts one in the envelope is wrong. Exits 1 on any failure.
+"""
+
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from web.web_app import create_app, games  # noqa: E402
+
+SUSPECTS = ('plum', 'green', 'peacock', 'scarlet', 'mustard', 'white')
+WEAPONS = ('rope', 'knife', 'wrench', 'revolver', 'candlestick', 'lead pipe')
+CHECKED_STRATEGIES = ('deductive', 'montecarlo')
+MAX_COMMANDS = 1500
+
+
+def next_command(state, rng):
+    """A plausible next command for the human seat, from the game's JSON state."""
+    if state['pending_disproval']:
+        return 'disprove ' + state['pending_disproval']['cards'][0].lower()
+    if not state['player_turn']:
+        return 'space'
+    if rng.random() < 0.5:
+        return 'move to ' + rng.choice(state['valid_moves']).lower()
+    return f"suggest {rng.choice(SUSPECTS)} with {rng.choice(WEAPONS)} in {state['location'].lower()}"
+
+
+def play(client, difficulty, num_ai, seed, rng):
+    """Play one game to the end; returns its id, or None if it didn't finish."""
+    state = client.post('/api/v2/games', json={'num_ai': num_ai, 'difficulty': difficulty,
+                                               'seed': seed}).get_json()
+    for _ in range(MAX_COMMANDS):
+        if state['game_over']:
+            return state['game_id']
+        state = client.post(f"/api/v2/games/{state['game_id']}/commands",
+                            json={'command': next_command(state, rng)}).get_json()['state']
+    return None
+
+
+def bad_accusations(events, strategies):
+    """(accusation event, eliminated cards it names) for each checked AI that named some."""
+    out = set()
+    bad = []
+    for event in events:
+        if event['type'] == 'eliminated':
+            out |= set(event['cards'])
+        elif event['type'] == 'accused' and strategies[event['seat']] in CHECKED_STRATEGIES:
+            named = {event['suspect'], event['weapon'], event['room']} & out
+            if named:
+                bad.append((event, sorted(named)))
+    return bad
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--games", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    app = create_app({'CLUE_ADMISSION': False, 'CLUE_GAME_POOL': False, 'CLUE_ANALYSIS': False})
+    client = app.test_client()
+    rng = random.Random(args.seed)
+    failures = finished = eliminations = checked = 0
+    for number in range(args.games):
+        difficulty = ('Medium', 'Hard')[number % 2]
+        num_ai = rng.randint(2, 5)
+        seed = rng.getrandbits(32)
+        game_id = play(client, difficulty, num_ai, seed, rng)
+        if game_id is None:
+            continue
+        finished += 1
+        record = client.post('/api/save_game', json={'game_id': game_id}).get_json()['replay']
+        replay_id = client.post('/api/replay', json={'replay': record}).get_json()['game_id']
+        events = client.get(f'/api/v2/games/{game_id}').get_json()['events']
+        replayed = client.get(f'/api/v2/games/{replay_id}').get_json()['events']
+        if replayed != events:
+            print(f"FAIL: {difficulty} game seed {seed} with {num_ai} AIs replayed differently")
+            failures += 1
+            continue
+        strategies = ['human'] + [strategy.name for strategy in games[replay_id].game.ai_strategies]
+        eliminations += sum(1 for event in replayed if event['type'] == 'eliminated')
+        checked += sum(1 for event in replayed
+                       if event['type'] == 'accused' and strategies[event['seat']] in CHECKED_STRATEGIES)
+        for event, named in bad_accusations(replayed, strategies):
+            print(f"FAIL: {difficulty} game seed {seed} with {num_ai} AIs: {strategies[event['seat']]} "
+                  f"AI_{event['seat']} accused with eliminated cards {', '.join(named)}")
+            failures += 1
+
+    print(f"{finished} of {args.games} games finished and replayed, {eliminations} eliminations, "
+          f"{checked} deductive or Monte Carlo accusations checked")
+    if failures:
+        print(f"FAIL: {failures} problems")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
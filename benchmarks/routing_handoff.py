@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Consistent-hash routing across local node processes, with handoff on ring changes.
+
+Run from the project root:
+    python benchmarks/routing_handoff.py [--nodes 3] [--games 60] [--base-port 5101]
+
+Starts ``--nodes`` copies of the app on their own ports, each knowing the
+whole ring (see web/routing.py), creates games through random nodes and
+plays them with requests sent to random nodes, so most requests take a
+forwarding hop. Then a node joins and, later, one leaves: the new node list
+is posted to every node, and the script checks that only the games whose
+owner changed were handed off (about one in N, where hashing modulo the node
+count would move most of them), that every game reads the same through
+every node before and after, and that play carries on. Prints request
+latency served locally and through a hop. Exits 1 on any mismatch.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from web.routing import KEY_HEADER, HashRing, _hash  # noqa: E402
+
+KEY = 'routing-handoff-benchmark'
+MOVES_PER_ROUND = 6
+OPENER = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+
+def serve(port, nodes):
+    """Run one node in this process (the script starts itself with --serve)."""
+    from werkzeug.serving import run_simple
+    from web.web_app import create_app
+    app = create_app({
+        'CLUE_RATE_LIMITS': {'client': (10000.0, 10000), 'create': (10000.0, 10000)},
+        'CLUE_ROUTING_NODES': nodes,
+        'CLUE_ROUTING_SELF': f"http://127.0.0.1:{port}",
+        'CLUE_ROUTING_KEY': KEY,
+    })
+    run_simple('127.0.0.1', port, app, threaded=True)
+
+
+def call(node, path, payload=None, key=False):
+    """(status, JSON body, seconds) of one request."""
+    data = json.dumps(payload).encode() if payload is not None else None
+    headers = {'Content-Type': 'application/json'}
+    if key:
+        headers[KEY_HEADER] = KEY
+    request = urllib.request.Request(node + path, data=data, headers=headers,
+                                     method='POST' if data is not None else 'GET')
+    start = time.perf_counter()
+    try:
+        with OPENER.open(request, timeout=60) as response:
+            return response.status, json.loads(response.read()), time.perf_counter() - start
+    except urllib.error.HTTPError as error:
+        body = error.read()
+        try:
+            body = json.loads(body)
+        except ValueError:
+            pass  # An HTML error page: report it as text
+        return error.code, body, time.perf_counter() - start
+
+
+def start_node(port, nodes, verbose):
+    output = None if verbose else subprocess.DEVNULL
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(port),
+                                '--ring', ','.join(nodes)], cwd=ROOT, stdout=output, stderr=output)
+    node = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            call(node, '/api/metrics')
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"node on port {port} did not start")
+
+
+def next_command(state, rng):
+    """A plausible next command for the human seat, from the game's JSON state."""
+    if state['pending_disproval']:
+        return 'disprove ' + state['pending_disproval']['cards'][0].lower()
+    if not state['player_turn'] or state['game_over']:
+        return 'space'
+    roll = rng.random()
+    if roll < 0.4:
+        return 'move to ' + rng.choice(state['valid_moves']).lower()
+    if roll < 0.8:
+        return f"suggest plum with rope in {state['location'].lower()}"
+    return 'space'
+
+
+def fingerprint(state):
+    """Everything a game's state shows except its events, which next_seq stands for."""
+    return {key: value for key, value in state.items() if key != 'events'}
+
+
+class Cluster:
+    def __init__(self, base_port, verbose):
+        self.base_port = base_port
+        self.verbose = verbose
+        self.processes = {}
+        self.nodes = []
+
+    def add(self, count):
+        ports = range(self.base_port + len(self.processes), self.base_port + len(self.processes) + count)
+        nodes = self.nodes + [f"http://127.0.0.1:{port}" for port in ports]
+        for port in ports:
+            # Joining nodes start on the current ring, as front routers, until it changes
+            self.processes[f"http://127.0.0.1:{port}"] = start_node(port, self.nodes or nodes, self.verbose)
+        return nodes
+
+    def set_ring(self, nodes):
+        """Post the node list to every running node; returns games handed off by each."""
+        moved = {}
+        for node in self.processes:
+            status, body, _ = call(node, '/internal/ring', {'nodes': nodes}, key=True)
+            if status != 200 or body['failed']:
+                raise RuntimeError(f"{node} could not adopt the ring: {status} {body}")
+            moved[node] = body['handed_off']
+        self.nodes = nodes
+        return moved
+
+    def stop(self):
+        for process in self.processes.values():
+            process.kill()
+            process.wait()
+
+
+def play(cluster, game_ids, rng, latencies, rounds=1):
+    """Send moves for every game through random live nodes."""
+    for game_id in game_ids:
+        for _ in range(rounds * MOVES_PER_ROUND):
+            node = rng.choice(cluster.nodes)
+            status, state, _ = call(node, f'/api/v2/games/{game_id}')
+            if status != 200:
+                raise RuntimeError(f"game {game_id} via {node}: {status} {state}")
+            if state['game_over']:
+                break
+            status, body, seconds = call(node, f'/api/v2/games/{game_id}/commands',
+                                         {'command': next_command(state, rng)})
+            if status != 200:
+                raise RuntimeError(f"command for {game_id} via {node}: {status} {body}")
+            hop = HashRing(cluster.nodes).owner(game_id) != node
+            latencies['hop' if hop else 'local'].append(seconds)
+
+
+def check_reads(cluster, game_ids, expected=None):
+    """Every game reads the same through every node (and as ``expected``, if given)."""
+    seen = {}
+    for game_id in game_ids:
+        states = {node: call(node, f'/api/v2/games/{game_id}') for node in cluster.nodes}
+        bad = {node: status for node, (status, _, _) in states.items() if status != 200}
+        if bad:
+            raise RuntimeError(f"game {game_id} not found through {bad}")
+        prints = [fingerprint(state) for _, state, _ in states.values()]
+        if any(other != prints[0] for other in prints[1:]):
+            raise RuntimeError(f"game {game_id} reads differently through different nodes")
+        if expected is not None and prints[0] != expected[game_id]:
+            raise RuntimeError(f"game {game_id} changed across the handoff")
+        seen[game_id] = prints[0]
+    return seen
+
+
+def held(cluster):
+    """Live games held by each node."""
+    return {node: call(node, '/api/metrics')[1]['games'] for node in cluster.processes}
+
+
+def report_change(label, before, after, game_ids, moved):
+    owners_before = HashRing(before)
+    owners_after = HashRing(after)
+    expected = sum(owners_before.owner(game_id) != owners_after.owner(game_id) for game_id in game_ids)
+    modulo = sum(_hash(game_id) % len(before) != _hash(game_id) % len(after) for game_id in game_ids)
+    handed_off = sum(moved.values())
+    print(f"{label}: {handed_off} of {len(game_ids)} games handed off "
+          f"({expected} changed owner; hashing modulo the node count would move {modulo})")
+    if handed_off != expected:
+        raise RuntimeError(f"expected {expected} handoffs, saw {handed_off}")
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] * 1000 if values else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--games", type=int, default=60)
+    parser.add_argument("--base-port", type=int, default=5101)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="show the nodes' logs")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--ring", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve, args.ring)
+        return 0
+
+    rng = random.Random(args.seed)
+    latencies = {'local': [], 'hop': []}
+    cluster = Cluster(args.base_port, args.verbose)
+    try:
+        cluster.set_ring(cluster.add(args.nodes))
+        game_ids = []
+        for _ in range(args.games):
+            node = rng.choice(cluster.nodes)
+            status, state, _ = call(node, '/api/v2/games', {'num_ai': rng.randint(1, 4)})
+            if status != 201 or HashRing(cluster.nodes).owner(state['game_id']) != node:
+                raise RuntimeError(f"game created through {node} is not owned by it: {status} {state}")
+            game_ids.append(state['game_id'])
+        print(f"{len(game_ids)} games on {len(cluster.nodes)} nodes, held {sorted(held(cluster).values())}")
+        play(cluster, game_ids, rng, latencies)
+
+        before = list(cluster.nodes)
+        expected = check_reads(cluster, game_ids)
+        after = cluster.add(1)
+        report_change("Node joined", before, after, game_ids, cluster.set_ring(after))
+        check_reads(cluster, game_ids, expected)
+        play(cluster, game_ids, rng, latencies)
+
+        before = list(cluster.nodes)
+        leaving = before[0]
+        after = before[1:]
+        expected = check_reads(cluster, game_ids)
+        report_change("Node left", before, after, game_ids, cluster.set_ring(after))
+        check_reads(cluster, game_ids, expected)
+        remaining = held(cluster)[leaving]
+        if remaining:
+            raise RuntimeError(f"{leaving} still holds {remaining} games after leaving")
+        play(cluster, game_ids, rng, latencies)
+        print(f"Held after the changes: {held(cluster)}")
+    except RuntimeError as error:
+        print(f"FAIL: {error}")
+        return 1
+    finally:
+        cluster.stop()
+
+    for kind, values in latencies.items():
+        print(f"{kind:>5} commands: {len(values):>5}  p50 {percentile(values, 0.5):6.2f} ms  "
+              f"p99 {percentile(values, 0.99):6.2f} ms")
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Soak test: memory growth and latency drift over many games.
+
+Run from the project root:
+    python benchmarks/soak.py [--games 2000] [--sample-every 250] [--max-growth-kib 8192]
+
+Drives scripted games through the web app in-process with the Flask test
+client, the way the page does: /api/new_game, then /api/command with
+moves, suggestions, disprovals, notebook and map views, AI rounds
+(``space``) and the occasional accusation. Some games are abandoned part
+way, to be evicted. Every ``--sample-every`` games it prints RSS,
+tracemalloc's traced memory and request latency percentiles for the
+window. At the end it prints the allocation sites that grew most since
+warm-up. Warm-up is the first ``2 * --max-games`` games (at most half the
+run), by which time the game store is full and has turned over once.
+
+Exits 1 if RSS or traced memory grows by more than ``--max-growth-kib``
+per thousand games after warm-up (the least-squares slope over the
+samples, since the allocator grows RSS in steps). A few million commands
+take ``--games 20000``; ``--no-tracemalloc`` runs about four times as fast.
+The slowest requests are full garbage collections, whose cost follows
+the number of live games.
+"""
+
+import argparse
+import gc
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.clue_game.engine.game_logic import ClueEngine  # noqa: E402
+from web.web_app import create_app, games  # noqa: E402
+
+MAX_COMMANDS_PER_GAME = 400
+ABANDON_RATE = 0.1
+TOP_ALLOCATORS = 8
+
+
+def rss_kib():
+    """Current resident memory in KiB (peak where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def next_command(game, rng):
+    """A plausible next command for the human seat."""
+    if game.waiting_for_disproval:
+        return 'disprove ' + rng.choice(game.pending_disproval_cards).lower()
+    if not game.player_turn_active:
+        return 'space'
+    roll = rng.random()
+    if roll < 0.1:
+        return rng.choice(('notebook', 'map', 'players'))
+    if roll < 0.13:
+        return (f"accuse {rng.choice(ClueEngine.SUSPECTS)} with {rng.choice(ClueEngine.WEAPONS)} "
+                f"in {rng.choice(ClueEngine.ROOMS)}").lower()
+    if roll < 0.5 and not game.player_suggested_this_turn:
+        return (f"suggest {rng.choice(ClueEngine.SUSPECTS)} with {rng.choice(ClueEngine.WEAPONS)} "
+                f"in {game.game.current_location}").lower()
+    if game.player_suggested_this_turn:
+        return 'space'
+    return 'move to ' + rng.choice(game.game.get_valid_moves()).lower()
+
+
+def play_game(client, rng, latencies):
+    """Play (or abandon) one game; returns the number of commands sent."""
+    start = time.perf_counter()
+    game_id = client.post('/api/new_game', json={'num_ai': rng.randint(1, 5)}).get_json()['game_id']
+    latencies.append(time.perf_counter() - start)
+    abandon_after = rng.randint(5, 60) if rng.random() < ABANDON_RATE else MAX_COMMANDS_PER_GAME
+    for sent in range(abandon_after):
+        game = games.get(game_id)
+        if game is None or game.game_over:
+            return sent
+        command = next_command(game, rng)
+        start = time.perf_counter()
+        client.post('/api/command', json={'game_id': game_id, 'command': command})
+        latencies.append(time.perf_counter() - start)
+    return abandon_after
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def slope(points):
+    """Least-squares slope of (x, y) points."""
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    return (sum((x - mean_x) * (y - mean_y) for x, y in points) /
+            sum((x - mean_x) ** 2 for x, _ in points))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--sample-every", type=int, default=250)
+    parser.add_argument("--max-games", type=int, default=200, help="live games kept before eviction")
+    parser.add_argument("--max-growth-kib", type=float, default=8192.0,
+                        help="allowed growth per 1000 games after warm-up")
+    parser.add_argument("--no-tracemalloc", action="store_true")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    app = create_app({'CLUE_ADMISSION': False, 'CLUE_MAX_GAMES': args.max_games})
+    client = app.test_client()
+    rng = random.Random(args.seed)
+    tracing = not args.no_tracemalloc
+    if tracing:
+        tracemalloc.start()
+
+    samples = []  # (games played, rss KiB, traced KiB)
+    warm_snapshot = None
+    warm_games = max(min(2 * args.max_games, args.games // 2), args.sample_every)
+    print(f"{'games':>7} {'commands':>9} {'live':>5} {'rss MiB':>8} {'traced MiB':>11} "
+          f"{'p50 ms':>7} {'p99 ms':>7} {'max ms':>7} {'cmd/s':>7}")
+    commands = 0
+    latencies = []
+    window_start = time.perf_counter()
+    for played in range(1, args.games + 1):
+        commands += play_game(client, rng, latencies)
+        if played % args.sample_every and played != args.games:
+            continue
+        if tracing and warm_snapshot is None and played >= warm_games:
+            # Before sampling: the snapshot's own tens of MiB would read as growth
+            warm_snapshot = tracemalloc.take_snapshot()
+        gc.collect()
+        traced = tracemalloc.get_traced_memory()[0] // 1024 if tracing else 0
+        samples.append((played, rss_kib(), traced))
+        latencies.sort()
+        rate = len(latencies) / (time.perf_counter() - window_start)
+        print(f"{played:>7} {commands:>9} {len(games):>5} {samples[-1][1] / 1024:>8.1f} {traced / 1024:>11.1f} "
+              f"{percentile(latencies, 0.5) * 1000:>7.2f} {percentile(latencies, 0.99) * 1000:>7.2f} "
+              f"{latencies[-1] * 1000:>7.2f} {rate:>7.0f}", flush=True)
+        latencies = []
+        window_start = time.perf_counter()
+
+    measured = [sample for sample in samples if sample[0] >= warm_games]
+    if len(measured) < 3:
+        print(f"Too few samples after warm-up ({warm_games} games) to measure growth")
+        return 0
+    warm = measured[0]
+
+    if tracing:
+        print(f"\nAllocation sites that grew most since game {warm[0]}:")
+        stats = tracemalloc.take_snapshot().compare_to(warm_snapshot, 'lineno')
+        for stat in stats[:TOP_ALLOCATORS]:
+            print(f"  {stat.size_diff / 1024:+9.1f} KiB  {stat.traceback}")
+
+    growth = {'rss': slope([(played, rss) for played, rss, _ in measured]) * 1000}
+    if tracing:
+        growth['traced'] = slope([(played, traced) for played, _, traced in measured]) * 1000
+    print("\nGrowth per 1000 games after warm-up: " +
+          ", ".join(f"{name} {kib:+.0f} KiB" for name, kib in growth.items()))
+    failed = [name for name, kib in growth.items() if kib > args.max_growth_kib]
+    if failed:
+        print(f"FAIL: {', '.join(failed)} grew more than {args.max_growth_kib:.0f} KiB per 1000 games")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
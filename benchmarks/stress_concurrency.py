@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress harness for per-game locking.
+
+Run from the project root:
+    python benchmarks/stress_concurrency.py [--threads 16] [--commands 400] [--games 32]
+
+Phase 1 hammers a single game with 'space' from many threads and checks that
+AI turns happen strictly in seat order (no interleaved or skipped turns).
+Phase 2 drives many games at once and reports throughput, which should not
+collapse the way it would under a global lock.
+"""
+
+import argparse
+import os
+import re
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from web.web_app import create_app, games  # noqa: E402
+
+# One client hammering the app on purpose, so skip rate limiting
+app = create_app({'CLUE_ADMISSION': False})
+
+def drive(client, game_id, commands, errors):
+    for _ in range(commands):
+        data = client.post('/api/command', json={'game_id': game_id, 'command': 'space'}).get_json()
+        if data.get('waiting_for_disproval'):
+            card = data['available_cards'][0].lower()
+            client.post('/api/command', json={'game_id': game_id, 'command': f'disprove {card}'})
+        elif data.get('player_turn'):
+            client.post('/api/command', json={'game_id': game_id, 'command': 'move'})
+            client.post('/api/command', json={'game_id': game_id, 'command': 'move to hall'})
+            client.post('/api/command', json={'game_id': game_id, 'command': 'move to study'})
+        if 'error' in data:
+            errors.append(data['error'])
+
+
+def ai_turn_order(game):
+    """Seat numbers of AI turns in log order, as recorded by the game."""
+    seat_by_name = {name: i + 1 for i, name in enumerate(game.game.ai_characters)}
+    order = []
+    for entry in game.game_log:
+        text = re.sub(r"<[^>]+>", "", entry)
+        if "makes final accusation" in text or "disproves" in text or "cannot disprove" in text:
+            continue
+        match = re.search(r"\(AI_(\d+)\) moved to", text)
+        if match:
+            order.append(int(match.group(1)))
+            continue
+        match = re.search(r"\] (.+?) suggests:", text)
+        if match and match.group(1) in seat_by_name:
+            order.append(seat_by_name[match.group(1)])
+    return order
+
+
+def run_threads(target, count):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--commands", type=int, default=400)
+    parser.add_argument("--games", type=int, default=32)
+    args = parser.parse_args()
+
+    client = app.test_client()
+    errors = []
+
+    # Phase 1: one game, many threads
+    game_id = client.post('/api/new_game', json={'num_ai': 4}).get_json()['game_id']
+    game = games[game_id]
+    elapsed = run_threads(lambda i: drive(app.test_client(), game_id, args.commands, errors), args.threads)
+    order = ai_turn_order(game)
+    num_ai = game.game.num_ai
+    # A turn may only be missing from the log when that seat was eliminated
+    bad = [i for i in range(1, len(order)) if order[i] != order[i - 1] % num_ai + 1
+           and order[i - 1] % num_ai + 1 in game.game.turns]
+    print(f"single game: {len(order)} AI turns from {args.threads} threads in {elapsed:.2f}s, "
+          f"{len(bad)} out-of-order turns")
+
+    # Phase 2: many games, one thread each
+    game_ids = [client.post('/api/new_game', json={'num_ai': 3}).get_json()['game_id']
+                for _ in range(args.games)]
+    per_game = max(1, args.commands // 4)
+    elapsed = run_threads(lambda i: drive(app.test_client(), game_ids[i], per_game, errors), args.games)
+    total = args.games * per_game
+    print(f"many games: {total} commands across {args.games} games in {elapsed:.2f}s "
+          f"({total / elapsed:.0f} commands/s)")
+
+    if errors:
+        print(f"errors: {len(errors)}")
+    if bad or errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
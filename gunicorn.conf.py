@@ -0,0 +1,42 @@
+"""
+Gunicorn settings for the autoscale deployment.
+
+The app is imported once in the master (``preload_app``) so the precomputed
+tables in ``web.rendering`` and the rendered page are shared copy-on-write by
+every forked worker.
+"""
+
+import gc
+import os
+
+# The deployment serves behind one reverse proxy, which appends the client's
+# address to X-Forwarded-For. Without trusting that one hop, every user
+# would share the proxy's rate-limit buckets. Set CLUE_PROXY_HOPS=0 when
+# gunicorn faces clients directly (otherwise they could pick their own
+# rate-limit key), or to the number of proxies in front.
+os.environ.setdefault("CLUE_PROXY_HOPS", "1")
+
+wsgi_app = "web.web_app:app"
+preload_app = True
+
+# Live games are held in the memory of the process that created them, so a
+# server runs exactly one worker; scale out with more servers (see the
+# README on routing between nodes).
+workers = 1
+
+# Spectator streams (/api/v2/games/<id>/spectate) stay open for the whole
+# game and each holds one gthread thread while it does. They get their own
+# CLUE_MAX_STREAMS threads on top of the CLUE_WORKER_THREADS that serve
+# play, so a full audience never starves players; further viewers get 503.
+# Every frame wakes every viewer's thread, so delivery slows as audiences
+# grow: python benchmarks/bench_spectate.py measures it (the default 100
+# keeps p99 near 50 ms on one core).
+worker_class = "gthread"
+max_streams = int(os.environ.setdefault("CLUE_MAX_STREAMS", "100"))
+threads = int(os.environ.get("CLUE_WORKER_THREADS", "32")) + max_streams
+
+
+def when_ready(server):
+    # Move everything built during preload into the permanent generation so
+    # the workers' garbage collector never touches (and un-shares) it.
+    gc.freeze()
@@ -4,15 +4,13 @@ Local test entry point for Clue Game Web Application
 Optimized for fast local testing and development iterations
 """
 
-import sys
-import os
+# Running this file puts its directory on sys.path, so the web and src
+# packages import directly; gunicorn gets the same via --chdir.
+import logging
 
-# Add the current directory to Python path
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-
-# Import and run the web app
 from web.web_app import app
 
 if __name__ == '__main__':
-    # Local development configuration
+    # Local development configuration, including the app's debug logging
+    logging.basicConfig(level=logging.DEBUG)
     app.run(debug=True, host='127.0.0.1', port=5000, use_reloader=True)
@@ -0,0 +1,195 @@
+"""
+Post-game analysis: what each seat could have deduced, turn by turn.
+
+Replays a finished game's events from every seat's point of view: its own
+hand, cards shown to it, and what the whole table sees (who disproved or
+passed on which suggestion, eliminated players' hands). After each turn it
+works out who must hold which cards and which cards may still be in the
+envelope, using hand sizes (a full hand holds nothing else; a hand with as
+many possible cards as its size holds them all) and "holds one of these"
+constraints from disprovals the seat didn't see.
+
+A seat could have accused on a turn of its own once, by the end of it,
+exactly one card per category was left. The first such turn a seat let go
+by is its best missed accusation turn.
+
+Input is a plain dict (see WebClueGame.get_analysis_input), so analysis
+can run in another process:
+
+    hands       one list of cards per seat, seat 0 first
+    envelope    {'suspect', 'weapon', 'room'}
+    characters, strategies   one entry per seat
+    winner      seat or None
+    events      the game's structured events (see WebClueGame.add_event)
+"""
+
+from src.clue_game.engine.game_logic import ClueEngine
+
+CATEGORIES = (('suspect', ClueEngine.SUSPECTS), ('weapon', ClueEngine.WEAPONS), ('room', ClueEngine.ROOMS))
+ALL_CARDS = frozenset(ClueEngine.ALL_CARDS)
+TURN_EVENTS = ('moved', 'suggested')  # Each turn's one action (accusing can also be one)
+
+
+class Deduction:
+    """Who holds which cards, as far as one seat can tell."""
+
+    def __init__(self, seat, hand, hand_sizes):
+        self.seat = seat
+        self.hand_sizes = hand_sizes
+        self.holder = {}  # card -> seat known to hold it
+        self.lacks = [set() for _ in hand_sizes]  # Cards each seat is known not to hold
+        self.one_of = set()  # (seat, cards): the seat holds at least one of them
+        self.envelope = {}  # category -> card known to be in the envelope
+        for card in hand:
+            self.holder[card] = seat
+        self.lacks[seat] |= ALL_CARDS - set(hand)
+        self.propagate()
+
+    def shown(self, card, seat):
+        self.holder[card] = seat
+
+    def holds_one_of(self, seat, cards):
+        self.one_of.add((seat, frozenset(cards)))
+
+    def passed(self, seat, cards):
+        self.lacks[seat] |= set(cards)
+
+    def propagate(self):
+        """Apply every rule until nothing new follows."""
+        changed = True
+        while changed:
+            changed = False
+            for card, seat in self.holder.items():
+                for other, lacks in enumerate(self.lacks):
+                    if other != seat and card not in lacks:
+                        lacks.add(card)
+                        changed = True
+            for seat, size in enumerate(self.hand_sizes):
+                held = {card for card, holder in self.holder.items() if holder == seat}
+                possible = ALL_CARDS - self.lacks[seat]
+                if len(held) == size and possible != held:
+                    self.lacks[seat] |= possible - held
+                    changed = True
+                elif len(possible) == size and possible != held:
+                    for card in possible - held:
+                        self.holder[card] = seat
+                    changed = True
+            remaining = set()
+            for seat, cards in self.one_of:
+                if any(self.holder.get(card) == seat for card in cards):
+                    continue
+                possible = cards - self.lacks[seat]
+                if len(possible) == 1:
+                    self.holder[next(iter(possible))] = seat
+                    changed = True
+                else:
+                    remaining.add((seat, possible or cards))
+            self.one_of = remaining
+            for category, cards in CATEGORIES:
+                if category in self.envelope:
+                    continue
+                unheld = [card for card in cards if card not in self.holder]
+                nobody = [card for card in unheld if all(card in lacks for lacks in self.lacks)]
+                if len(unheld) == 1 or nobody:
+                    card = nobody[0] if nobody else unheld[0]
+                    self.envelope[category] = card
+                    for lacks in self.lacks:
+                        lacks.add(card)
+                    changed = True
+
+    def open_cards(self):
+        """Cards that may still be in the envelope, per category."""
+        return [[self.envelope[category]] if category in self.envelope
+                else [card for card in cards if card not in self.holder]
+                for category, cards in CATEGORIES]
+
+    def solution(self):
+        """{'suspect', 'weapon', 'room'} once one card per category is left, else None."""
+        open_cards = self.open_cards()
+        if any(len(cards) != 1 for cards in open_cards):
+            return None
+        return {category: cards[0] for (category, _), cards in zip(CATEGORIES, open_cards)}
+
+
+def _turns(events):
+    """Events grouped into turns: (seat, events) in order."""
+    turn = None
+    for event in events:
+        kind = event['type']
+        if kind in TURN_EVENTS or (kind == 'accused' and (turn is None or turn[0] != event['seat'])):
+            if turn is not None:
+                yield turn
+            turn = (event['seat'], [])
+        if turn is not None:
+            turn[1].append(event)
+    if turn is not None:
+        yield turn
+
+
+def analyze_game(record):
+    """Turn-by-turn deductions for every seat, and the accusations each one missed."""
+    hands = record['hands']
+    sizes = [len(hand) for hand in hands]
+    seats = [Deduction(seat, hand, sizes) for seat, hand in enumerate(hands)]
+    envelope = record['envelope']
+    solved_at = [None] * len(hands)
+    accused_at = [None] * len(hands)
+    missed = [[] for _ in hands]
+    turns = []
+    suggestion = None
+
+    for number, (actor, events) in enumerate(_turns(record['events']), start=1):
+        action = events[0]['type']
+        accused = False
+        for event in events:
+            kind = event['type']
+            if kind == 'suggested':
+                suggestion = (event['suspect'], event['weapon'], event['room'])
+            elif kind in ('disproved', 'not_disproved') and suggestion is not None:
+                for seat, deduction in enumerate(seats):
+                    for passer in event.get('passed', ()):
+                        deduction.passed(passer, suggestion)
+                    if kind == 'disproved':
+                        if seat in (event['seat'], event['by']):
+                            deduction.shown(event['card'], event['by'])
+                        else:
+                            deduction.holds_one_of(event['by'], suggestion)
+            elif kind == 'eliminated':
+                for deduction in seats:
+                    for card in event['cards']:
+                        deduction.shown(card, event['seat'])
+            elif kind == 'accused':
+                accused = True
+                if accused_at[event['seat']] is None:
+                    accused_at[event['seat']] = number
+        open_counts = []
+        for seat, deduction in enumerate(seats):
+            deduction.propagate()
+            open_counts.append([len(cards) for cards in deduction.open_cards()])
+            if solved_at[seat] is None and deduction.solution() == envelope:
+                solved_at[seat] = number
+        if solved_at[actor] is not None and not (accused and accused_at[actor] == number):
+            missed[actor].append(number)
+        turns.append({'turn': number, 'seat': actor, 'action': 'accused' if action == 'accused' else action,
+                      'open': open_counts})
+
+    report = []
+    for seat in range(len(hands)):
+        report.append({
+            'seat': seat,
+            'character': record['characters'][seat],
+            'strategy': record['strategies'][seat],
+            'solved_at': solved_at[seat],
+            'accused_at': accused_at[seat],
+            'missed_turns': missed[seat],
+            'best_missed_turn': missed[seat][0] if missed[seat] else None,
+        })
+    first_missed = min(((seat['best_missed_turn'], seat['seat']) for seat in report
+                        if seat['best_missed_turn'] is not None), default=None)
+    return {
+        'winner': record['winner'],
+        'envelope': envelope,
+        'seats': report,
+        'best_missed': {'turn': first_missed[0], 'seat': first_missed[1]} if first_missed else None,
+        'turns': turns,
+    }
@@ -0,0 +1,110 @@
+"""
+Aggregate queries over the finished-game store (see store.py).
+
+Columns are scanned as memory-mapped arrays; per-game values are only ever
+folded into small counters, so the cost is a few passes over raw bytes
+regardless of how many games are stored.
+
+    python -m src.clue_game.analytics.query games/ --by strategy --seats 3
+"""
+
+import argparse
+from collections import Counter
+
+from src.clue_game.analytics.store import EMPTY, MAX_SEATS, NO_WINNER, ColumnStoreReader, strategy_name
+from src.clue_game.engine.game_logic import ClueEngine
+from src.clue_game.engine.tournament import wilson_interval
+
+TOTAL_COLUMNS = ('turns', 'suggestions', 'disprovals', 'accusations')
+
+
+def seat_outcomes(reader):
+    """Counter of (seat, num_seats, strategy code, character code, won) over every occupied seat."""
+    outcomes = Counter()
+    for seat in range(MAX_SEATS):
+        names = ('num_seats', 'winner', f'seat{seat}_strategy', f'seat{seat}_character')
+        for num_seats, winner, strategy, character in reader.columns(*names):
+            # Counter counts in C; only the distinct combinations become Python objects
+            for (n, w, s, c), count in Counter(zip(num_seats, winner, strategy, character)).items():
+                if s != EMPTY:
+                    outcomes[seat, n, s, c, w == seat] += count
+    return outcomes
+
+
+def win_rates(outcomes, by='strategy', num_seats=None):
+    """Rows of {key, played, wins, win_rate, win_rate_ci} grouped by strategy, seat or character."""
+    played = Counter()
+    won = Counter()
+    for (seat, n, strategy, character, is_winner), count in outcomes.items():
+        if num_seats is not None and n != num_seats:
+            continue
+        if by == 'seat':
+            key = seat
+        elif by == 'character':
+            key = ClueEngine.SUSPECTS[character]
+        else:
+            key = strategy_name(strategy)
+        played[key] += count
+        if is_winner:
+            won[key] += count
+
+    rows = []
+    for key in played:
+        rows.append({
+            'key': key,
+            'played': played[key],
+            'wins': won[key],
+            'win_rate': won[key] / played[key],
+            'win_rate_ci': wilson_interval(won[key], played[key]),
+        })
+    return sorted(rows, key=lambda row: str(row['key']))
+
+
+def totals(reader, num_seats=None):
+    """Game count, games without a winner, and per-game means of the count columns."""
+    games = 0
+    no_winner = 0
+    sums = Counter()
+    for columns in reader.columns('num_seats', 'winner', *TOTAL_COLUMNS):
+        seats, winners, counts = columns[0], columns[1], columns[2:]
+        if num_seats is None:
+            games += len(seats)
+            no_winner += Counter(winners)[NO_WINNER]
+            for name, column in zip(TOTAL_COLUMNS, counts):
+                sums[name] += sum(column)
+        else:
+            for row in zip(seats, winners, *counts):
+                if row[0] != num_seats:
+                    continue
+                games += 1
+                no_winner += row[1] == NO_WINNER
+                for name, value in zip(TOTAL_COLUMNS, row[2:]):
+                    sums[name] += value
+    means = {name: sums[name] / games if games else 0.0 for name in TOTAL_COLUMNS}
+    return {'games': games, 'no_winner': no_winner, 'means': means}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Win rates and aggregates over recorded games.")
+    parser.add_argument("store", help="analytics directory (CLUE_ANALYTICS_DIR)")
+    parser.add_argument("--by", choices=("strategy", "seat", "character"), default="strategy")
+    parser.add_argument("--seats", type=int, default=None, help="only games with this many players")
+    args = parser.parse_args()
+
+    reader = ColumnStoreReader(args.store)
+    try:
+        summary = totals(reader, args.seats)
+        print(f"{summary['games']} games ({summary['no_winner']} without a winner) "
+              f"in {len(reader.segments)} segments")
+        print("per game: " + ", ".join(f"{value:.1f} {name}" for name, value in summary['means'].items()))
+        print(f"{args.by:<14} {'played':>8} {'wins':>8} {'win rate':>20}")
+        for row in win_rates(seat_outcomes(reader), args.by, args.seats):
+            lo, hi = row['win_rate_ci']
+            print(f"{str(row['key']):<14} {row['played']:>8} {row['wins']:>8} "
+                  f"{row['win_rate']:>6.1%} [{lo:.1%}, {hi:.1%}]")
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
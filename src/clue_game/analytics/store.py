@@ -0,0 +1,227 @@
+"""
+Append-only columnar store for finished-game records.
+
+Each writer process appends to its own segment directory, with one file of
+fixed-width values per column (``<column>.<typecode>``, native byte order as
+written by :mod:`array`). Readers memory-map the column files and expose them
+as typed memoryviews, so millions of games can be aggregated without
+building a Python object per game.
+
+A record is a dict with these keys:
+
+    seed, finished_at        ints
+    characters, strategies   one entry per seat, in seat order
+    envelope                 {'suspect', 'weapon', 'room'}
+    turns, suggestions, disprovals, accusations   counts
+    winner                   seat index or None
+    human                    True if seat 0 was a person
+"""
+
+import atexit
+import mmap
+import os
+import threading
+import time
+from array import array
+
+from src.clue_game.engine.game_logic import ClueEngine
+
+MAX_SEATS = len(ClueEngine.SUSPECTS)
+EMPTY = 255        # Unused seat in a character/strategy column
+NO_WINNER = -1
+FLUSH_EVERY = 256
+FLUSH_SECONDS = float(os.environ.get('CLUE_ANALYTICS_FLUSH_SECONDS', '60'))
+
+# Strategy names are stored as codes. Append new names; never reorder.
+STRATEGY_CODES = ('human', 'explorer', 'strategic', 'wanderer', 'deductive', 'montecarlo')
+OTHER_STRATEGY = 254
+
+COLUMNS = (
+    ('finished_at', 'Q'),
+    ('seed', 'Q'),
+    ('num_seats', 'B'),
+    ('human', 'B'),
+    ('turns', 'I'),
+    ('suggestions', 'I'),
+    ('disprovals', 'I'),
+    ('accusations', 'I'),
+    ('winner', 'b'),
+    ('env_suspect', 'B'),
+    ('env_weapon', 'B'),
+    ('env_room', 'B'),
+) + tuple(
+    (f'seat{i}_{kind}', 'B') for i in range(MAX_SEATS) for kind in ('character', 'strategy')
+)
+COLUMN_TYPES = dict(COLUMNS)
+
+
+def strategy_code(name):
+    try:
+        return STRATEGY_CODES.index(name)
+    except ValueError:
+        return OTHER_STRATEGY
+
+
+def strategy_name(code):
+    if code < len(STRATEGY_CODES):
+        return STRATEGY_CODES[code]
+    return 'other' if code == OTHER_STRATEGY else None
+
+
+def encode_record(record):
+    """Flatten a record dict into one value per column."""
+    envelope = record['envelope']
+    winner = record['winner']
+    row = {
+        'finished_at': int(record.get('finished_at') or time.time()),
+        'seed': record['seed'] & 0xFFFFFFFFFFFFFFFF,
+        'num_seats': len(record['characters']),
+        'human': 1 if record.get('human') else 0,
+        'turns': record['turns'],
+        'suggestions': record['suggestions'],
+        'disprovals': record['disprovals'],
+        'accusations': record['accusations'],
+        'winner': NO_WINNER if winner is None else winner,
+        'env_suspect': ClueEngine.SUSPECTS.index(envelope['suspect']),
+        'env_weapon': ClueEngine.WEAPONS.index(envelope['weapon']),
+        'env_room': ClueEngine.ROOMS.index(envelope['room']),
+    }
+    for i in range(MAX_SEATS):
+        if i < len(record['characters']):
+            row[f'seat{i}_character'] = ClueEngine.SUSPECTS.index(record['characters'][i])
+            row[f'seat{i}_strategy'] = strategy_code(record['strategies'][i])
+        else:
+            row[f'seat{i}_character'] = EMPTY
+            row[f'seat{i}_strategy'] = EMPTY
+    return row
+
+
+class ColumnStoreWriter:
+    """Buffers records and appends them to this process's segment.
+
+    Flushes every ``flush_every`` records, and once the oldest buffered
+    record is ``flush_seconds`` old (on a timer, so a quiet server's last
+    games still reach readers); 0 turns the time limit off.
+    """
+
+    def __init__(self, root, flush_every=FLUSH_EVERY, flush_seconds=FLUSH_SECONDS):
+        self.root = root
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self.pid = os.getpid()
+        self.segment = os.path.join(root, f'seg-{self.pid}-{time.time_ns()}')
+        self._buffers = {name: array(typecode) for name, typecode in COLUMNS}
+        self._pending = 0
+        self._oldest = None  # When the oldest buffered record arrived (time.monotonic)
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def append(self, record):
+        row = encode_record(record)
+        with self._lock:
+            for name, _ in COLUMNS:
+                self._buffers[name].append(row[name])
+            self._pending += 1
+            if self._pending == 1:
+                self._oldest = time.monotonic()
+                if self.flush_seconds > 0:
+                    self._timer = threading.Timer(self.flush_seconds, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+            if (self._pending >= self.flush_every or
+                    (self.flush_seconds > 0 and time.monotonic() - self._oldest >= self.flush_seconds)):
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        os.makedirs(self.segment, exist_ok=True)
+        for name, typecode in COLUMNS:
+            with open(os.path.join(self.segment, f'{name}.{typecode}'), 'ab') as f:
+                self._buffers[name].tofile(f)
+            self._buffers[name] = array(typecode)
+        self._pending = 0
+
+
+class ColumnStoreReader:
+    """Memory-mapped, read-only view over every segment of a store."""
+
+    def __init__(self, root):
+        self.root = root
+        self.segments = []
+        self._maps = []
+        if not os.path.isdir(root):
+            return
+        for entry in sorted(os.listdir(root)):
+            path = os.path.join(root, entry)
+            if entry.startswith('seg-') and os.path.isdir(path):
+                segment = self._open_segment(path)
+                if segment:
+                    self.segments.append(segment)
+
+    def _open_segment(self, path):
+        views = {}
+        for name, typecode in COLUMNS:
+            file_path = os.path.join(path, f'{name}.{typecode}')
+            if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+                return None
+            with open(file_path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps.append(mapped)
+            view = memoryview(mapped)
+            itemsize = array(typecode).itemsize
+            views[name] = view[:len(view) - len(view) % itemsize].cast(typecode)
+        # A crash mid-flush can leave some columns one batch longer than others
+        rows = min(len(view) for view in views.values())
+        return {name: view[:rows] for name, view in views.items()}
+
+    def __len__(self):
+        return sum(len(segment['seed']) for segment in self.segments)
+
+    def columns(self, *names):
+        """Yield one tuple of aligned column memoryviews per segment."""
+        for segment in self.segments:
+            yield tuple(segment[name] for name in names)
+
+    def close(self):
+        for segment in self.segments:
+            for view in segment.values():
+                view.release()
+        self.segments = []
+        for mapped in self._maps:
+            mapped.close()
+        self._maps = []
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def record_finished_game(record, root=None):
+    """Append a record to the store in ``root`` or $CLUE_ANALYTICS_DIR (no-op if unset)."""
+    global _writer
+    root = root or os.environ.get('CLUE_ANALYTICS_DIR')
+    if not root:
+        return
+    with _writer_lock:
+        # Forked workers must not share the parent's buffers or segment
+        if _writer is None or _writer.pid != os.getpid() or _writer.root != root:
+            if _writer is not None and _writer.pid == os.getpid():
+                _writer.flush()
+            _writer = ColumnStoreWriter(root)
+            atexit.register(_writer.flush)
+        writer = _writer
+    writer.append(record)
+
+
+def flush_finished_games():
+    """Write out any buffered records for this process."""
+    if _writer is not None and _writer.pid == os.getpid():
+        _writer.flush()
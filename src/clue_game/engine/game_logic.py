@@ -1,4 +1,27 @@
+import copy
 import random
+import secrets
+from collections import deque
+
+from src.clue_game.engine.persistent import PersistentLog
+from src.clue_game.engine.strategies import default_strategy
+from src.clue_game.engine.turns import SeatRing
+
+
+def _room_distances(mansion_map):
+    """All-pairs shortest path lengths (in moves) between rooms."""
+    distances = {}
+    for start in mansion_map:
+        dist = {start: 0}
+        queue = deque([start])
+        while queue:
+            room = queue.popleft()
+            for neighbor in mansion_map[room]:
+                if neighbor not in dist:
+                    dist[neighbor] = dist[room] + 1
+                    queue.append(neighbor)
+        distances[start] = dist
+    return distances
 
 
 class ClueEngine:
@@ -20,40 +43,63 @@ class ClueEngine:
         "Dining Room": ["Kitchen", "Hall", "Lounge"]
     }
 
-    def __init__(self, num_ai=2, difficulty="Medium"):
+    # Board tables derived once at import from the constants above
+    ALL_CARDS = SUSPECTS + WEAPONS + ROOMS
+    ROOM_CONNECTIONS = {room: len(neighbors) for room, neighbors in MANSION_MAP.items()}
+
+    ROOM_DISTANCES = _room_distances(MANSION_MAP)
+
+    HUMAN_SEAT = 0  # Seats are 0 for the human and n for AI_n, at ai_index n - 1
+
+    def __init__(self, num_ai=2, difficulty="Medium", strategies=None, human_player=True, seed=None):
         self.num_ai = num_ai
         self.difficulty = difficulty
+        self.human_player = human_player
+        # All randomness in a game comes from its own generator, so the seed
+        # plus the human's commands reproduce the game exactly
+        self.seed = seed if seed is not None else secrets.randbits(63)
+        self.rng = random.Random(self.seed)
         self.secret_envelope = {}
         self.player_hand = []
         self.ai_hands = []
         self.current_location = "Hall"
         self.ai_locations = ["Hall"] * num_ai
+        # One strategy object per AI seat; see strategies.AIStrategy
+        self.ai_strategies = (list(strategies) if strategies
+                              else [default_strategy(i, difficulty) for i in range(num_ai)])
+        # Iterations each time-budgeted AI search ran, so replays can repeat them
+        self.search_iterations = PersistentLog()
+        self.replay_search_iterations = deque()
 
         available_suspects = list(self.SUSPECTS)
-        random.shuffle(available_suspects)
-        self.player_character = available_suspects.pop(0)
+        self.rng.shuffle(available_suspects)
+        self.player_character = available_suspects.pop(0) if human_player else None
         self.ai_characters = [available_suspects.pop(0) for _ in range(num_ai)]
+        # Who plays next and who is asked to disprove; the human is asked first
+        self.turns = SeatRing(([self.HUMAN_SEAT] if human_player else []) + [i + 1 for i in range(num_ai)],
+                              lead=self.HUMAN_SEAT if human_player else None)
         self.setup_game()
 
     def setup_game(self):
-        winning_s = random.choice(self.SUSPECTS)
-        winning_w = random.choice(self.WEAPONS)
-        winning_r = random.choice(self.ROOMS)
+        winning_s = self.rng.choice(self.SUSPECTS)
+        winning_w = self.rng.choice(self.WEAPONS)
+        winning_r = self.rng.choice(self.ROOMS)
         self.secret_envelope = {"suspect": winning_s, "weapon": winning_w, "room": winning_r}
 
         full_deck = ([s for s in self.SUSPECTS if s != winning_s] +
                      [w for w in self.WEAPONS if w != winning_w] +
                      [r for r in self.ROOMS if r != winning_r])
-        random.shuffle(full_deck)
+        self.rng.shuffle(full_deck)
 
-        total_players = self.num_ai + 1
+        total_players = self.num_ai + (1 if self.human_player else 0)
         cards_per_player = len(full_deck) // total_players
         remainder_cards = len(full_deck) % total_players
         
         # Deal cards to player
-        player_cards = cards_per_player + (1 if remainder_cards > 0 else 0)
-        self.player_hand = sorted([full_deck.pop() for _ in range(player_cards)])
-        remainder_cards -= 1
+        if self.human_player:
+            player_cards = cards_per_player + (1 if remainder_cards > 0 else 0)
+            self.player_hand = sorted([full_deck.pop() for _ in range(player_cards)])
+            remainder_cards -= 1
         
         # Deal cards to AI players
         self.ai_hands = []
@@ -61,46 +107,61 @@ class ClueEngine:
             ai_cards = cards_per_player + (1 if remainder_cards > 0 else 0)
             self.ai_hands.append(sorted([full_deck.pop() for _ in range(ai_cards)]))
             remainder_cards -= 1
+        
+        # Cards each AI knows are not in the envelope: its hand plus anything shown to it.
+        # Frozensets, replaced rather than mutated, so saved states can share them.
+        self.ai_known_cards = [frozenset(hand) for hand in self.ai_hands]
+
+    def capture_state(self):
+        """Everything that changes during play, as immutable values (see restore_state)."""
+        return (self.current_location, tuple(self.ai_locations), self.turns.eliminated,
+                tuple(self.ai_known_cards), tuple(strategy.get_state() for strategy in self.ai_strategies))
+
+    def restore_state(self, state):
+        """Return to a state from capture_state; the deal and seed never change."""
+        current_location, ai_locations, eliminated, ai_known_cards, strategy_states = state
+        self.current_location = current_location
+        self.ai_locations = list(ai_locations)
+        if eliminated != self.turns.eliminated:
+            self.turns = SeatRing(self.turns.seats, self.turns.lead, eliminated)
+        self.ai_known_cards = list(ai_known_cards)
+        for strategy, strategy_state in zip(self.ai_strategies, strategy_states):
+            strategy.set_state(strategy_state)
+
+    def fork(self):
+        """An independent engine in the same state, sharing the deal and history."""
+        engine = copy.copy(self)
+        engine.rng = random.Random()
+        engine.rng.setstate(self.rng.getstate())
+        engine.ai_strategies = [copy.copy(strategy) for strategy in self.ai_strategies]
+        engine.search_iterations = self.search_iterations.copy()
+        engine.replay_search_iterations = deque()
+        engine.turns = self.turns.copy()
+        engine.restore_state(self.capture_state())
+        return engine
 
     def get_valid_moves(self):
         """Returns adjacent rooms for the human player."""
         return self.MANSION_MAP.get(self.current_location, [])
 
     def get_ai_move(self, ai_index):
-        """Moves an AI with strategic behavior and returns the new location string."""
-        current = self.ai_locations[ai_index]
-        possible = self.MANSION_MAP[current]
-        
-        # AI personality based on index for variety
-        personality = ai_index % 3
-        
-        if personality == 0:
-            # Explorer AI - prefers unvisited rooms
-            unvisited = [room for room in possible if room not in self.ai_locations]
-            if unvisited:
-                new_loc = random.choice(unvisited)
-            else:
-                new_loc = random.choice(possible)
-        elif personality == 1:
-            # Strategic AI - prefers rooms with more connections
-            room_scores = {}
-            for room in possible:
-                room_scores[room] = len(self.MANSION_MAP[room])
-            new_loc = max(room_scores, key=room_scores.get)
-        else:
-            # Random AI with slight preference for current room's neighbors
-            weights = [1.2 if room != current else 1.0 for room in possible]
-            new_loc = random.choices(possible, weights=weights)[0]
-        
+        """Moves an AI using its strategy and returns the new location string."""
+        new_loc = self.ai_strategies[ai_index].choose_move(self, ai_index)
         self.ai_locations[ai_index] = new_loc
         return new_loc
     
+    def choose_ai_action(self, ai_index):
+        """Ask an AI's strategy whether to "move" or "suggest" this turn."""
+        return self.ai_strategies[ai_index].choose_action(self, ai_index)
+    
     def make_suggestion(self, suspect, weapon, room):
         """Process a suggestion and return if it can be disproven."""
         suggestion = {"suspect": suspect, "weapon": weapon, "room": room}
         
-        # Check if any AI player can disprove
-        for i, ai_hand in enumerate(self.ai_hands):
+        # Check if any AI player can disprove, in seat order
+        for seat in self.turns.disproval_order(self.HUMAN_SEAT):
+            i = seat - 1
+            ai_hand = self.ai_hands[i]
             if suspect in ai_hand:
                 return {"disproven": True, "card": suspect, "player": self.ai_characters[i]}
             elif weapon in ai_hand:
@@ -112,35 +173,41 @@ class ClueEngine:
     
     def make_ai_suggestion(self, ai_index):
         """AI makes a suggestion when in a room."""
-        current_room = self.ai_locations[ai_index]
-        ai_hand = self.ai_hands[ai_index]
-        
-        # AI strategy: suggest cards they don't have
-        possible_suspects = [s for s in self.SUSPECTS if s not in ai_hand]
-        possible_weapons = [w for w in self.WEAPONS if w not in ai_hand]
-        possible_rooms = [r for r in self.ROOMS if r not in ai_hand]
-        
-        # Add current room to possible rooms even if AI has it
-        if current_room not in possible_rooms:
-            possible_rooms.append(current_room)
-        
-        # Make random suggestion from available cards
-        suspect = random.choice(possible_suspects) if possible_suspects else random.choice(self.SUSPECTS)
-        weapon = random.choice(possible_weapons) if possible_weapons else random.choice(self.WEAPONS)
-        room = current_room  # AI always suggests current room
+        suspect, weapon = self.ai_strategies[ai_index].choose_suggestion(self, ai_index)
+        room = self.ai_locations[ai_index]  # AI always suggests current room
         
         return {"suspect": suspect, "weapon": weapon, "room": room, "player": self.ai_characters[ai_index]}
     
     def check_ai_can_disprove(self, suggestion, ai_index):
-        """Check if a specific AI can disprove a suggestion."""
+        """Check if a specific AI can disprove a suggestion and return the card it shows."""
         ai_hand = self.ai_hands[ai_index]
-        if suggestion["suspect"] in ai_hand:
-            return suggestion["suspect"]
-        elif suggestion["weapon"] in ai_hand:
-            return suggestion["weapon"]
-        elif suggestion["room"] in ai_hand:
-            return suggestion["room"]
-        return None
+        cards = [suggestion[key] for key in ("suspect", "weapon", "room") if suggestion[key] in ai_hand]
+        if not cards:
+            return None
+        return self.ai_strategies[ai_index].choose_card_to_show(self, ai_index, suggestion, cards)
+    
+    def record_suggestion_result(self, ai_index, suggestion, card):
+        """Tell an AI how its suggestion was answered (card is None if nobody disproved it)."""
+        if card:
+            self.ai_known_cards[ai_index] = self.ai_known_cards[ai_index] | {card}
+        self.ai_strategies[ai_index].observe_suggestion_result(self, ai_index, suggestion, card)
+    
+    def make_ai_accusation(self, ai_index):
+        """Ask an AI's strategy for an accusation; returns None if it passes."""
+        accusation = self.ai_strategies[ai_index].choose_accusation(self, ai_index)
+        if accusation is None:
+            return None
+        return dict(accusation, player=self.ai_characters[ai_index])
+    
+    def eliminate_ai(self, ai_index):
+        """Take an AI out after a wrong accusation and show its hand to the AIs still playing."""
+        self.turns.eliminate(ai_index + 1)
+        hand = self.ai_hands[ai_index]
+        # Out of every disproval order now, so its cards are public instead
+        for other in range(self.num_ai):
+            if other + 1 in self.turns:
+                self.ai_known_cards[other] = self.ai_known_cards[other] | set(hand)
+        return hand
     
     def make_accusation(self, suspect, weapon, room):
         """Check if the accusation is correct."""
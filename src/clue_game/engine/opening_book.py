@@ -0,0 +1,254 @@
+"""
+Opening book: precomputed best first suggestions, memory-mapped by every worker.
+
+Until an AI seat's first suggestion is answered it knows only its own hand,
+so its best first suggestion depends on nothing but the room it is in, its
+hand and how many cards each opponent holds. Suspects and weapons are
+interchangeable to the rules, so hands are canonicalized to how many of
+each they hold; rooms are not (the map tells them apart), but the book
+keys on the current room and how many others are held, averaging over
+which. For every game shape (hand size and opponents' hand sizes, see
+search.opponent_hand_sizes), room and canonical hand, an offline run plays
+each kind of suggestion (see search.Board.actions) out many times with the
+search's rules and playout policy and records the best, with its value.
+
+The value is on the search's ``DISCOUNT ** turns`` scale, so it doubles as
+the accusation threshold: a blind accusation only beats suggesting when its
+odds are higher (see MonteCarloStrategy.choose_accusation).
+
+Build a book (on every core) and point workers at it:
+
+    python -m src.clue_game.engine.opening_book opening_book.bin --playouts 200
+    CLUE_OPENING_BOOK=opening_book.bin gunicorn --config=gunicorn.conf.py
+
+The file is a small JSON header and then one fixed-size record per slot,
+at an offset computed from the key, read with ``struct.unpack_from`` on a
+read-only ``mmap``: a lookup is O(1) and the table never enters the heap,
+and every worker shares one copy through the page cache. Decisions taken
+from the book depend on it, so replays and handed-off games need every
+worker to use the same book.
+"""
+
+import argparse
+import json
+import logging
+import mmap
+import os
+import random
+import struct
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from src.clue_game.engine.search import DISCOUNT, HORIZON, INFO_WEIGHT, Board, opponent_hand_sizes
+
+MAGIC = b'CLUEBOOK'
+VERSION = 1
+HEADER = struct.Struct('<8sII')    # magic, version, JSON length
+RECORD = struct.Struct('<BxHHH')   # suggestion code, value, information gain, playouts
+VALUE_SCALE = 65535                # value in [0, 1]
+GAIN_SCALE = 4096                  # information gain in bits (at most log2(6 * 6 * 9) < 9)
+
+NUM_SUSPECTS, NUM_WEAPONS, NUM_ROOMS = 6, 6, 9
+# Slots per game shape: room, holds that room, suspects held, weapons held, other rooms held
+SHAPE_SLOTS = NUM_ROOMS * 2 * NUM_SUSPECTS * NUM_WEAPONS * NUM_ROOMS
+# Suggestion codes; 0 marks an empty slot. Append new codes; never reorder.
+SUGGESTION_KINDS = (None, ('open', 'open'), ('open', 'blank'), ('blank', 'open'), ('blank', 'blank'))
+
+logger = logging.getLogger(__name__)
+
+
+def canonical_hand(rules, room, hand):
+    """(room, holds room, suspects held, weapons held, other rooms held): what the book keys on."""
+    held = room in hand
+    return (rules.ROOMS.index(room), int(held), sum(card in hand for card in rules.SUSPECTS),
+            sum(card in hand for card in rules.WEAPONS), sum(card in hand for card in rules.ROOMS) - held)
+
+
+def slot(shape, room, held, suspects, weapons, rooms):
+    return ((((shape * NUM_ROOMS + room) * 2 + held) * NUM_SUSPECTS + suspects) * NUM_WEAPONS
+            + weapons) * NUM_ROOMS + rooms
+
+
+class OpeningBook:
+    """Read-only, memory-mapped opening book."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, length = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} opening book")
+        header = json.loads(self._map[HEADER.size:HEADER.size + length])
+        self.path = path
+        self.playouts = header['playouts']
+        self.shapes = {(hand_size, tuple(sizes)): i for i, (hand_size, sizes) in enumerate(header['shapes'])}
+        self._offset = _records_offset(length)
+        if len(self._map) < self._offset + len(self.shapes) * SHAPE_SLOTS * RECORD.size:
+            self._map.close()
+            raise ValueError(f"{path} is truncated")
+
+    def lookup(self, rules, room, hand, opponent_sizes):
+        """((suspect kind, weapon kind), value) of the best first suggestion, or None."""
+        shape = self.shapes.get((len(hand), tuple(opponent_sizes)))
+        if shape is None:
+            return None
+        index = slot(shape, *canonical_hand(rules, room, hand))
+        code, value, _, _ = RECORD.unpack_from(self._map, self._offset + index * RECORD.size)
+        if not code:
+            return None
+        return SUGGESTION_KINDS[code], value / VALUE_SCALE
+
+    def close(self):
+        self._map.close()
+
+
+def _records_offset(header_length):
+    # Records start 8-byte aligned after the header
+    return (HEADER.size + header_length + 7) // 8 * 8
+
+
+_book = None
+_book_path = None
+_book_lock = threading.Lock()
+
+
+def opening_book(path=None):
+    """The book at ``path`` or $CLUE_OPENING_BOOK, opened once per process (None if unset)."""
+    global _book, _book_path
+    path = path or os.environ.get('CLUE_OPENING_BOOK')
+    if not path:
+        return None
+    if path == _book_path:
+        return _book
+    with _book_lock:
+        if path != _book_path:
+            try:
+                book = OpeningBook(path)
+            except (OSError, ValueError) as error:
+                logger.warning("Opening book not loaded: %s", error)
+                book = None
+            _book, _book_path = book, path
+    return _book
+
+
+def lookup_seat(engine, ai_index):
+    """The book's first suggestion for an AI seat where it stands, or None."""
+    book = opening_book()
+    if book is None:
+        return None
+    return book.lookup(engine, engine.ai_locations[ai_index], engine.ai_hands[ai_index],
+                       opponent_hand_sizes(engine, ai_index))
+
+
+def game_shapes():
+    """(hand size, opponents' hand sizes) for every seat of every game the app or simulator deals."""
+    from src.clue_game.engine.game_logic import ClueEngine
+    shapes = set()
+    for human_player, seats in ((True, range(1, 6)), (False, range(2, 7))):
+        for num_ai in seats:
+            engine = ClueEngine(num_ai=num_ai, human_player=human_player, seed=0)
+            for ai_index in range(num_ai):
+                shapes.add((len(engine.ai_hands[ai_index]), tuple(opponent_hand_sizes(engine, ai_index))))
+    return sorted(shapes)
+
+
+def _hand_classes(hand_size):
+    for held in (0, 1):
+        for suspects in range(NUM_SUSPECTS):
+            for weapons in range(NUM_WEAPONS):
+                rooms = hand_size - held - suspects - weapons
+                # One card of each kind is in the envelope
+                if 0 <= rooms and held + rooms < NUM_ROOMS:
+                    yield held, suspects, weapons, rooms
+
+
+def _sample_hand(rules, room, held, suspects, weapons, rooms, rng):
+    others = [other for other in rules.ROOMS if other != room]
+    return (rng.sample(rules.SUSPECTS, suspects) + rng.sample(rules.WEAPONS, weapons) +
+            rng.sample(others, rooms) + ([room] if held else []))
+
+
+def _rollout(board, root, action, rng):
+    """(value, information gain) of one playout starting with ``action``."""
+    hands = board.sample_deal(root, rng)
+    state = board.step(root, action, hands, rng)
+    gain = board.entropy(root) - board.entropy(state)
+    turns = 1
+    while not board.solved(state) and turns < HORIZON:
+        state = board.step(state, board.playout_action(state, rng), hands, rng)
+        turns += 1
+    return (DISCOUNT ** turns if board.solved(state) else 0.0), gain
+
+
+def _evaluate(task):
+    """Records for every canonical hand of one shape and room."""
+    from src.clue_game.engine.game_logic import ClueEngine
+    shape, (hand_size, sizes), room, playouts, seed = task
+    room_name = ClueEngine.ROOMS[room]
+    records = []
+    for held, suspects, weapons, rooms in _hand_classes(hand_size):
+        rng = random.Random(f"{seed}:{shape}:{room}:{held}:{suspects}:{weapons}:{rooms}")
+        totals = {}  # kinds -> [total value, total gain]
+        for _ in range(playouts):
+            # A fresh hand of the class each time, so rooms held average out
+            hand = _sample_hand(ClueEngine, room_name, held, suspects, weapons, rooms, rng)
+            board = Board(ClueEngine, hand, sizes)
+            root = (room_name, board.hand, frozenset())
+            for action in board.actions(root):
+                if action[0] == 'suggest':
+                    value, gain = _rollout(board, root, action, rng)
+                    total = totals.setdefault(action[1:], [0.0, 0.0])
+                    total[0] += value
+                    total[1] += gain
+        kinds = max(totals, key=lambda kinds: totals[kinds][0] + INFO_WEIGHT * totals[kinds][1])
+        value, gain = (total / playouts for total in totals[kinds])
+        records.append((slot(shape, room, held, suspects, weapons, rooms),
+                        RECORD.pack(SUGGESTION_KINDS.index(kinds), round(value * VALUE_SCALE),
+                                    min(65535, round(gain * GAIN_SCALE)), min(65535, playouts))))
+    return records
+
+
+def build(path, playouts=200, workers=None, seed=0):
+    """Write a book to ``path``; returns the number of filled slots."""
+    from src.clue_game.engine.game_logic import ClueEngine
+    shapes = game_shapes()
+    header = json.dumps({'shapes': shapes, 'rooms': ClueEngine.ROOMS, 'playouts': playouts}).encode()
+    offset = _records_offset(len(header))
+    table = bytearray(offset + len(shapes) * SHAPE_SLOTS * RECORD.size)
+    HEADER.pack_into(table, 0, MAGIC, VERSION, len(header))
+    table[HEADER.size:HEADER.size + len(header)] = header
+
+    tasks = [(shape, shapes[shape], room, playouts, seed)
+             for shape in range(len(shapes)) for room in range(NUM_ROOMS)]
+    filled = 0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for records in pool.map(_evaluate, tasks):
+            for index, record in records:
+                table[offset + index * RECORD.size:offset + (index + 1) * RECORD.size] = record
+                filled += 1
+    # Workers may have the old book mapped: replace it rather than write into it
+    partial = f"{path}.{os.getpid()}.tmp"
+    with open(partial, 'wb') as f:
+        f.write(table)
+    os.replace(partial, path)
+    return filled
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the opening book of best first suggestions.")
+    parser.add_argument("path", help="book file to write (CLUE_OPENING_BOOK)")
+    parser.add_argument("--playouts", type=int, default=200, help="playouts per suggestion and hand")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    filled = build(args.path, args.playouts, args.workers, args.seed)
+    print(f"{filled} positions in {len(game_shapes())} game shapes, "
+          f"{os.path.getsize(args.path) / 1024:.0f} KiB, in {time.perf_counter() - start:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+class PersistentLog:
+    """An append-only list whose copies and rollbacks share every entry.
+
+    Entries are kept as a linked list from newest to oldest, so appending,
+    copying, taking a version and restoring one are all O(1), and reading
+    the newest k entries (``log[-k:]``, ``log[since:]``) is O(k). Used for
+    game logs and histories that undo, redo and fork must not copy.
+    """
+    __slots__ = ('_head', '_length')
+
+    def __init__(self, items=()):
+        self._head = None
+        self._length = 0
+        for item in items:
+            self.append(item)
+
+    def append(self, item):
+        self._head = (item, self._head)
+        self._length += 1
+
+    def __len__(self):
+        return self._length
+
+    def _newest(self, count):
+        """The newest ``count`` entries, oldest first."""
+        items = []
+        node = self._head
+        while node is not None and len(items) < count:
+            items.append(node[0])
+            node = node[1]
+        items.reverse()
+        return items
+
+    def __iter__(self):
+        return iter(self._newest(self._length))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if stop <= start:
+                return []
+            return self._newest(self._length - start)[:stop - start:step]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("log index out of range")
+        return self._newest(self._length - index)[0]
+
+    def version(self):
+        """An opaque, immutable token for the current contents."""
+        return self._head, self._length
+
+    def restore(self, version):
+        """Roll back (or forward) to contents returned by ``version()``."""
+        self._head, self._length = version
+
+    def copy(self):
+        """An independent log that starts with the same entries."""
+        log = PersistentLog()
+        log.restore(self.version())
+        return log
@@ -0,0 +1,219 @@
+"""
+Anytime Monte Carlo search for the Hard AI (strategies.MonteCarloStrategy).
+
+The AI's information state is its room, the cards it knows are not in the
+envelope (its hand plus cards it was shown) and the cards it has proved are
+in it. Each iteration samples a deal of the hidden cards consistent with
+that state, walks the search tree with UCB1, then plays the rest of the
+game out with a cheap deductive policy. A playout is worth
+``DISCOUNT ** turns`` once the envelope is pinned down, as a stand-in for
+the chance of accusing before an opponent does. Suggestions also record how
+much they shrink the set of possible envelopes (information gain), which
+breaks ties between equally fast plans.
+
+Nodes are keyed by information state in a table the strategy keeps between
+turns, so the statistics gathered for a position are reused when the game
+gets there. Knowledge only grows, so nodes that know less than the current
+position can never be reached again and are pruned.
+"""
+
+import math
+import time
+
+DISCOUNT = 0.85        # Solving a turn later gives every opponent another turn
+EXPLORATION = 0.7
+HORIZON = 16           # Own turns simulated before a playout counts as a loss
+INFO_WEIGHT = 0.05     # Weight of information gain (in bits) against win value
+MAX_NODES = 50000
+
+
+def candidates(cards, known, solved):
+    """Cards of one category that may still be in the envelope."""
+    proved = [card for card in cards if card in solved]
+    if proved:
+        return proved
+    return [card for card in cards if card not in known]
+
+
+def opponent_hand_sizes(engine, ai_index):
+    """Hand sizes of an AI seat's opponents, in the order they are asked to disprove."""
+    return [len(engine.player_hand) if seat == engine.HUMAN_SEAT else len(engine.ai_hands[seat - 1])
+            for seat in engine.turns.disproval_order(ai_index + 1)]
+
+
+def eliminated_cards(engine):
+    """Cards of seats out of the game, shown to everyone and held by nobody still playing."""
+    return [card for seat in engine.turns.eliminated
+            for card in (engine.player_hand if seat == engine.HUMAN_SEAT else engine.ai_hands[seat - 1])]
+
+
+class Board:
+    """Fixed facts of one AI seat's game that the search needs.
+
+    ``rules`` is a ClueEngine (or the class itself) for the cards and map.
+    ``out`` are cards out of play (eliminated seats' hands), dealt to no one.
+    """
+
+    def __init__(self, rules, hand, opponent_hand_sizes, out=()):
+        self.map = rules.MANSION_MAP
+        self.distances = rules.ROOM_DISTANCES
+        self.categories = (rules.SUSPECTS, rules.WEAPONS, rules.ROOMS)
+        self.all_cards = rules.ALL_CARDS
+        self.hand = frozenset(hand)
+        self.opponent_hand_sizes = list(opponent_hand_sizes)
+        self.out = frozenset(out)
+        # One card per category from our own hand lets a suggestion test the other two alone
+        self.blanks = [next((card for card in cards if card in self.hand), None) for cards in self.categories]
+
+    def open_cards(self, state):
+        _, known, solved = state
+        return [candidates(cards, known, solved) for cards in self.categories]
+
+    def solved(self, state):
+        return all(len(cards) == 1 for cards in self.open_cards(state))
+
+    def entropy(self, state):
+        """Bits of uncertainty left about the envelope."""
+        return sum(math.log2(len(cards)) for cards in self.open_cards(state))
+
+    def actions(self, state):
+        """Moves to each neighbor, and suggestions by kind of card per category.
+
+        A suggestion names, for suspect and weapon, either an ``open`` card
+        (still possibly in the envelope) or a ``blank`` from our own hand that
+        lets the other cards be tested alone. Which open card is used makes no
+        difference to the search, so it is picked at random when played.
+        """
+        room = state[0]
+        open_cards = self.open_cards(state)
+        kinds = [('open', 'blank') if len(open_cards[i]) > 1 and self.blanks[i] else ('open',) for i in (0, 1)]
+        return ([('move', neighbor) for neighbor in self.map[room]] +
+                [('suggest', suspect, weapon) for suspect in kinds[0] for weapon in kinds[1]])
+
+    def suggestion(self, state, action, rng):
+        """Concrete (suspect, weapon) for a suggestion action."""
+        open_cards = self.open_cards(state)
+        return tuple(self.blanks[i] if action[i + 1] == 'blank' else rng.choice(open_cards[i]) for i in (0, 1))
+
+    def sample_deal(self, state, rng):
+        """Opponents' hands for one envelope consistent with what we know."""
+        envelope = {rng.choice(cards) for cards in self.open_cards(state)}
+        hidden = [card for card in self.all_cards
+                  if card not in self.hand and card not in self.out and card not in envelope]
+        rng.shuffle(hidden)
+        hands = []
+        start = 0
+        for size in self.opponent_hand_sizes:
+            hands.append(frozenset(hidden[start:start + size]))
+            start += size
+        return hands
+
+    def step(self, state, action, hands, rng):
+        """Information state after taking an action against a sampled deal."""
+        room, known, solved = state
+        if action[0] == 'move':
+            return action[1], known, solved
+        cards = self.suggestion(state, action, rng) + (room,)
+        for hand in hands:
+            shown = [card for card in cards if card in hand]
+            if shown:
+                return room, known | {rng.choice(shown)}, solved
+        # Nobody could disprove: whatever isn't ours or out of play is in the envelope
+        return room, known, solved | {card for card in cards if card not in self.hand and card not in self.out}
+
+    def playout_action(self, state, rng):
+        """Cheap default policy: suggest in open rooms, otherwise head for the nearest one."""
+        room = state[0]
+        suspects, weapons, rooms = self.open_cards(state)
+        if room in rooms or len(rooms) == 1:
+            return 'suggest', 'open', 'open'
+        return 'move', min(self.map[room], key=lambda neighbor: min(self.distances[neighbor][r] for r in rooms))
+
+
+class Node:
+    """Visit statistics for one information state."""
+    __slots__ = ('visits', 'untried', 'stats')
+
+    def __init__(self, actions, rng):
+        self.visits = 0
+        self.untried = list(actions)
+        rng.shuffle(self.untried)
+        self.stats = {}  # action -> [visits, total value, total information gain]
+
+    def select(self):
+        log_visits = math.log(self.visits)
+        return max(self.stats, key=lambda action: (
+            self.stats[action][1] / self.stats[action][0] +
+            EXPLORATION * math.sqrt(log_visits / self.stats[action][0])))
+
+
+class SearchTree:
+    """Transposition table of Nodes, kept by one AI seat for the whole game."""
+
+    def __init__(self):
+        self.nodes = {}
+        self._pruned_for = None
+
+    def prune(self, state):
+        _, known, solved = state
+        if self._pruned_for == (known, solved) and len(self.nodes) <= MAX_NODES:
+            return
+        if len(self.nodes) > MAX_NODES:
+            self.nodes = {}
+        else:
+            self.nodes = {key: node for key, node in self.nodes.items()
+                          if key[1] >= known and key[2] >= solved}
+        self._pruned_for = (known, solved)
+
+    def _iterate(self, board, root, rng):
+        hands = board.sample_deal(root, rng)
+        path = []
+        state = root
+        turns = 0
+        # Selection and expansion: follow the tree until a new action is tried
+        while not board.solved(state) and turns < HORIZON:
+            node = self.nodes.get(state)
+            if node is None:
+                node = self.nodes[state] = Node(board.actions(state), rng)
+            if node.untried:
+                action = node.untried.pop()
+                node.stats[action] = [0, 0.0, 0.0]
+            else:
+                action = node.select()
+            before = board.entropy(state)
+            state = board.step(state, action, hands, rng)
+            turns += 1
+            path.append((node, action, before - board.entropy(state)))
+            if node.stats[action][0] == 0:
+                break
+        # Playout with the default policy
+        while not board.solved(state) and turns < HORIZON:
+            state = board.step(state, board.playout_action(state, rng), hands, rng)
+            turns += 1
+        value = DISCOUNT ** turns if board.solved(state) else 0.0
+        for node, action, gain in path:
+            node.visits += 1
+            stats = node.stats[action]
+            stats[0] += 1
+            stats[1] += value
+            stats[2] += gain
+
+    def search(self, board, root, rng, max_iterations, deadline=None):
+        """Run until ``max_iterations`` or ``deadline``.
+
+        Returns (best action, its estimated value, iterations run); the value
+        is on the same scale as ``DISCOUNT ** turns`` for a win.
+        """
+        self.prune(root)
+        iterations = 0
+        while iterations < max_iterations:
+            if deadline is not None and iterations and time.perf_counter() >= deadline:
+                break
+            self._iterate(board, root, rng)
+            iterations += 1
+
+        stats = self.nodes[root].stats
+        best = max(stats, key=lambda action: (
+            stats[action][1] / stats[action][0] + INFO_WEIGHT * stats[action][2] / stats[action][0],
+            stats[action][0]))
+        return best, stats[best][1] / stats[best][0], iterations
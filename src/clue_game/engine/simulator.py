@@ -0,0 +1,56 @@
+from src.clue_game.engine.game_logic import ClueEngine
+
+
+def simulate_game(strategies, seed=None, max_rounds=200):
+    """Play one all-AI game headlessly and return the outcome.
+
+    ``strategies`` holds one AIStrategy instance per seat, in seat order.
+    Returns a finished-game record (see src/clue_game/analytics/store.py):
+    the winning seat (or None if every seat was eliminated or the round
+    limit was hit), turns played, and the setup and counts behind them.
+    """
+    engine = ClueEngine(num_ai=len(strategies), strategies=strategies, human_player=False, seed=seed)
+    stats = {
+        'seed': engine.seed,
+        'human': False,
+        'characters': list(engine.ai_characters),
+        'strategies': [strategy.name for strategy in engine.ai_strategies],
+        'envelope': dict(engine.secret_envelope),
+        'winner': None,
+        'turns': 0,
+        'suggestions': 0,
+        'disprovals': 0,
+        'accusations': 0,
+    }
+
+    for _ in range(max_rounds):
+        for seat in engine.turns.round():
+            ai_index = seat - 1
+            stats['turns'] += 1
+
+            if engine.choose_ai_action(ai_index) == "move":
+                engine.get_ai_move(ai_index)
+            else:
+                suggestion = engine.make_ai_suggestion(ai_index)
+                stats['suggestions'] += 1
+                # Disproval passes around the table starting after the suggester
+                card = None
+                for other in engine.turns.disproval_order(seat):
+                    card = engine.check_ai_can_disprove(suggestion, other - 1)
+                    if card:
+                        stats['disprovals'] += 1
+                        break
+                engine.record_suggestion_result(ai_index, suggestion, card)
+
+            accusation = engine.make_ai_accusation(ai_index)
+            if accusation:
+                stats['accusations'] += 1
+                result = engine.make_accusation(accusation['suspect'], accusation['weapon'], accusation['room'])
+                if result['correct']:
+                    stats['winner'] = ai_index
+                    return stats
+                engine.eliminate_ai(ai_index)
+                if not engine.turns:
+                    return stats
+
+    return stats
@@ -0,0 +1,281 @@
+import random
+import time
+
+from src.clue_game.engine.opening_book import lookup_seat
+from src.clue_game.engine.search import DISCOUNT, Board, SearchTree, eliminated_cards, opponent_hand_sizes
+
+
+class AIStrategy:
+    """Decision hooks ClueEngine calls for one AI seat.
+
+    Every hook receives the engine and the AI's index so a strategy can read
+    the board, its own hand and what it has been shown so far
+    (``engine.ai_known_cards[ai_index]``). One instance is created per seat,
+    so strategies may keep private state between turns. All randomness must
+    come from ``engine.rng`` to keep games reproducible from their seed.
+    """
+    name = "base"
+
+    def choose_action(self, engine, ai_index):
+        """Return "move" or "suggest" for this turn."""
+        return "move" if engine.rng.random() < 0.5 else "suggest"
+
+    def choose_move(self, engine, ai_index):
+        """Return the adjacent room to move to."""
+        return engine.rng.choice(engine.MANSION_MAP[engine.ai_locations[ai_index]])
+
+    def choose_suggestion(self, engine, ai_index):
+        """Return (suspect, weapon) to suggest in the current room."""
+        ai_hand = engine.ai_hands[ai_index]
+        possible_suspects = [s for s in engine.SUSPECTS if s not in ai_hand]
+        possible_weapons = [w for w in engine.WEAPONS if w not in ai_hand]
+        suspect = engine.rng.choice(possible_suspects) if possible_suspects else engine.rng.choice(engine.SUSPECTS)
+        weapon = engine.rng.choice(possible_weapons) if possible_weapons else engine.rng.choice(engine.WEAPONS)
+        return suspect, weapon
+
+    def choose_card_to_show(self, engine, ai_index, suggestion, cards):
+        """Return which of the matching cards to reveal (cards is never empty)."""
+        return cards[0]
+
+    def observe_suggestion_result(self, engine, ai_index, suggestion, card):
+        """Called after this AI's suggestion; card is None if nobody could disprove it."""
+
+    def get_state(self):
+        """Private state to save for undo, as immutable values."""
+        return None
+
+    def set_state(self, state):
+        """Return to a state from get_state; called on undo, redo and fork."""
+
+    def choose_accusation(self, engine, ai_index):
+        """Return an accusation dict (suspect, weapon, room) or None to pass."""
+        # Random accusation 10% of the time (simple strategy)
+        if engine.rng.random() >= 0.1:
+            return None
+        ai_hand = engine.ai_hands[ai_index]
+        possible_suspects = [s for s in engine.SUSPECTS if s not in ai_hand]
+        possible_weapons = [w for w in engine.WEAPONS if w not in ai_hand]
+        possible_rooms = [r for r in engine.ROOMS if r not in ai_hand]
+        return {
+            'suspect': engine.rng.choice(possible_suspects) if possible_suspects else engine.rng.choice(engine.SUSPECTS),
+            'weapon': engine.rng.choice(possible_weapons) if possible_weapons else engine.rng.choice(engine.WEAPONS),
+            'room': engine.rng.choice(possible_rooms) if possible_rooms else engine.rng.choice(engine.ROOMS),
+        }
+
+
+class ExplorerStrategy(AIStrategy):
+    """Explorer AI - prefers rooms no AI is standing in."""
+    name = "explorer"
+
+    def choose_move(self, engine, ai_index):
+        possible = engine.MANSION_MAP[engine.ai_locations[ai_index]]
+        unvisited = [room for room in possible if room not in engine.ai_locations]
+        return engine.rng.choice(unvisited or possible)
+
+
+class StrategicStrategy(AIStrategy):
+    """Strategic AI - prefers rooms with more connections."""
+    name = "strategic"
+
+    def choose_move(self, engine, ai_index):
+        possible = engine.MANSION_MAP[engine.ai_locations[ai_index]]
+        return max(possible, key=engine.ROOM_CONNECTIONS.get)
+
+
+class WandererStrategy(AIStrategy):
+    """Random AI with slight preference for current room's neighbors."""
+    name = "wanderer"
+
+    def choose_move(self, engine, ai_index):
+        current = engine.ai_locations[ai_index]
+        possible = engine.MANSION_MAP[current]
+        weights = [1.2 if room != current else 1.0 for room in possible]
+        return engine.rng.choices(possible, weights=weights)[0]
+
+
+class DeductiveStrategy(AIStrategy):
+    """Tracks seen cards, suggests only unknowns and accuses once certain."""
+    name = "deductive"
+
+    def __init__(self):
+        # Frozensets, replaced rather than mutated, so saved states can share them
+        self.shown = frozenset()  # Cards already revealed by this seat
+        self.solved = frozenset()  # Cards proven to be in the envelope
+
+    def get_state(self):
+        return self.shown, self.solved
+
+    def set_state(self, state):
+        self.shown, self.solved = state
+
+    def _unknown(self, engine, ai_index, cards):
+        solved = [card for card in cards if card in self.solved]
+        if solved:
+            return solved
+        known = engine.ai_known_cards[ai_index]
+        return [card for card in cards if card not in known]
+
+    def _opening(self, engine, ai_index):
+        """The opening book's (kinds, value) while this seat knows only its own hand, else None."""
+        if self.solved or len(engine.ai_known_cards[ai_index]) != len(engine.ai_hands[ai_index]):
+            return None
+        return lookup_seat(engine, ai_index)
+
+    def observe_suggestion_result(self, engine, ai_index, suggestion, card):
+        if card is None:
+            # Nobody still playing holds these, so any that aren't ours or an
+            # eliminated seat's (never asked any more) are in the envelope
+            held = set(engine.ai_hands[ai_index]) | set(eliminated_cards(engine))
+            self.solved |= {suggestion[key] for key in ("suspect", "weapon", "room")
+                            if suggestion[key] not in held}
+
+    def choose_action(self, engine, ai_index):
+        room = engine.ai_locations[ai_index]
+        if room in self._unknown(engine, ai_index, engine.ROOMS):
+            return "suggest"
+        # Nothing to learn about this room, but suspects/weapons may still be open
+        if not self._unknown(engine, ai_index, engine.ROOMS):
+            return "suggest"
+        return "move"
+
+    def choose_move(self, engine, ai_index):
+        current = engine.ai_locations[ai_index]
+        targets = self._unknown(engine, ai_index, engine.ROOMS) or engine.ROOMS
+        # Step to the neighbor closest to any room still in question
+        return min(engine.MANSION_MAP[current],
+                   key=lambda room: min(engine.ROOM_DISTANCES[room][t] for t in targets))
+
+    def choose_suggestion(self, engine, ai_index):
+        suspects = self._unknown(engine, ai_index, engine.SUSPECTS)
+        weapons = self._unknown(engine, ai_index, engine.WEAPONS)
+        opening = self._opening(engine, ai_index)
+        if opening is not None:
+            # A "blank" names a card of our own, so the suggestion tests the others alone
+            hand = engine.ai_hands[ai_index]
+            return tuple(next(card for card in cards if card in hand) if kind == 'blank'
+                         else engine.rng.choice(open_cards or cards)
+                         for kind, open_cards, cards in zip(opening[0], (suspects, weapons),
+                                                            (engine.SUSPECTS, engine.WEAPONS)))
+        return engine.rng.choice(suspects or engine.SUSPECTS), engine.rng.choice(weapons or engine.WEAPONS)
+
+    def choose_card_to_show(self, engine, ai_index, suggestion, cards):
+        # Re-showing a card leaks nothing new to the rest of the table
+        for card in cards:
+            if card in self.shown:
+                return card
+        card = engine.rng.choice(cards)
+        self.shown |= {card}
+        return card
+
+    def choose_accusation(self, engine, ai_index):
+        suspects = self._unknown(engine, ai_index, engine.SUSPECTS)
+        weapons = self._unknown(engine, ai_index, engine.WEAPONS)
+        rooms = self._unknown(engine, ai_index, engine.ROOMS)
+        if len(suspects) == len(weapons) == len(rooms) == 1:
+            return {'suspect': suspects[0], 'weapon': weapons[0], 'room': rooms[0]}
+        return None
+
+
+class MonteCarloStrategy(DeductiveStrategy):
+    """Hard AI - plans each turn with time-budgeted Monte Carlo search (see search.py)."""
+    name = "montecarlo"
+
+    def __init__(self, budget_ms=20, max_iterations=2000):
+        super().__init__()
+        self.budget_ms = budget_ms
+        self.max_iterations = max_iterations
+        self.tree = SearchTree()  # Kept across turns so earlier search is reused
+        self.board = None
+        self.board_eliminated = None  # engine.turns.eliminated when the board was built
+        self.plan = None
+        self.plan_value = None  # Search's estimate of winning by following the plan
+
+    def set_state(self, state):
+        super().set_state(state)
+        # Search statistics depend on the path that led here, so a restored
+        # or forked game starts a fresh tree (and replays identically)
+        self.tree = SearchTree()
+        self.plan = None
+        self.plan_value = None
+
+    def _state(self, engine, ai_index):
+        return (engine.ai_locations[ai_index], frozenset(engine.ai_known_cards[ai_index]),
+                frozenset(self.solved))
+
+    def _board(self, engine, ai_index):
+        # Rebuilt when seats go out (or come back on undo): eliminated seats are dealt
+        # no cards in the search's deals and never disprove
+        if self.board is None or self.board_eliminated != engine.turns.eliminated:
+            self.board = Board(engine, engine.ai_hands[ai_index], opponent_hand_sizes(engine, ai_index),
+                               eliminated_cards(engine))
+            self.board_eliminated = engine.turns.eliminated
+        return self.board
+
+    def _search(self, engine, ai_index):
+        self._board(engine, ai_index)
+        state = self._state(engine, ai_index)
+        if self.board.solved(state):
+            return None
+        # One draw from the game's generator keeps the game reproducible from its seed
+        rng = random.Random(engine.rng.getrandbits(64))
+        if engine.replay_search_iterations:
+            # Replays repeat the original search exactly instead of racing the clock
+            # (at least one, and never past this strategy's own cap: records can come from clients)
+            iterations = max(1, min(engine.replay_search_iterations.popleft(), self.max_iterations))
+            deadline = None
+        else:
+            iterations, deadline = self.max_iterations, time.perf_counter() + self.budget_ms / 1000
+        action, self.plan_value, done = self.tree.search(self.board, state, rng, iterations, deadline)
+        engine.search_iterations.append(done)
+        return action
+
+    def choose_action(self, engine, ai_index):
+        self.plan_value = None
+        opening = self._opening(engine, ai_index)
+        if opening is not None:
+            # The book already knows the first suggestion here and what it is worth
+            self._board(engine, ai_index)
+            self.plan, self.plan_value = None, opening[1]
+            return super().choose_action(engine, ai_index)
+        self.plan = self._search(engine, ai_index)
+        if self.plan is None:
+            return super().choose_action(engine, ai_index)
+        return self.plan[0]
+
+    def choose_move(self, engine, ai_index):
+        plan, self.plan = self.plan, None
+        if plan and plan[0] == "move":
+            return plan[1]
+        return super().choose_move(engine, ai_index)
+
+    def choose_suggestion(self, engine, ai_index):
+        plan, self.plan = self.plan, None
+        if plan and plan[0] == "suggest":
+            return self.board.suggestion(self._state(engine, ai_index), plan, engine.rng)
+        return super().choose_suggestion(engine, ai_index)
+
+    def choose_accusation(self, engine, ai_index):
+        accusation = super().choose_accusation(engine, ai_index)
+        if accusation or self.plan_value is None:
+            return accusation
+        suspects, weapons, rooms = self.board.open_cards(self._state(engine, ai_index))
+        # Guess now when a blind pick beats the search's odds of winning the slow way
+        if DISCOUNT / (len(suspects) * len(weapons) * len(rooms)) > self.plan_value:
+            return {'suspect': engine.rng.choice(suspects), 'weapon': engine.rng.choice(weapons),
+                    'room': engine.rng.choice(rooms)}
+        return None
+
+
+STRATEGIES = {
+    cls.name: cls for cls in (ExplorerStrategy, StrategicStrategy, WandererStrategy, DeductiveStrategy,
+                              MonteCarloStrategy)
+}
+
+# Personalities assigned by seat when no strategies are given, for variety
+DEFAULT_ROTATION = (ExplorerStrategy, StrategicStrategy, WandererStrategy)
+
+
+def default_strategy(ai_index, difficulty="Medium"):
+    if difficulty == "Hard":
+        return MonteCarloStrategy()
+    return DEFAULT_ROTATION[ai_index % len(DEFAULT_ROTATION)]()
@@ -0,0 +1,165 @@
+"""
+Round-robin tournament runner for AI strategies.
+
+Plays headless games (see simulator.py) for every seat permutation of the
+chosen strategies across all CPU cores, then reports win rates with Wilson
+95% intervals and Bradley-Terry Elo ratings with bootstrap intervals.
+
+    python -m src.clue_game.engine.tournament deductive explorer strategic --seats 3 --games 200
+"""
+
+import argparse
+import itertools
+import math
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from src.clue_game.analytics.store import flush_finished_games, record_finished_game
+from src.clue_game.engine.game_logic import ClueEngine
+from src.clue_game.engine.simulator import simulate_game
+from src.clue_game.engine.strategies import STRATEGIES
+
+
+def seat_assignments(names, seats):
+    """Every ordering of strategies onto seats in which each strategy plays."""
+    if seats <= len(names):
+        return list(itertools.permutations(names, seats))
+    return [combo for combo in itertools.product(names, repeat=seats) if set(combo) == set(names)]
+
+
+def _play(task):
+    assignment, seed = task
+    result = simulate_game([STRATEGIES[name]() for name in assignment], seed=seed)
+    winner = assignment[result['winner']] if result['winner'] is not None else None
+    return assignment, winner, result
+
+
+def wilson_interval(wins, n, z=1.96):
+    """95% Wilson score interval for a win proportion."""
+    if n == 0:
+        return 0.0, 0.0
+    p = wins / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def _pairwise(results):
+    """Count wins[a][b]: games where strategy a won with b seated at the table."""
+    wins = Counter()
+    for assignment, winner, _ in results:
+        if winner is None:
+            continue
+        for loser in set(assignment) - {winner}:
+            wins[winner, loser] += 1
+    return wins
+
+
+def bradley_terry_elo(names, wins, iterations=200):
+    """Fit Bradley-Terry strengths by MM iteration and map them to Elo (mean 1500)."""
+    strength = {name: 1.0 for name in names}
+    for _ in range(iterations):
+        updated = {}
+        for a in names:
+            total_wins = sum(wins[a, b] for b in names if b != a)
+            denom = sum((wins[a, b] + wins[b, a]) / (strength[a] + strength[b])
+                        for b in names if b != a)
+            # Half a virtual win against a strength-1 opponent keeps ratings finite
+            updated[a] = (total_wins + 0.5) / (denom + 1.0 / (strength[a] + 1.0))
+        mean_log = sum(math.log(v) for v in updated.values()) / len(names)
+        strength = {a: v / math.exp(mean_log) for a, v in updated.items()}
+    return {a: 1500 + 400 * math.log10(strength[a]) for a in names}
+
+
+def run_tournament(names, seats=3, games_per_assignment=100, workers=None, seed=0):
+    """Play every seat assignment ``games_per_assignment`` times in parallel."""
+    tasks = []
+    rng = random.Random(seed)
+    for assignment in seat_assignments(names, seats):
+        for _ in range(games_per_assignment):
+            tasks.append((assignment, rng.getrandbits(63)))
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_play, tasks, chunksize=chunksize))
+
+
+def summarize(names, results, bootstrap=200, seed=0):
+    """Per-strategy win rates (with Wilson CI) and Elo (with bootstrap CI)."""
+    played = Counter()
+    won = Counter()
+    for assignment, winner, _ in results:
+        for name in assignment:
+            played[name] += 1
+        if winner is not None:
+            won[winner] += 1
+
+    elo = bradley_terry_elo(names, _pairwise(results))
+    rng = random.Random(seed)
+    samples = {name: [] for name in names}
+    for _ in range(bootstrap):
+        resample = [results[rng.randrange(len(results))] for _ in results]
+        for name, rating in bradley_terry_elo(names, _pairwise(resample), iterations=50).items():
+            samples[name].append(rating)
+
+    summary = []
+    for name in names:
+        ratings = sorted(samples[name])
+        low = ratings[int(0.025 * len(ratings))] if ratings else elo[name]
+        high = ratings[int(0.975 * len(ratings)) - 1] if ratings else elo[name]
+        summary.append({
+            'strategy': name,
+            'seats_played': played[name],
+            'wins': won[name],
+            'win_rate': won[name] / played[name] if played[name] else 0.0,
+            'win_rate_ci': wilson_interval(won[name], played[name]),
+            'elo': elo[name],
+            'elo_ci': (low, high),
+        })
+    return sorted(summary, key=lambda row: row['elo'], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare AI strategies in a round-robin tournament.")
+    parser.add_argument("strategies", nargs="*", default=sorted(STRATEGIES),
+                        help=f"strategy names (default: all of {', '.join(sorted(STRATEGIES))})")
+    parser.add_argument("--seats", type=int, default=3, help="players per game (2-6)")
+    parser.add_argument("--games", type=int, default=100, help="games per seat assignment")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--bootstrap", type=int, default=200, help="resamples for the Elo interval")
+    parser.add_argument("--analytics-dir", default=None,
+                        help="also append every game record to this columnar store")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.strategies if name not in STRATEGIES]
+    if unknown:
+        parser.error(f"unknown strategies: {', '.join(unknown)}")
+    if not 2 <= args.seats <= len(ClueEngine.SUSPECTS):
+        parser.error(f"--seats must be between 2 and {len(ClueEngine.SUSPECTS)}")
+
+    start = time.perf_counter()
+    results = run_tournament(args.strategies, args.seats, args.games, args.workers, args.seed)
+    elapsed = time.perf_counter() - start
+    if args.analytics_dir:
+        for _, _, record in results:
+            record_finished_game(record, args.analytics_dir)
+        flush_finished_games()
+    no_winner = sum(1 for _, winner, _ in results if winner is None)
+    print(f"{len(results)} games in {elapsed:.1f}s ({no_winner} without a winner)")
+    print(f"{'strategy':<12} {'seats':>6} {'wins':>6} {'win rate':>18} {'elo':>16}")
+    for row in summarize(args.strategies, results, args.bootstrap, args.seed):
+        lo, hi = row['win_rate_ci']
+        elo_lo, elo_hi = row['elo_ci']
+        print(f"{row['strategy']:<12} {row['seats_played']:>6} {row['wins']:>6} "
+              f"{row['win_rate']:>6.1%} [{lo:.1%}, {hi:.1%}] "
+              f"{row['elo']:>5.0f} [{elo_lo:.0f}, {elo_hi:.0f}]")
+
+
+if __name__ == "__main__":
+    main()
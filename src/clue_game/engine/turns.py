@@ -0,0 +1,93 @@
+"""
+Turn order: the seats still playing, linked in a circle.
+
+Seats use the web game's numbers: 0 is the human (when there is one) and
+n is AI_n, the AI at index n - 1. Each active seat links to the next and
+previous active seats, so finding who plays next and eliminating a seat
+are O(1) however many seats there are, and eliminated seats are never
+visited again. An eliminated seat keeps its forward link, so the turn can
+still pass on from a seat eliminated during its own turn.
+
+Disproval orders (who is asked, in turn, to disprove each seat's
+suggestion) are worked out once per seat and cached until the next
+elimination. They run clockwise from the suggester over active seats,
+except that a ``lead`` seat (the web game's human) is asked first on
+everyone else's suggestions.
+"""
+
+
+class SeatRing:
+    """Active seats in turn order; see the module docstring."""
+
+    def __init__(self, seats, lead=None, eliminated=()):
+        self.seats = tuple(seats)
+        self.lead = lead
+        self.eliminated = ()  # In the order they went out; immutable, for saved states
+        self._position = {seat: i for i, seat in enumerate(self.seats)}
+        count = len(self.seats)
+        self._next = {seat: self.seats[(i + 1) % count] for i, seat in enumerate(self.seats)}
+        self._prev = {seat: self.seats[i - 1] for i, seat in enumerate(self.seats)}
+        self._active = set(self.seats)
+        self._orders = {}
+        for seat in eliminated:
+            self.eliminate(seat)
+
+    def __contains__(self, seat):
+        return seat in self._active
+
+    def __len__(self):
+        return len(self._active)
+
+    def next(self, seat):
+        """The active seat after ``seat`` (which may have just been eliminated), or None if none are left."""
+        if not self._active:
+            return None
+        seat = self._next[seat]
+        while seat not in self._active:
+            # Only links out of eliminated seats can lead to other eliminated seats
+            seat = self._next[seat]
+        return seat
+
+    def first(self):
+        """The active seat earliest in seat order, or None."""
+        return self.next(self.seats[-1]) if self.seats else None
+
+    def round(self):
+        """Active seats for one trip round the table, skipping any eliminated on the way."""
+        seat = self.first()
+        while seat is not None:
+            yield seat
+            following = self.next(seat)
+            if following is None or self._position[following] <= self._position[seat]:
+                return
+            seat = following
+
+    def eliminate(self, seat):
+        """Take ``seat`` out of the turn order and out of every disproval order."""
+        if seat not in self._active:
+            return
+        before, after = self._prev[seat], self._next[seat]
+        self._next[before] = after
+        self._prev[after] = before
+        self._active.discard(seat)
+        self.eliminated += (seat,)
+        self._orders = {}
+
+    def disproval_order(self, seat):
+        """Active seats asked, in order, to disprove ``seat``'s suggestion."""
+        order = self._orders.get(seat)
+        if order is None:
+            order = []
+            other = self.next(seat)
+            while other is not None and other != seat and other not in order:
+                order.append(other)
+                other = self.next(other)
+            if self.lead in order:
+                order.remove(self.lead)
+                order.insert(0, self.lead)
+            order = self._orders[seat] = tuple(order)
+        return order
+
+    def copy(self):
+        """An independent ring with the same seats out."""
+        return SeatRing(self.seats, self.lead, self.eliminated)
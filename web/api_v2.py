@@ -0,0 +1,119 @@
+"""
+JSON-only game API for bots and scripted clients.
+
+Mirrors the /api routes but returns typed game state and structured events
+(see WebClueGame.get_state) instead of presentation HTML, so no colorizing
+or markup is ever built for these requests. Pass ``since`` (the previous
+response's ``next_seq``) to receive only new events.
+
+Spectators use the ``public`` and ``spectate`` routes, which never expose
+hands or shown cards (see web/spectate.py).
+"""
+
+from flask import Blueprint, Response, request
+
+from web import spectate
+from web.encoding import encode_response
+from web.web_app import MAX_BATCH_COMMANDS, games, run_batch, run_command, game_setup_error, start_game
+
+bp = Blueprint('api_v2', __name__, url_prefix='/api/v2')
+
+
+def _since():
+    try:
+        return max(0, int(request.args.get('since', 0)))
+    except ValueError:
+        return 0
+
+
+@bp.route('/games', methods=['POST'])
+def create_game():
+    """Start a new game and return its full state."""
+    data = request.get_json(silent=True) or {}
+    num_ai, difficulty, seed = data.get('num_ai', 2), data.get('difficulty', 'Medium'), data.get('seed')
+    error = game_setup_error(num_ai, difficulty, seed)
+    if error:
+        return encode_response({'error': error}, 400)
+    game = start_game(num_ai, difficulty, seed)
+    with game.lock:
+        return encode_response(game.get_state(), 201)
+
+
+@bp.route('/games/<game_id>', methods=['GET'])
+def game_state(game_id):
+    """Current state plus events since ``?since=``."""
+    game = games.get(game_id)
+    if game is None:
+        return encode_response({'error': 'Game not found'}, 404)
+    with game.lock:
+        return encode_response(game.get_state(_since()))
+
+
+@bp.route('/games/<game_id>/commands', methods=['POST'])
+def game_command(game_id):
+    """Run one text command (same syntax as /api/command) without rendering HTML."""
+    game = games.get(game_id)
+    if game is None:
+        return encode_response({'error': 'Game not found'}, 404)
+    data = request.get_json(silent=True) or {}
+    command = str(data.get('command', '')).lower().strip()
+    with game.lock:
+        result = run_command(game, command, render=False)
+        result.pop('view', None)
+        payload = {'response': result['response'], 'state': game.get_state(_since())}
+        if 'fork_id' in result:
+            payload['fork_id'] = result['fork_id']
+        return encode_response(payload)
+
+
+@bp.route('/games/<game_id>/batch', methods=['POST'])
+def game_batch(game_id):
+    """Run an ordered list of commands atomically and return one final state."""
+    data = request.get_json(silent=True) or {}
+    commands = data.get('commands')
+    if not isinstance(commands, list) or not commands:
+        return encode_response({'error': 'commands must be a non-empty list'}, 400)
+    if len(commands) > MAX_BATCH_COMMANDS:
+        return encode_response({'error': f'At most {MAX_BATCH_COMMANDS} commands per batch'}, 400)
+
+    game = games.get(game_id)
+    if game is None:
+        return encode_response({'error': 'Game not found'}, 404)
+    commands = [str(command).lower().strip() for command in commands]
+    with game.lock:
+        results, stopped = run_batch(game, commands)
+        return encode_response({
+            'results': results,
+            'completed': len(results),
+            'stopped': stopped,
+            'state': game.get_state(_since())
+        })
+
+
+@bp.route('/games/<game_id>/public', methods=['GET'])
+def game_public(game_id):
+    """Spectator view of a game plus public events since ``?since=``."""
+    game = games.get(game_id)
+    if game is None:
+        return encode_response({'error': 'Game not found'}, 404)
+    with game.lock:
+        return encode_response(game.get_public_state(_since()))
+
+
+@bp.route('/games/<game_id>/spectate', methods=['GET'])
+def game_spectate(game_id):
+    """Server-sent events: a public snapshot, then each change as it happens."""
+    game = games.get(game_id)
+    if game is None:
+        return encode_response({'error': 'Game not found'}, 404)
+    with game.lock:
+        subscription = spectate.subscribe(game)
+    if subscription is None:
+        return encode_response({'error': 'Too many spectators'}, 503)
+    body = spectate.open_stream(subscription)
+    if body is None:
+        response = encode_response({'error': 'Too many spectator streams on this server'}, 503)
+        response.headers['Retry-After'] = str(spectate.HEARTBEAT_SECONDS)
+        return response
+    return Response(body, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
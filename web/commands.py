@@ -0,0 +1,273 @@
+"""
+Command vocabulary: prefix indexes over commands and card names.
+
+Built once at import. ``complete`` finishes a partly typed command for
+/api/complete, and ``parse_cards`` reads the suspect, weapon and room out
+of a ``suggest``/``accuse`` command however they are written: any case or
+punctuation, in any order, multi-word names ("lead pipe"), surnames alone
+("plum") and small typos ("candelstick", "kinfe"). Both walk the input
+once, matching at most MAX_NAME_WORDS words from each position against
+the trie, so they take time linear in its length. Typos are looked up in
+a table of every name with up to MAX_EDITS letters deleted, probed with
+the input and the input less one letter: a phrase of length L costs L + 1
+probes and O(L^2) to build them. Only phrases no longer than the longest
+name plus MAX_EDITS are looked up, and at most MAX_TYPO_LOOKUPS words per
+command, so that cost is bounded. A name with two typos is matched only
+if one of them is a missing letter.
+"""
+
+import re
+
+from src.clue_game.engine.game_logic import ClueEngine
+
+COMMANDS = ('move to', 'suggest', 'accuse', 'disprove', 'space', 'map', 'rules', 'notebook', 'players',
+            'help', 'toggle_autotrack', 'undo', 'redo', 'fork')
+CARD_COMMANDS = ('suggest', 'accuse')
+SLOTS = (('suspect', ClueEngine.SUSPECTS, ''), ('weapon', ClueEngine.WEAPONS, 'with'),
+         ('room', ClueEngine.ROOMS, 'in'))  # (category, cards, word before it in a command)
+FILLER_WORDS = frozenset({'with', 'in', 'the', 'a', 'an', 'and', 'using', 'of', 'to'})
+SKIPPED_WORDS = FILLER_WORDS | {word for command in COMMANDS for word in command.split()}
+# Other ways to write a card, besides its name
+ALIASES = {
+    'Miss Scarlet': ('scarlet', 'ms scarlet'),
+    'Col. Mustard': ('mustard', 'colonel mustard'),
+    'Mrs. White': ('white',),
+    'Mr. Green': ('green', 'mister green'),
+    'Mrs. Peacock': ('peacock',),
+    'Prof. Plum': ('plum', 'professor plum'),
+    'Lead Pipe': ('pipe',),
+    'Billiard Room': ('billiard', 'billiards'),
+    'Dining Room': ('dining',),
+}
+MAX_NAME_WORDS = 3
+MAX_EDITS = 2
+INPUT_DELETIONS = 1  # Letters deleted from the input to probe the typo table
+MAX_TYPO_LOOKUPS = 12  # Unknown words looked up per command, so junk input stays cheap
+
+
+def normalize(text):
+    """Lowercase words separated by single spaces, punctuation dropped."""
+    return ' '.join(re.findall(r"[a-z0-9_]+", text.lower()))
+
+
+def max_edits(phrase):
+    """Typos tolerated in a phrase of this length: none in short words."""
+    return 0 if len(phrase) <= 3 else 1 if len(phrase) <= 7 else MAX_EDITS
+
+
+def _deletions(phrase, edits):
+    """``phrase`` with every choice of up to ``edits`` letters removed."""
+    variants = frontier = {phrase}
+    for _ in range(edits):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        variants = variants | frontier
+    return variants
+
+
+def edit_distance(a, b, limit):
+    """Insertions, deletions, substitutions and swaps of neighbors turning a into b, or limit + 1 if more."""
+    far = limit + 1
+    if abs(len(a) - len(b)) > limit:
+        return far
+    # Only cells within ``limit`` of the diagonal can stay within it, so O(len * limit)
+    before, previous = None, [min(j, far) for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        row = [min(i, far)] + [far] * len(b)
+        low = far
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            cost = previous[j - 1] if a[i - 1] == b[j - 1] else previous[j - 1] + 1
+            if row[j - 1] < cost:
+                cost = row[j - 1] + 1
+            if previous[j] < cost:
+                cost = previous[j] + 1
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1] and before[j - 2] < cost:
+                cost = before[j - 2] + 1
+            row[j] = cost if cost < far else far
+            low = cost if cost < low else low
+        if low == far and row[0] == far:
+            return far
+        before, previous = previous, row
+    return previous[-1]
+
+
+class Node:
+    __slots__ = ('children', 'value', 'below')
+
+    def __init__(self):
+        self.children = {}
+        self.value = None  # Set where a phrase ends
+        self.below = []    # Values of every phrase through here, in insertion order
+
+
+class PrefixIndex:
+    """A trie from normalized phrases to values, for prefix, exact and near matches."""
+
+    def __init__(self, entries=()):
+        self.root = Node()
+        self.phrases = {}  # Normalized phrase -> value
+        self.near = {}     # Phrase with up to MAX_EDITS letters deleted -> phrases it came from
+        self.longest = 0
+        for phrase, value in entries:
+            self.add(phrase, value)
+
+    def add(self, phrase, value):
+        phrase = normalize(phrase)
+        self.phrases[phrase] = value
+        self.longest = max(self.longest, len(phrase))
+        for variant in _deletions(phrase, MAX_EDITS):
+            self.near.setdefault(variant, set()).add(phrase)
+        node = self.root
+        for char in phrase:
+            if value not in node.below:
+                node.below.append(value)
+            node = node.children.setdefault(char, Node())
+        if value not in node.below:
+            node.below.append(value)
+        node.value = value
+
+    def complete(self, prefix):
+        """Values of every phrase starting with ``prefix`` (already normalized)."""
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.below
+
+    def longest_match(self, text, start):
+        """(value, end) of the longest phrase at ``text[start:]`` ending on a word boundary."""
+        node = self.root
+        best = (None, start)
+        for end in range(start, len(text) + 1):
+            if node.value is not None and (end == len(text) or text[end] == ' '):
+                best = (node.value, end)
+            if end == len(text):
+                break
+            node = node.children.get(text[end])
+            if node is None:
+                break
+        return best
+
+    def nearest(self, phrase, limit):
+        """(value, edits) of the unique closest phrase within ``limit`` edits, else (None, None)."""
+        if limit == 0 or len(phrase) > self.longest + limit:
+            return None, None
+        candidates = set()
+        for variant in _deletions(phrase, min(limit, INPUT_DELETIONS)):
+            candidates.update(self.near.get(variant, ()))
+        found = {}
+        for candidate in candidates:
+            edits = edit_distance(phrase, candidate, limit)
+            if edits <= limit:
+                value = self.phrases[candidate]
+                found[value] = min(edits, found.get(value, edits))
+        if not found:
+            return None, None
+        best = min(found.values())
+        closest = [value for value, edits in found.items() if edits == best]
+        return (closest[0], best) if len(closest) == 1 else (None, None)
+
+
+COMMAND_INDEX = PrefixIndex((command, command) for command in COMMANDS)
+# One index per category for completion, and one over every card for parsing
+CATEGORY_INDEXES = {
+    category: PrefixIndex([(card, card) for card in cards] +
+                          [(alias, card) for card in cards for alias in ALIASES.get(card, ())])
+    for category, cards, _ in SLOTS
+}
+CARD_CATEGORY = {card: category for category, cards, _ in SLOTS for card in cards}
+CARD_INDEX = PrefixIndex([(card, card) for card in CARD_CATEGORY] +
+                         [(alias, card) for card in CARD_CATEGORY for alias in ALIASES.get(card, ())])
+
+
+def scan_cards(text):
+    """(card, start, end) for each card named in normalized ``text``, left to right."""
+    words = [(match.start(), match.end()) for match in re.finditer(r"\S+", text)]
+    lookups = MAX_TYPO_LOOKUPS
+    w = 0
+    while w < len(words):
+        start, end = words[w]
+        if text[start:end] in SKIPPED_WORDS:
+            w += 1
+            continue
+        card, match_end = CARD_INDEX.longest_match(text, start)
+        if card is None and lookups:
+            lookups -= 1
+            # No exact name here: the closest name to the next one to three words
+            best_edits = None
+            for count in range(1, min(MAX_NAME_WORDS, len(words) - w) + 1):
+                if count > 1 and text[slice(*words[w + count - 1])] in FILLER_WORDS:
+                    break
+                phrase_end = words[w + count - 1][1]
+                phrase = text[start:phrase_end]
+                near, edits = CARD_INDEX.nearest(phrase, max_edits(phrase))
+                if near is not None and (best_edits is None or edits <= best_edits):
+                    card, match_end, best_edits = near, phrase_end, edits
+        if card is None:
+            w += 1
+            continue
+        yield card, start, match_end
+        while w < len(words) and words[w][0] < match_end:
+            w += 1
+
+
+def parse_cards(text):
+    """{'suspect': ..., 'weapon': ..., 'room': ...} for the first card of each kind named in ``text``."""
+    found = {}
+    for card, _, _ in scan_cards(normalize(text)):
+        found.setdefault(CARD_CATEGORY[card], card)
+        if len(found) == len(SLOTS):
+            break
+    return found
+
+
+def match_card(text, category=None):
+    """The card ``text`` names (of ``category`` if given), or None."""
+    for card, _, _ in scan_cards(normalize(text)):
+        if category is None or CARD_CATEGORY[card] == category:
+            return card
+    return None
+
+
+def _card_command(verb, cards):
+    command = verb
+    for category, _, keyword in SLOTS:
+        if category in cards:
+            command += f" {keyword} {cards[category]}" if keyword else f" {cards[category]}"
+    return command
+
+
+def complete(text, limit=10):
+    """Whole commands that finish ``text``, as the game would accept them."""
+    typed = normalize(text)
+    verb = next((command for command in COMMANDS
+                 if typed == command or typed.startswith(command + ' ')), None)
+    if verb is None:
+        return COMMAND_INDEX.complete(typed)[:limit]
+    rest = typed[len(verb):].strip()
+
+    if verb == 'move to':
+        return [f"move to {room}" for room in CATEGORY_INDEXES['room'].complete(rest)][:limit]
+    if verb == 'disprove':
+        return [f"disprove {card}" for card in CARD_INDEX.complete(rest)][:limit]
+    if verb not in CARD_COMMANDS:
+        return [verb]
+
+    # Cards already named, then complete the first slot still empty from what follows them
+    cards = {}
+    tail_start = 0
+    for card, _, end in scan_cards(rest):
+        cards.setdefault(CARD_CATEGORY[card], card)
+        tail_start = end
+    tail = rest[tail_start:].split()
+    while tail and tail[0] in FILLER_WORDS:
+        tail.pop(0)
+    tail = ' '.join(tail)
+    slot = next(((category, keyword) for category, _, keyword in SLOTS if category not in cards), None)
+    if slot is None:
+        return [_card_command(verb, cards)]
+    category, keyword = slot
+    if keyword.startswith(tail):
+        tail = ''  # Still typing the word before the slot
+    return [_card_command(verb, {**cards, category: card})
+            for card in CATEGORY_INDEXES[category].complete(tail)][:limit]
@@ -0,0 +1,104 @@
+"""
+Response encoding for the JSON API.
+
+Serializes with orjson when it is installed (stdlib json otherwise) and
+compresses with stdlib gzip/zlib when the body is large enough and the client
+accepts it. Bodies that never change can be encoded once and cached.
+"""
+
+import gzip
+import json
+import threading
+import zlib
+
+from flask import Response, request
+
+try:
+    import orjson
+except ImportError:  # Optional speedup
+    orjson = None
+
+# Below this many bytes compression costs more than it saves on the wire
+COMPRESS_MIN_BYTES = 1024
+COMPRESS_LEVEL = 6
+
+# Encoded bodies for constant payloads, keyed by (cache_key, encoding)
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def dumps(payload):
+    """Serialize a payload to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def choose_encoding(accept_encoding):
+    """Pick gzip or deflate from an Accept-Encoding header, or None for identity."""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for name in ('gzip', 'deflate'):
+        if accepted.get(name, accepted.get('*', 0.0)) > 0:
+            return name
+    return None
+
+
+def compress(body, encoding):
+    """Compress bytes with the named content encoding."""
+    if encoding == 'gzip':
+        return gzip.compress(body, COMPRESS_LEVEL, mtime=0)
+    if encoding == 'deflate':
+        return zlib.compress(body, COMPRESS_LEVEL)
+    return body
+
+
+def encode_body(body, cache_key=None):
+    """Return (bytes, content_encoding) for a body, honouring Accept-Encoding."""
+    encoding = None
+    if len(body) >= COMPRESS_MIN_BYTES:
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+    if cache_key is None:
+        return compress(body, encoding), encoding
+
+    key = (cache_key, encoding)
+    cached = _cache.get(key)
+    if cached is None:
+        cached = compress(body, encoding)
+        with _cache_lock:
+            _cache[key] = cached
+    return cached, encoding
+
+
+def encode_response(payload, status=200, cache_key=None, mimetype='application/json'):
+    """Build a Flask response for a payload (a dict, or pre-encoded bytes/str).
+
+    Pass ``cache_key`` only for payloads that are identical every time the key
+    is used; their encoded bytes are computed once and reused.
+    """
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    if not isinstance(payload, bytes):
+        cached_json = _cache.get((cache_key, 'json')) if cache_key is not None else None
+        if cached_json is None:
+            cached_json = dumps(payload)
+            if cache_key is not None:
+                with _cache_lock:
+                    _cache[cache_key, 'json'] = cached_json
+        payload = cached_json
+
+    body, encoding = encode_body(payload, cache_key)
+    response = Response(body, status=status, mimetype=mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
@@ -0,0 +1,160 @@
+"""
+Background jobs: slow work on finished games, off the request path.
+
+A JobQueue runs one function over payloads in a pool of worker processes,
+so CPU-heavy work neither holds a game's lock nor competes with request
+threads for the GIL. Submitting only hands the payload to the pool: at most
+``workers`` jobs run at once and at most ``max_pending`` wait, beyond which
+submissions are turned away (callers can submit again later). Results are
+cached by key, a game id, least recently used out first, with the version
+of the input they were computed from, so a game that changed is redone.
+Versions are compared by identity: any object that is replaced whenever
+the input changes, such as the newest entry of an append-only log.
+Owners discard a key's result once it can no longer be asked for (the web
+app does when its game is evicted), so the cache follows the live games.
+
+Workers are spawned rather than forked, from a fresh interpreter that
+inherits no request thread's locks, and the pool starts on first use in
+each process, so under gunicorn's --preload each worker has its own. They
+run at the lowest CPU priority, taking only time requests leave idle.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+DEFAULT_WORKERS = 1
+MAX_PENDING = 64
+MAX_RESULTS = 1024
+WORKER_NICENESS = 19
+
+logger = logging.getLogger(__name__)
+
+
+def _lower_priority():
+    """Worker initializer: yield the CPU to the server's request threads."""
+    try:
+        os.nice(WORKER_NICENESS)
+    except (AttributeError, OSError):
+        pass  # No os.nice on Windows
+
+
+class Job:
+    """One key's latest job: 'pending', then 'done' with a result or 'failed'."""
+
+    def __init__(self, version, future):
+        self.version = version
+        self.future = future
+        self.state = 'pending'
+        self.result = None
+
+
+def _outcome(future):
+    """('done', result) or ('failed', None) for a finished future."""
+    if future.exception() is not None:
+        return 'failed', None
+    return 'done', future.result()
+
+
+class JobQueue:
+    """Runs ``function(payload)`` in worker processes, caching results by key."""
+
+    def __init__(self, function, workers=DEFAULT_WORKERS, max_pending=MAX_PENDING, max_results=MAX_RESULTS):
+        self.function = function
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_results = max_results
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()  # key -> Job, least recently used first
+        self._pending = 0
+        self._metrics = Counter()
+        self._executor = None
+        self._pid = None
+
+    def _pool(self):
+        """This process's pool; callers hold the lock."""
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=_lower_priority)
+            self._pid = os.getpid()
+        return self._executor
+
+    def submit(self, key, version, payload):
+        """Queue a job unless ``version`` is already done or running; returns its state, or 'rejected'."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.version is version and job.state != 'failed':
+                self._jobs.move_to_end(key)
+                return job.state
+            if self._pending >= self.max_pending:
+                self._metrics['rejected'] += 1
+                return 'rejected'
+            try:
+                future = self._pool().submit(self.function, payload)
+            except RuntimeError as error:
+                # A worker died and broke the pool: start a new one next time
+                logger.warning("Job pool unavailable: %s", error)
+                self._executor = None
+                self._metrics['rejected'] += 1
+                return 'rejected'
+            job = Job(version, future)
+            self._jobs[key] = job
+            self._jobs.move_to_end(key)
+            self._pending += 1
+            self._metrics['submitted'] += 1
+            self._evict()
+        future.add_done_callback(lambda future: self._finish(job, future))
+        return job.state
+
+    def _finish(self, job, future):
+        state, result = _outcome(future)
+        if state == 'failed':
+            logger.warning("Background job failed: %r", future.exception())
+        with self._lock:
+            job.state, job.result = state, result
+            self._pending -= 1
+            self._metrics['completed' if state == 'done' else 'failed'] += 1
+            if isinstance(future.exception(), BrokenProcessPool):
+                self._executor = None  # A worker died: start a new pool next time
+            self._evict()
+
+    def _evict(self):
+        """Drop the least recently used finished results beyond max_results; callers hold the lock."""
+        excess = len(self._jobs) - self.max_results
+        for key in [key for key, job in self._jobs.items() if job.state != 'pending'][:max(0, excess)]:
+            del self._jobs[key]
+            self._metrics['evicted'] += 1
+
+    def discard(self, key):
+        """Forget ``key``'s job; a pending one still runs, but its result isn't kept."""
+        with self._lock:
+            if self._jobs.pop(key, None) is not None:
+                self._metrics['discarded'] += 1
+
+    def result(self, key, wait=0):
+        """(state, result) for ``key``, waiting up to ``wait`` seconds for a pending job; (None, None) if unknown."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None:
+                return None, None
+            self._jobs.move_to_end(key)
+        if job.state == 'pending' and wait > 0:
+            try:
+                job.future.exception(timeout=wait)
+            except FutureTimeout:
+                pass
+        with self._lock:
+            if job.state == 'pending' and job.future.done():
+                # Finished, but _finish may not have run yet
+                return _outcome(job.future)
+            return job.state, job.result
+
+    def metrics(self):
+        with self._lock:
+            return {'counters': dict(self._metrics), 'pending': self._pending, 'cached': len(self._jobs),
+                    'workers': self.workers}
@@ -0,0 +1,182 @@
+"""
+In-process admission control: token-bucket rate limits and a concurrency cap.
+
+Three token buckets apply to every API request: one per client address, one
+per client for creating games (which allocates memory until evicted; a
+``fork`` command creates one too), and one per game for commands. A global cap on in-flight requests sheds load
+with 503 before work starts. Rejections carry a Retry-After header.
+
+Bucket tables are sharded, bounded LRU maps, so memory stays fixed no
+matter how many clients or games show up. Decisions are counted and served
+by /api/metrics.
+"""
+
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from flask import current_app, g, request
+
+from web.encoding import encode_response
+from web.routing import is_peer_request
+
+# (tokens per second, burst) for each bucket kind
+DEFAULT_LIMITS = {
+    'client': (20.0, 40),
+    'create': (0.2, 5),      # 12 new games a minute after a burst of 5
+    'game': (10.0, 30),
+}
+DEFAULT_MAX_IN_FLIGHT = 64
+DEFAULT_MAX_KEYS = 65536  # Per bucket kind, across all shards
+
+CREATE_ENDPOINTS = frozenset({'clue.new_game', 'clue.replay_game', 'api_v2.create_game'})
+GAME_ENDPOINTS = frozenset({
+    'clue.handle_command', 'clue.handle_batch', 'clue.load_game', 'clue.get_game_info',
+    'api_v2.game_state', 'api_v2.game_command', 'api_v2.game_batch', 'clue.get_analysis',
+})
+BATCH_ENDPOINTS = frozenset({'clue.handle_batch', 'api_v2.game_batch'})
+COMMAND_ENDPOINTS = frozenset({'clue.handle_command', 'api_v2.game_command'}) | BATCH_ENDPOINTS
+EXEMPT_ENDPOINTS = frozenset({'clue.index', 'clue.metrics', 'static'})
+
+
+def count_forks(endpoint, data):
+    """How many of a command request's commands fork the game into a new one."""
+    if endpoint not in COMMAND_ENDPOINTS or not isinstance(data, dict):
+        return 0
+    if endpoint in BATCH_ENDPOINTS:
+        commands = data.get('commands') if isinstance(data.get('commands'), list) else []
+    else:
+        commands = [data.get('command', '')]
+    return sum(1 for command in commands if str(command).lower().strip() == 'fork')
+
+
+class TokenBuckets:
+    """Token buckets keyed by string in fixed memory (least recently used keys are dropped)."""
+
+    SHARDS = 16
+
+    def __init__(self, rate, burst, max_keys=DEFAULT_MAX_KEYS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys_per_shard = max(1, max_keys // self.SHARDS)
+        self._shards = [(threading.Lock(), OrderedDict()) for _ in range(self.SHARDS)]
+
+    def acquire(self, key, cost=1, now=None):
+        """Take ``cost`` tokens for key; returns 0 if allowed, else seconds to wait."""
+        now = time.monotonic() if now is None else now
+        lock, buckets = self._shards[hash(key) % self.SHARDS]
+        with lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = [float(self.burst), now]
+                buckets[key] = bucket
+                if len(buckets) > self.max_keys_per_shard:
+                    # A dropped key just starts again with a full bucket
+                    buckets.popitem(last=False)
+            else:
+                buckets.move_to_end(key)
+                tokens, last = bucket
+                bucket[0] = min(self.burst, tokens + (now - last) * self.rate)
+                bucket[1] = now
+
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return 0.0
+            if cost > self.burst:
+                return math.inf
+            return (cost - bucket[0]) / self.rate
+
+    def __len__(self):
+        return sum(len(buckets) for _, buckets in self._shards)
+
+
+class AdmissionControl:
+    """Rate limits plus a cap on concurrent requests, hooked into a Flask app."""
+
+    def __init__(self, limits=None, max_in_flight=DEFAULT_MAX_IN_FLIGHT, max_keys=DEFAULT_MAX_KEYS):
+        limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.buckets = {kind: TokenBuckets(rate, burst, max_keys) for kind, (rate, burst) in limits.items()}
+        self.max_in_flight = max_in_flight
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._metrics = Counter()
+        self._metrics_lock = threading.Lock()
+
+    def init_app(self, app):
+        app.extensions['clue_admission'] = self
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+    def _count(self, name):
+        with self._metrics_lock:
+            self._metrics[name] += 1
+
+    def client_key(self):
+        # Behind proxies, create_app's ProxyFix (CLUE_PROXY_HOPS) has already
+        # replaced the proxy's address with the one the nearest proxy forwarded
+        return request.remote_addr or 'unknown'
+
+    def _reject(self, status, reason, retry_after):
+        self._count(f'rejected_{reason}')
+        if status == 429:
+            message = 'Too many requests'
+        else:
+            message = 'Server busy'
+        response = encode_response({'error': message, 'reason': reason}, status)
+        response.headers['Retry-After'] = str(max(1, math.ceil(min(retry_after, 3600))))
+        return response
+
+    def _before_request(self):
+        endpoint = request.endpoint
+        if endpoint is None or endpoint in EXEMPT_ENDPOINTS:
+            return None
+        if is_peer_request():
+            return None  # Admitted by the node that forwarded it, see web/routing.py
+
+        client = self.client_key()
+        wait = self.buckets['client'].acquire(client)
+        if wait:
+            return self._reject(429, 'client', wait)
+
+        data = request.get_json(silent=True) or {}
+        creates = 1 if endpoint in CREATE_ENDPOINTS else count_forks(endpoint, data)
+        if creates:
+            wait = self.buckets['create'].acquire(client, creates)
+            if wait:
+                return self._reject(429, 'create', wait)
+
+        if endpoint in GAME_ENDPOINTS:
+            game_id = (request.view_args or {}).get('game_id') or data.get('game_id')
+            if game_id:
+                cost = 1
+                if endpoint in BATCH_ENDPOINTS and isinstance(data.get('commands'), list):
+                    cost = max(1, len(data['commands']))
+                wait = self.buckets['game'].acquire(str(game_id), cost)
+                if wait:
+                    return self._reject(429, 'game', wait)
+
+        # Shed load before doing any work once too many requests are in flight
+        if not self._slots.acquire(blocking=False):
+            return self._reject(503, 'busy', 1)
+        g.clue_admitted = True
+        self._count('admitted')
+        return None
+
+    def _teardown_request(self, exc):
+        if g.pop('clue_admitted', False):
+            self._slots.release()
+
+    def metrics(self):
+        with self._metrics_lock:
+            counters = dict(self._metrics)
+        return {
+            'decisions': counters,
+            'tracked_keys': {kind: len(buckets) for kind, buckets in self.buckets.items()},
+            'max_in_flight': self.max_in_flight,
+        }
+
+
+def admission_metrics():
+    """Limiter metrics for the current app, or None if admission control is off."""
+    admission = current_app.extensions.get('clue_admission')
+    return admission.metrics() if admission else None
@@ -0,0 +1,128 @@
+"""
+Pre-dealt games so creating a game is a claim rather than a build.
+
+A background thread keeps a few ready games per (num_ai, difficulty). How
+many follows each combination's recent creation rate (an exponentially
+decayed count), enough to cover REFILL_SECONDS of requests, capped per
+combination and in total so idle pools hold a fixed amount of memory.
+Seeded games are always built on demand since they must match their seed.
+
+The thread starts on first use in each process, so under gunicorn's
+--preload every worker fills its own pool after the fork.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import Counter, deque
+
+POOL_KEYS = frozenset((num_ai, difficulty) for num_ai in range(1, 6)
+                      for difficulty in ('Easy', 'Medium', 'Hard'))
+WARM_KEYS = {(2, 'Medium'): 1}  # The menu's default game is kept ready even when idle
+MAX_PER_KEY = 8
+MAX_POOLED = 32
+REFILL_SECONDS = 5.0
+RATE_HALF_LIFE = 60.0
+LATENCY_SAMPLES = 1024
+
+
+class GamePool:
+    """Ready games by (num_ai, difficulty), built by ``factory(num_ai, difficulty, seed)``."""
+
+    def __init__(self, factory, max_per_key=MAX_PER_KEY, max_pooled=MAX_POOLED, refill_seconds=REFILL_SECONDS):
+        self.factory = factory
+        self.max_per_key = max_per_key
+        self.max_pooled = max_pooled
+        self.refill_seconds = refill_seconds
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._ready = {key: deque() for key in POOL_KEYS}
+        self._rates = {}  # key -> (games per second, when last updated)
+        self._metrics = Counter()
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._pid = None
+
+    def _rate(self, key, now, claimed=0):
+        rate, last = self._rates.get(key, (0.0, now))
+        # Each claim adds ln 2 / half-life, so a steady rate converges to itself
+        rate = rate * 0.5 ** ((now - last) / RATE_HALF_LIFE) + claimed * math.log(2) / RATE_HALF_LIFE
+        self._rates[key] = (rate, now)
+        return rate
+
+    def _target(self, key, now):
+        wanted = math.ceil(self._rate(key, now) * self.refill_seconds - 1e-9)
+        return min(self.max_per_key, max(WARM_KEYS.get(key, 0), wanted))
+
+    def _next_to_build(self, now):
+        """The key furthest below its target, or None; drops games above target."""
+        best, best_deficit = None, 0
+        for key in self._rates.keys() | WARM_KEYS.keys():
+            ready = self._ready[key]
+            deficit = self._target(key, now) - len(ready)
+            while deficit < 0:
+                ready.pop()
+                self._metrics['discarded'] += 1
+                deficit += 1
+            if deficit > best_deficit:
+                best, best_deficit = key, deficit
+        if sum(len(ready) for ready in self._ready.values()) >= self.max_pooled:
+            return None
+        return best
+
+    def _refill(self):
+        while True:
+            with self._lock:
+                key = self._next_to_build(time.monotonic())
+                while key is None:
+                    self._wake.wait(self.refill_seconds)
+                    key = self._next_to_build(time.monotonic())
+            game = self.factory(key[0], key[1], None)
+            with self._lock:
+                self._ready[key].append(game)
+                self._metrics['built'] += 1
+
+    def _start(self):
+        """Start this process's refill thread; callers hold the lock."""
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        threading.Thread(target=self._refill, name='clue-game-pool', daemon=True).start()
+
+    def claim(self, num_ai, difficulty, seed=None):
+        """A ready game if one is pooled, otherwise one built now."""
+        start = time.perf_counter()
+        key = (num_ai, difficulty)
+        game = None
+        if seed is not None or key not in POOL_KEYS:
+            outcome = 'bypassed'
+        else:
+            with self._lock:
+                self._start()
+                self._rate(key, time.monotonic(), claimed=1)
+                if self._ready[key]:
+                    game = self._ready[key].popleft()
+                self._wake.notify()
+            outcome = 'hits' if game is not None else 'misses'
+        if game is None:
+            game = self.factory(num_ai, difficulty, seed)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._metrics[outcome] += 1
+            self._latencies.append(elapsed)
+        return game
+
+    def metrics(self):
+        with self._lock:
+            counters = dict(self._metrics)
+            latencies = sorted(self._latencies)
+            ready = {f"{num_ai}-{difficulty}": len(games)
+                     for (num_ai, difficulty), games in sorted(self._ready.items()) if games}
+        claims = counters.get('hits', 0) + counters.get('misses', 0)
+        percentile = lambda p: round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 3)
+        return {
+            'counters': counters,
+            'hit_rate': round(counters.get('hits', 0) / claims, 3) if claims else None,
+            'ready': ready,
+            'creation_ms': {'p50': percentile(0.5), 'p99': percentile(0.99)} if latencies else None,
+        }
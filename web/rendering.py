@@ -0,0 +1,168 @@
+"""
+Precomputed presentation tables and HTML fragments for the Clue web UI.
+
+Everything here is built once at import time so that forked gunicorn
+workers share it copy-on-write instead of rebuilding it per request.
+"""
+
+import functools
+import re
+
+# Define unique colors for each suspect
+SUSPECT_COLORS = {
+    "Miss Scarlet": "#FF1493",  # Deep Pink
+    "Col. Mustard": "#FFD700",  # Gold
+    "Mrs. White": "#F0F8FF",    # Alice Blue
+    "Mr. Green": "#32CD32",     # Lime Green
+    "Mrs. Peacock": "#4169E1",  # Royal Blue
+    "Prof. Plum": "#9370DB"     # Medium Purple
+}
+
+# Define colors for weapons
+WEAPON_COLORS = {
+    "Candlestick": "#FFA500",   # Orange
+    "Knife": "#C0C0C0",         # Silver
+    "Lead Pipe": "#708090",     # Slate Gray
+    "Revolver": "#8B4513",      # Saddle Brown
+    "Rope": "#D2691E",          # Chocolate
+    "Wrench": "#696969"         # Dim Gray
+}
+
+# Define colors for rooms
+ROOM_COLORS = {
+    "Kitchen": "#FF6347",        # Tomato
+    "Ballroom": "#FF69B4",       # Hot Pink
+    "Conservatory": "#98FB98",   # Pale Green
+    "Billiard Room": "#87CEEB",  # Sky Blue
+    "Library": "#DDA0DD",        # Plum
+    "Study": "#F0E68C",          # Khaki
+    "Hall": "#DEB887",           # Burlywood
+    "Lounge": "#FFB6C1",         # Light Pink
+    "Dining Room": "#20B2AA"     # Light Sea Green
+}
+
+CARD_COLORS = {**SUSPECT_COLORS, **WEAPON_COLORS, **ROOM_COLORS}
+
+PLAYER_COLOR = "#00FF00"
+AI_COLOR = "#FF4500"
+
+
+def _bold_span(text, color):
+    return f'<span style="color: {color}; font-weight: bold;">{text}</span>'
+
+
+# Every highlighted token maps to its finished HTML, so a message is
+# colorized with a single regex pass instead of one str.replace per name.
+_HIGHLIGHTS = {name: _bold_span(name, color) for name, color in CARD_COLORS.items()}
+_HIGHLIGHTS["(You)"] = _bold_span("(You)", PLAYER_COLOR)
+_HIGHLIGHTS["You "] = _bold_span("You", PLAYER_COLOR) + " "
+_HIGHLIGHTS["AI"] = _bold_span("AI", AI_COLOR)
+
+# Longest tokens first so "(You)" wins over "You " and multi-word names
+# are never split.
+_HIGHLIGHT_RE = re.compile("|".join(
+    re.escape(token) for token in sorted(_HIGHLIGHTS, key=len, reverse=True)
+))
+
+
+@functools.lru_cache(maxsize=4096)
+def color_code_message(message):
+    """Apply color coding to game elements in messages."""
+    return _HIGHLIGHT_RE.sub(lambda m: _HIGHLIGHTS[m.group(0)], message)
+
+
+MAP_HEADER = """=== MANSION MAP ===<br>
+    <span style='color: #FF6347; font-family: monospace; font-weight: bold;'>KITCHEN</span> ----- <span style='color: #FF69B4; font-family: monospace; font-weight: bold;'>BALLROOM</span> ----- <span style='color: #98FB98; font-family: monospace; font-weight: bold;'>CONSERVATORY</span><br>
+        |           |              |<br>
+    <span style='color: #20B2AA; font-family: monospace; font-weight: bold;'>DINING RM</span> --- <span style='color: #DEB887; font-family: monospace; font-weight: bold;'>HALL</span> --------- <span style='color: #87CEEB; font-family: monospace; font-weight: bold;'>BILLIARD RM</span><br>
+        |           |              |<br>
+    <span style='color: #FFB6C1; font-family: monospace; font-weight: bold;'>LOUNGE</span> ------ <span style='color: #F0E68C; font-family: monospace; font-weight: bold;'>STUDY</span> -------- <span style='color: #DDA0DD; font-family: monospace; font-weight: bold;'>LIBRARY</span><br>
+<b>Current Locations:</b><br>
+"""
+
+RULES_TEXT = """
+=== CLUE GAME RULES ===
+
+[bold]OBJECTIVE:[/]
+Determine who committed the murder, with what weapon, and in which room.
+
+[bold]ORDER OF OPERATIONS (Game Flow):[/]
+1. YOUR TURN: Choose ONE action per turn
+   • Move to an adjacent room (see map for connections)
+   • Make a suggestion (only if in a room, one per turn)
+   • Make final accusation (ends game if wrong!)
+
+   ⚠️ **IMPORTANT**: You can ONLY do ONE action per turn - no moving and suggesting in the same turn!
+
+2. IMPORTANT: After you take any action, your turn ends and AI players take their turns
+
+3. MOVEMENT RULES:
+   • You can only move to connected rooms shown on the map
+   • Each room connects to 2-3 other rooms
+   • Use 'move' command to see available options
+
+4. SUGGESTION RULES:
+   • Must be in the room you're suggesting
+   • Only one suggestion per turn
+   • Format: "suggest [suspect] with [weapon] in [room]"
+   • Only ONE card is needed to disprove (any matching card)
+
+5. AI TURNS:
+   • Press SPACE to advance through AI turns
+   • AIs will move and make suggestions automatically
+   • You may need to disprove AI suggestions
+
+6. WINNING:
+   • Make correct final accusation to win
+   • Wrong accusation = you lose immediately!
+   • Use process of elimination to deduce solution
+
+[bold]STRATEGY TIPS:[/]
+• Use 'notebook' to track your cards and revealed cards
+• Auto-tracking marks cards when they're revealed (toggle with 'toggle_autotrack')
+• Watch other players' suggestions carefully
+• The solution cards are never in any player's hand
+• Only suggest rooms you're currently in
+
+[bold]COMMANDS:[/]
+• move - See available rooms to move to
+• move to [room] - Move to a specific room
+• suggest [suspect] [weapon] [room] - Make suggestion
+• accuse [suspect] [weapon] [room] - Make final accusation
+• map - View mansion map and locations
+• notebook - View your cards and revealed cards
+• players - See all players and locations
+• rules - Show these rules
+• toggle_autotrack - Enable/disable auto-tracking
+"""
+
+# The checklist table styles live in templates/game.html, so the notebook
+# response carries only markup.
+NOTEBOOK_HEADER = """
+<b>DETECTIVE'S CHECKLIST</b><br><br>
+
+<b>SUSPECTS:</b><br>
+<table class="checklist-table">
+<tr><th>Status</th><th>Suspect</th></tr>
+"""
+
+NOTEBOOK_STATUS_TEXT = {
+    "in_hand": "✓ In Hand",
+    "revealed": "✗ Revealed",
+    "unknown": "? Unknown",
+}
+
+# One finished table row per (card, status); the notebook is just a join.
+NOTEBOOK_ROWS = {
+    (card, status): f"""
+<tr>
+    <td><span class="status-{status}">{text}</span></td>
+    <td><span class="card-name" style="color: {color};">{card}</span></td>
+</tr>
+"""
+    for card, color in CARD_COLORS.items()
+    for status, text in NOTEBOOK_STATUS_TEXT.items()
+}
+
+NOTEBOOK_WEAPONS_HEADER = "</table><br><b>WEAPONS:</b><br><table class=\"checklist-table\"><tr><th>Status</th><th>Weapon</th></tr>"
+NOTEBOOK_ROOMS_HEADER = "</table><br><b>ROOMS:</b><br><table class=\"checklist-table\"><tr><th>Status</th><th>Room</th></tr>"
@@ -0,0 +1,295 @@
+"""
+Consistent-hash routing: every request for a game goes to the node holding it.
+
+Live games are kept in one process's memory (see web/sessions.py), but a
+load balancer or ``--reuse-port`` spreads one game's requests over every
+process. With routing on, each node (a single-worker server on its own
+address) hashes ``game_id`` onto a ring of all nodes and forwards requests
+for games it doesn't own to their owner, which serves them from memory.
+Games are created under ids the creating node owns, so creating one never
+takes a hop. A node that isn't on the ring owns nothing and forwards
+everything, so it can serve as a front router.
+
+Each node sits at VNODES points on the ring, so nodes own even shares, and
+when a node joins or leaves only the games between its points change hands,
+about one in N. POST /internal/ring with the new node list to every node:
+each one hands off the games it no longer owns to their new owners as
+replay records (see WebClueGame.replay), and until a game arrives, its new
+owner forwards requests for it to the owner under the previous ring.
+Nodes authenticate to each other with CLUE_ROUTING_KEY.
+"""
+
+import bisect
+import hashlib
+import hmac
+import logging
+import threading
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+
+from flask import Blueprint, Response, current_app, has_app_context, request
+
+from web import spectate
+from web.encoding import dumps, encode_response
+
+VNODES = 64
+FORWARD_TIMEOUT = 30.0  # Seconds; spectator streams send a heartbeat well inside this
+KEY_HEADER = 'X-Clue-Routing-Key'  # Marks a request from another node, to serve here
+CHUNK_BYTES = 65536
+
+# Endpoints that act on one game, which its owner has to serve
+ROUTED_ENDPOINTS = frozenset({
+    'clue.handle_command', 'clue.handle_batch', 'clue.load_game', 'clue.get_game_info', 'clue.save_game',
+    'api_v2.game_state', 'api_v2.game_command', 'api_v2.game_batch', 'api_v2.game_public',
+    'api_v2.game_spectate', 'clue.get_analysis',
+})
+CREATE_ENDPOINTS = frozenset({'clue.new_game', 'clue.replay_game', 'api_v2.create_game'})
+# Passed through a hop in each direction
+REQUEST_HEADERS = ('Content-Type', 'Accept', 'Accept-Encoding', 'If-None-Match', 'Last-Event-ID')
+RESPONSE_HEADERS = ('Content-Type', 'Content-Encoding', 'Content-Length', 'Cache-Control', 'ETag', 'Vary',
+                    'Retry-After', 'X-Accel-Buffering')
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('routing', __name__, url_prefix='/internal')
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """Nodes at ``vnodes`` points each on a circle of hashes; a key belongs to the next point."""
+
+    def __init__(self, nodes, vnodes=VNODES):
+        self.nodes = tuple(sorted({node.rstrip('/') for node in nodes}))
+        points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def owner(self, key):
+        """The node owning ``key``, or None on an empty ring."""
+        if not self._hashes:
+            return None
+        return self._owners[bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)]
+
+    def __contains__(self, node):
+        return node in self.nodes
+
+    def __len__(self):
+        return len(self.nodes)
+
+
+class GameMoved(Exception):
+    """Raised for a command on a game handed off mid-request; the request follows it."""
+
+    def __init__(self, owner):
+        super().__init__(owner)
+        self.owner = owner
+
+
+def _game_id():
+    game_id = (request.view_args or {}).get('game_id')
+    if game_id is None:
+        data = request.get_json(silent=True)
+        game_id = data.get('game_id') if isinstance(data, dict) else None
+    return str(game_id) if game_id else None
+
+
+class Router:
+    """Forwards each request to its game's owner and hands games off when the ring changes."""
+
+    def __init__(self, node, nodes, key, vnodes=VNODES, timeout=FORWARD_TIMEOUT):
+        if not key:
+            raise ValueError("CLUE_ROUTING_KEY is required when routing is on")
+        self.node = node.rstrip('/')
+        self.key = key
+        self.vnodes = vnodes
+        self.timeout = timeout
+        self.ring = HashRing(nodes, vnodes)
+        self.previous = None  # The ring before the last change, while its games move
+        self._lock = threading.Lock()
+        self._metrics = Counter()
+        self._metrics_lock = threading.Lock()
+        # Hops go straight to the other node, never through an environment proxy
+        self._opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+    def init_app(self, app):
+        app.extensions['clue_router'] = self
+        app.register_blueprint(bp)
+        # Registered after admission control, so the first hop is rate limited
+        app.before_request(self._before_request)
+        app.register_error_handler(GameMoved, lambda error: self.forward(error.owner))
+
+    def _count(self, name, n=1):
+        with self._metrics_lock:
+            self._metrics[name] += n
+
+    def is_peer(self):
+        """Whether this request came from another node (and so must be served here)."""
+        return hmac.compare_digest(request.headers.get(KEY_HEADER, ''), self.key)
+
+    def new_game_id(self):
+        """A fresh game id this node owns (about one try per node on the ring)."""
+        while True:
+            game_id = str(uuid.uuid4())[:8]
+            if self.node not in self.ring or self.ring.owner(game_id) == self.node:
+                return game_id
+
+    def _before_request(self):
+        endpoint = request.endpoint
+        if endpoint is not None and endpoint.startswith('routing.'):
+            return None if self.is_peer() else encode_response({'error': 'Forbidden'}, 403)
+        if self.is_peer():
+            return None
+
+        if endpoint in CREATE_ENDPOINTS and self.node not in self.ring and len(self.ring):
+            # Not a member: spread new games over the nodes that are
+            return self.forward(self.ring.owner(str(uuid.uuid4())))
+        if endpoint not in ROUTED_ENDPOINTS:
+            return None
+        game_id = _game_id()
+        if game_id is None:
+            return None
+        ring, previous = self.ring, self.previous
+        owner = ring.owner(game_id)
+        if owner is None or owner == self.node:
+            # Ours, but it may not have been handed over yet
+            from web.web_app import games
+            previous_owner = previous.owner(game_id) if previous is not None else None
+            if game_id not in games and previous_owner not in (None, self.node):
+                return self.forward(previous_owner)
+            return None
+        return self.forward(owner)
+
+    def forward(self, node):
+        """Send the current request to ``node`` and stream back its response."""
+        self._count('forwarded')
+        headers = {name: request.headers[name] for name in REQUEST_HEADERS if name in request.headers}
+        headers[KEY_HEADER] = self.key
+        hop = urllib.request.Request(node + request.full_path.rstrip('?'), data=request.get_data() or None,
+                                     headers=headers, method=request.method)
+        try:
+            upstream = self._opener.open(hop, timeout=self.timeout)
+        except urllib.error.HTTPError as error:
+            upstream = error  # Still a response: pass it on
+        except OSError as error:
+            self._count('forward_failed')
+            logger.warning("Forwarding %s to %s failed: %s", request.path, node, error)
+            response = encode_response({'error': 'Game server unavailable', 'reason': 'routing'}, 503)
+            response.headers['Retry-After'] = '1'
+            return response
+
+        read = getattr(upstream, 'read1', upstream.read)
+
+        def body():
+            # Chunk by chunk, so spectator streams flow through the hop
+            try:
+                for chunk in iter(lambda: read(CHUNK_BYTES), b''):
+                    yield chunk
+            finally:
+                upstream.close()
+
+        return Response(body(), status=upstream.getcode(), direct_passthrough=True,
+                        headers=[(name, upstream.headers[name]) for name in RESPONSE_HEADERS
+                                 if upstream.headers.get(name) is not None])
+
+    def _post(self, node, path, payload):
+        hop = urllib.request.Request(node + path, data=dumps(payload), method='POST',
+                                     headers={'Content-Type': 'application/json', KEY_HEADER: self.key})
+        with self._opener.open(hop, timeout=self.timeout) as response:
+            response.read()
+
+    def hand_off(self, game_id, game, node):
+        """Move one game to ``node``; it stays here if that fails."""
+        from web.web_app import games
+        with game.lock:
+            try:
+                self._post(node, '/internal/handoff', {'game_id': game_id, 'replay': game.get_replay_record()})
+            except OSError as error:
+                self._count('handoff_failed')
+                logger.warning("Handing off game %s to %s failed: %s", game_id, node, error)
+                return False
+            game.moved_to = node
+        games.pop(game_id)
+        # Spectators reconnect, through the ring, to the new owner
+        spectate.close(game_id)
+        self._count('handed_off')
+        return True
+
+    def receive(self, game_id, record):
+        """Take over a game handed off by another node."""
+        from web.web_app import WebClueGame, games
+        game = WebClueGame.replay(game_id, record)
+        games[game_id] = game
+        self._count('received')
+        return game
+
+    def set_nodes(self, nodes):
+        """Switch to a new ring and hand off the games other nodes now own."""
+        from web.web_app import games
+        ring = HashRing(nodes, self.vnodes)
+        with self._lock:
+            if ring.nodes != self.ring.nodes:
+                self.previous, self.ring = self.ring, ring
+        moved = failed = 0
+        for game_id, game in games.items():
+            owner = self.ring.owner(game_id)
+            if owner is None or owner == self.node:
+                continue
+            if self.hand_off(game_id, game, owner):
+                moved += 1
+            else:
+                failed += 1
+        logger.info("Ring is now %s; handed off %d games (%d failed)", self.ring.nodes, moved, failed)
+        return moved, failed
+
+    def metrics(self):
+        with self._metrics_lock:
+            counters = dict(self._metrics)
+        return {'node': self.node, 'nodes': list(self.ring.nodes), 'counters': counters}
+
+
+def new_game_id():
+    """A fresh id for a game created here: one this node owns when routing is on."""
+    router = current_app.extensions.get('clue_router') if has_app_context() else None
+    if router is None:
+        return str(uuid.uuid4())[:8]
+    return router.new_game_id()
+
+
+def is_peer_request():
+    """Whether the current request was forwarded by another node."""
+    router = current_app.extensions.get('clue_router')
+    return router is not None and router.is_peer()
+
+
+def routing_metrics():
+    """Router metrics for the current app, or None if routing is off."""
+    router = current_app.extensions.get('clue_router')
+    return router.metrics() if router else None
+
+
+@bp.route('/ring', methods=['POST'])
+def set_ring():
+    """Adopt a new node list, handing off games this node no longer owns."""
+    nodes = (request.get_json(silent=True) or {}).get('nodes')
+    if not isinstance(nodes, list) or not all(isinstance(node, str) for node in nodes):
+        return encode_response({'error': 'nodes must be a list of URLs'}, 400)
+    moved, failed = current_app.extensions['clue_router'].set_nodes(nodes)
+    return encode_response({'nodes': sorted(nodes), 'handed_off': moved, 'failed': failed})
+
+
+@bp.route('/handoff', methods=['POST'])
+def receive_game():
+    """Take over a game from another node by replaying its record."""
+    from web.web_app import replay_record_error
+    data = request.get_json(silent=True) or {}
+    game_id, record = data.get('game_id'), data.get('replay')
+    error = 'game_id is required' if not game_id else replay_record_error(record)
+    if error:
+        return encode_response({'error': error}, 400)
+    game = current_app.extensions['clue_router'].receive(str(game_id), record)
+    return encode_response({'game_id': game_id, 'version': game.version}, 201)
@@ -0,0 +1,89 @@
+"""
+Bounded storage for live games.
+
+Games are kept in least-recently-used order. Adding a game evicts any idle
+for longer than ``idle_seconds`` and then, past ``max_games``, the least
+recently used, so a worker's memory follows the number of games in play
+rather than its uptime. ``on_evict(game_id)`` runs for each evicted game
+(to end its spectator streams) outside the store's lock.
+"""
+
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+DEFAULT_MAX_GAMES = int(os.environ.get('CLUE_MAX_GAMES', '10000'))
+DEFAULT_IDLE_SECONDS = float(os.environ.get('CLUE_GAME_IDLE_SECONDS', str(6 * 60 * 60)))
+
+
+class GameSessions:
+    """A dict-like map of game id to game with LRU and idle-time eviction."""
+
+    def __init__(self, max_games=DEFAULT_MAX_GAMES, idle_seconds=DEFAULT_IDLE_SECONDS, on_evict=None):
+        self.max_games = max_games
+        self.idle_seconds = idle_seconds
+        self.on_evict = on_evict
+        self.evicted = Counter()  # reason -> games evicted
+        self._lock = threading.Lock()
+        self._games = OrderedDict()  # game_id -> [game, last used], least recently used first
+
+    def configure(self, max_games=None, idle_seconds=None):
+        if max_games is not None:
+            self.max_games = max_games
+        if idle_seconds is not None:
+            self.idle_seconds = idle_seconds
+
+    def get(self, game_id, default=None):
+        """The game, marking it as just used."""
+        with self._lock:
+            entry = self._games.get(game_id)
+            if entry is None:
+                return default
+            self._games.move_to_end(game_id)
+            entry[1] = time.monotonic()
+            return entry[0]
+
+    def __getitem__(self, game_id):
+        game = self.get(game_id)
+        if game is None:
+            raise KeyError(game_id)
+        return game
+
+    def __setitem__(self, game_id, game):
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            self._games[game_id] = [game, now]
+            self._games.move_to_end(game_id)
+            while self._games:
+                oldest_id, (_, last_used) = next(iter(self._games.items()))
+                if now - last_used > self.idle_seconds:
+                    reason = 'idle'
+                elif len(self._games) > self.max_games:
+                    reason = 'capacity'
+                else:
+                    break
+                del self._games[oldest_id]
+                self.evicted[reason] += 1
+                evicted.append(oldest_id)
+        if self.on_evict is not None:
+            for evicted_id in evicted:
+                self.on_evict(evicted_id)
+
+    def pop(self, game_id, default=None):
+        with self._lock:
+            entry = self._games.pop(game_id, None)
+        return default if entry is None else entry[0]
+
+    def __contains__(self, game_id):
+        with self._lock:
+            return game_id in self._games
+
+    def __len__(self):
+        return len(self._games)
+
+    def items(self):
+        """A snapshot of (game_id, game) pairs; doesn't count as use."""
+        with self._lock:
+            return [(game_id, entry[0]) for game_id, entry in self._games.items()]
@@ -0,0 +1,214 @@
+"""
+Spectator fan-out: stream a game's public state to many viewers.
+
+Each game with viewers has one Broadcaster. After every command the new
+public events are serialized once into a server-sent-event frame and
+appended to the broadcaster's bounded ring; every viewer reads those same
+bytes through its own cursor, so publishing costs the same for one viewer
+or a thousand. Frames carry WebClueGame.get_public_state, so hands and shown
+cards never leave the server. A viewer that falls more than a ring's worth
+behind skips ahead (it can resync from /api/v2/games/<game_id>/public)
+instead of holding up the game or growing memory.
+
+Each open stream holds a server thread for as long as it is watched, so a
+process serves at most ``MAX_STREAMS`` at once (CLUE_MAX_STREAMS) and
+turns further viewers away; gunicorn.conf.py gives streams that many
+threads of their own on top of those that serve play.
+"""
+
+import os
+import threading
+from collections import deque
+from itertools import islice
+
+from web.encoding import dumps
+
+SUBSCRIBER_BUFFER = 64         # Frames a viewer may fall behind before skipping ahead
+MAX_SUBSCRIBERS_PER_GAME = 2000
+HEARTBEAT_SECONDS = 15
+MAX_STREAMS = int(os.environ.get('CLUE_MAX_STREAMS', '100'))  # Open streams per process
+
+
+def sse_frame(state):
+    """Encode a public state as one server-sent event."""
+    return b'id: %d\ndata: %s\n\n' % (state['next_seq'], dumps(state))
+
+
+class Broadcaster:
+    """Encodes each public change of one game once into a ring shared by its viewers."""
+
+    def __init__(self, game_id, buffer=SUBSCRIBER_BUFFER):
+        self.game_id = game_id
+        self.frames = deque(maxlen=buffer)
+        self.frame_count = 0         # Frames ever published; frames[0] is number frame_count - len(frames)
+        self.subscribers = 0
+        self.published_seq = None
+        self.closed = False
+        self._changed = threading.Condition()
+
+    def subscribe(self, game):
+        """Add a viewer, starting with a snapshot of the game so far. Hold ``game.lock``."""
+        with self._changed:
+            if self.subscribers >= MAX_SUBSCRIBERS_PER_GAME:
+                return None
+            self.subscribers += 1
+            if self.published_seq is None:
+                self.published_seq = len(game.events)
+            return Subscription(self, sse_frame(game.get_public_state()), self.frame_count)
+
+    def unsubscribe(self):
+        """Drop a viewer; returns True when none are left."""
+        with self._changed:
+            self.subscribers -= 1
+            return self.subscribers <= 0
+
+    def publish(self, game):
+        """Queue events added since the last publish for every viewer. Hold ``game.lock``."""
+        with self._changed:
+            if not self.subscribers or self.published_seq == len(game.events):
+                return
+            self.frames.append(sse_frame(game.get_public_state(self.published_seq)))
+            self.frame_count += 1
+            self.published_seq = len(game.events)
+            self.closed = game.game_over
+            self._changed.notify_all()
+
+    def close(self):
+        """End every viewer's stream once it has read the frames already queued."""
+        with self._changed:
+            self.closed = True
+            self._changed.notify_all()
+
+
+class Subscription:
+    """One viewer's position in a broadcaster's ring."""
+
+    def __init__(self, broadcaster, snapshot, cursor):
+        self.broadcaster = broadcaster
+        self.snapshot = snapshot
+        self.cursor = cursor
+        self.dropped = 0
+        self.active = True
+
+    def behind(self):
+        return self.broadcaster.frame_count - self.cursor
+
+    def wait(self, timeout=HEARTBEAT_SECONDS):
+        """Frames published since the last call (empty on timeout), or None once the game is over."""
+        broadcaster = self.broadcaster
+        if self.snapshot is not None:
+            frames, self.snapshot = [self.snapshot], None
+            return frames
+        with broadcaster._changed:
+            if self.cursor == broadcaster.frame_count and not broadcaster.closed:
+                broadcaster._changed.wait(timeout)
+            oldest = broadcaster.frame_count - len(broadcaster.frames)
+            if self.cursor < oldest:
+                self.dropped += oldest - self.cursor
+                self.cursor = oldest
+            frames = list(islice(broadcaster.frames, self.cursor - oldest, None))
+            self.cursor = broadcaster.frame_count
+            if not frames and broadcaster.closed:
+                return None
+        return frames
+
+
+broadcasters = {}
+_broadcasters_lock = threading.Lock()
+_open_streams = 0
+
+
+def subscribe(game):
+    """Subscribe a new viewer to a game (hold ``game.lock``).
+
+    Returns None if the game already has too many viewers. Viewers of a
+    finished game get its final snapshot and nothing more.
+    """
+    if game.game_over:
+        finished = Broadcaster(game.game_id)
+        finished.closed = True
+        return finished.subscribe(game)
+    with _broadcasters_lock:
+        broadcaster = broadcasters.get(game.game_id)
+        if broadcaster is None:
+            broadcaster = broadcasters[game.game_id] = Broadcaster(game.game_id)
+        return broadcaster.subscribe(game)
+
+
+def unsubscribe(subscription):
+    broadcaster = subscription.broadcaster
+    with _broadcasters_lock:
+        if not subscription.active:
+            return
+        subscription.active = False
+        if broadcaster.unsubscribe() and broadcasters.get(broadcaster.game_id) is broadcaster:
+            del broadcasters[broadcaster.game_id]
+
+
+def publish(game):
+    """Fan out a game's new public events; a dict lookup when nobody is watching."""
+    broadcaster = broadcasters.get(game.game_id)
+    if broadcaster is not None:
+        broadcaster.publish(game)
+
+
+def close(game_id):
+    """End the streams of a game that is going away."""
+    broadcaster = broadcasters.get(game_id)
+    if broadcaster is not None:
+        broadcaster.close()
+
+
+def stream(subscription):
+    """Server-sent-event body: frames as they arrive, with heartbeats while idle."""
+    try:
+        while True:
+            frames = subscription.wait(HEARTBEAT_SECONDS)
+            if frames is None:
+                return
+            if not frames:
+                yield b': keepalive\n\n'
+            for frame in frames:
+                yield frame
+    finally:
+        unsubscribe(subscription)
+
+
+class Stream:
+    """A response body for one viewer, holding one of the process's MAX_STREAMS until closed."""
+
+    def __init__(self, subscription):
+        self.subscription = subscription
+        self._body = stream(subscription)
+        self._closed = False
+
+    def __iter__(self):
+        return self._body
+
+    def close(self):
+        """Called by the server when the response ends or the viewer goes away."""
+        global _open_streams
+        if self._closed:
+            return
+        self._closed = True
+        self._body.close()
+        unsubscribe(self.subscription)  # In case the body was never read
+        with _broadcasters_lock:
+            _open_streams -= 1
+
+
+def open_stream(subscription):
+    """A Stream for ``subscription``, or None (unsubscribing it) if this process has MAX_STREAMS open."""
+    global _open_streams
+    with _broadcasters_lock:
+        full = _open_streams >= MAX_STREAMS
+        if not full:
+            _open_streams += 1
+    if full:
+        unsubscribe(subscription)
+        return None
+    return Stream(subscription)
+
+
+def stream_count():
+    return _open_streams
@@ -3,38 +3,131 @@
 Web version of Clue Game with version management
 """
 
-from flask import Flask, render_template, jsonify, request, session
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flask import Blueprint, Flask, current_app, has_app_context, render_template, request, session
+from werkzeug.middleware.proxy_fix import ProxyFix
+from src.clue_game.analytics.postgame import analyze_game
+from src.clue_game.analytics.store import record_finished_game
 from src.clue_game.engine.game_logic import ClueEngine
-import json
-import uuid
-import random
-from datetime import datetime
+from src.clue_game.engine.persistent import PersistentLog
+from web import spectate
+from web.commands import complete, match_card, parse_cards
+from web.encoding import encode_response
+from web.jobs import DEFAULT_WORKERS, MAX_RESULTS, JobQueue
+from web.limits import DEFAULT_MAX_IN_FLIGHT, AdmissionControl, admission_metrics
+from web.pool import GamePool
+from web.routing import GameMoved, Router, new_game_id, routing_metrics
+from web.sessions import DEFAULT_IDLE_SECONDS, DEFAULT_MAX_GAMES, GameSessions
+from web.rendering import (
+    AI_COLOR, CARD_COLORS, MAP_HEADER, NOTEBOOK_HEADER, NOTEBOOK_ROOMS_HEADER,
+    NOTEBOOK_ROWS, NOTEBOOK_WEAPONS_HEADER, RULES_TEXT, SUSPECT_COLORS, color_code_message,
+)
+import copy
+import logging
 import os
+import threading
+from collections import Counter
+from datetime import datetime
+from functools import partial
+
+bp = Blueprint('clue', __name__)
+logger = logging.getLogger(__name__)
+
+# Game sessions storage (in production, use database); idle and least
+# recently used games are evicted, ending their spectator streams
+def evicted(analysis, game_id):
+    """Let go of what else is kept for a game the store evicted: spectator streams and analysis."""
+    spectate.close(game_id)
+    if analysis is not None:
+        analysis.discard(game_id)
+
+games = GameSessions(on_evict=spectate.close)
+
+DIFFICULTIES = ('Easy', 'Medium', 'Hard')
+MAX_AI = 5  # Six suspects: you and at most five AIs
+MAX_SEED = 2 ** 64  # Seeds are stored as 64-bit values, see analytics/store.py
+MAX_REPLAY_COMMANDS = 10000
+MAX_COMMAND_LENGTH = 1000
+MAX_ANALYSIS_WAIT = 30.0  # Seconds /api/analysis may hold a request for a pending result
+
+# Event fields only the players involved may see
+PRIVATE_EVENT_FIELDS = frozenset({'card', 'cards'})
 
-app = Flask(__name__, template_folder='../templates')
-app.secret_key = 'clue-game-secret-key'
+def is_int(value):
+    """Whether ``value`` is an int (JSON true and false are bools, not numbers)."""
+    return isinstance(value, int) and not isinstance(value, bool)
 
-# Game sessions storage (in production, use database)
-games = {}
+def seed_error(seed):
+    """Why ``seed`` can't seed a game, or None if it can (None deals a random game)."""
+    if seed is not None and (not is_int(seed) or abs(seed) >= MAX_SEED):
+        return 'seed must be an integer smaller than 2**64 in magnitude'
+    return None
+
+def game_setup_error(num_ai, difficulty, seed=None):
+    """Why a game can't be dealt with these settings, or None if it can."""
+    if not is_int(num_ai) or not 1 <= num_ai <= MAX_AI:
+        return f'num_ai must be an integer from 1 to {MAX_AI}'
+    if difficulty not in DIFFICULTIES:
+        return f"difficulty must be one of {', '.join(DIFFICULTIES)}"
+    return seed_error(seed)
+
+def replay_record_error(record):
+    """Why a replay record can't be replayed, or None if it can."""
+    if not isinstance(record, dict) or record.get('seed') is None:
+        return 'Replay record with a seed is required'
+    error = game_setup_error(record.get('num_ai', 2), record.get('difficulty', 'Medium'), record['seed'])
+    if error:
+        return error
+    commands = record.get('commands', [])
+    if (not isinstance(commands, list) or len(commands) > MAX_REPLAY_COMMANDS
+            or not all(isinstance(command, str) and len(command) <= MAX_COMMAND_LENGTH for command in commands)):
+        return f'commands must be a list of at most {MAX_REPLAY_COMMANDS} strings'
+    iterations = record.get('search_iterations', [])
+    if (not isinstance(iterations, list) or len(iterations) > MAX_REPLAY_COMMANDS
+            or not all(is_int(count) and count >= 1 for count in iterations)):
+        return f'search_iterations must be a list of at most {MAX_REPLAY_COMMANDS} positive integers'
+    return None
+
+def public_event(event):
+    """An event with the private card fields removed."""
+    if PRIVATE_EVENT_FIELDS.isdisjoint(event):
+        return event
+    return {key: value for key, value in event.items() if key not in PRIVATE_EVENT_FIELDS}
 
 class WebClueGame:
     """Web wrapper for ClueEngine with session management."""
     
-    def __init__(self, game_id, num_ai=2, difficulty="Medium"):
+    def __init__(self, game_id, num_ai=2, difficulty="Medium", seed=None):
         self.game_id = game_id
-        self.game = ClueEngine(num_ai=num_ai, difficulty=difficulty)
+        self.game = ClueEngine(num_ai=num_ai, difficulty=difficulty, seed=seed)
+        self.lock = threading.Lock()  # Serializes commands for this game only
+        self.seed = self.game.seed
+        self.command_history = PersistentLog()  # Human commands in order, for exact replay
         self.player_turn_active = True
         self.current_ai_index = 0
-        self.game_log = []
+        self.game_log = PersistentLog()
         self.version = "2.0.5"
         self.created_at = datetime.now().isoformat()
         self.player_suggested_this_turn = False
         self.auto_track_notebook = True
-        self.revealed_cards = set()  # Track cards that have been revealed
+        self.revealed_cards = frozenset()  # Track cards that have been revealed
+        self.waiting_for_disproval = False
+        self.pending_suggestion = None
+        self.pending_disproval_cards = None
+        self.game_over = False
+        self.winner = None  # Seat of the winner: 0 is you, n is AI_n
+        self.events = PersistentLog()  # Structured log for the JSON API, see add_event
+        # Undo/redo: (state, older) pairs, newest first, sharing structure with the live game
+        self.step = 0  # Actions taken to reach the current state
+        self.undo_history = None
+        self.redo_history = None
+        self.analytics_recorded = False
+        # Characters by seat; game.turns has the seats still playing
+        self.seat_characters = [self.game.player_character] + list(self.game.ai_characters)
+        self.replaying = False  # Replays re-finish a game that was already recorded
+        self.moved_to = None  # Node this game was handed off to, see web/routing.py
         
+        self.add_event('game_started', character=self.game.player_character,
+                       location=self.game.current_location, num_ai=num_ai)
         # Add welcome messages
         self.add_log(f"Welcome to Clue! You are {self.game.player_character}.")
         self.add_log(f"Your starting location: {self.game.current_location}")
@@ -42,79 +135,82 @@ class WebClueGame:
         self.add_log("💡 Remember: You can only take ONE action this turn (move, suggest, or accuse).")
         self.add_log("Your turn!")
         
+    def activate(self, game_id):
+        """Give a game built ahead of time its id, and date it and its welcome from now."""
+        self.game_id = game_id
+        self.created_at = datetime.now().isoformat()
+        timestamp = datetime.now().strftime("%H:%M")
+        self.game_log = PersistentLog(f"[{timestamp}]{line[len('[HH:MM]'):]}" for line in self.game_log)
+    
     def add_log(self, message):
-        """Add message to game log with timestamp and color coding."""
+        """Add message to game log with timestamp; color coding happens on display."""
         timestamp = datetime.now().strftime("%H:%M")
-        # Apply color coding to the message
-        colored_message = self.color_code_message(message)
-        self.game_log.append(f"[{timestamp}] {colored_message}")
+        self.game_log.append(f"[{timestamp}] {message}")
     
     def color_code_message(self, message):
         """Apply color coding to game elements in messages."""
-        # Define unique colors for each suspect
-        suspect_colors = {
-            "Miss Scarlet": "#FF1493",  # Deep Pink
-            "Col. Mustard": "#FFD700",  # Gold
-            "Mrs. White": "#F0F8FF",    # Alice Blue
-            "Mr. Green": "#32CD32",     # Lime Green
-            "Mrs. Peacock": "#4169E1",  # Royal Blue
-            "Prof. Plum": "#9370DB"     # Medium Purple
-        }
-        
-        # Define colors for weapons
-        weapon_colors = {
-            "Candlestick": "#FFA500",   # Orange
-            "Knife": "#C0C0C0",         # Silver
-            "Lead Pipe": "#708090",      # Slate Gray
-            "Revolver": "#8B4513",       # Saddle Brown
-            "Rope": "#D2691E",          # Chocolate
-            "Wrench": "#696969"         # Dim Gray
+        return color_code_message(message)
+    
+    def add_event(self, event_type, **data):
+        """Record a structured game event; seats are 0 for you and n for AI_n."""
+        self.events.append({'seq': len(self.events), 'type': event_type, **data})
+    
+    def end_game(self, winner):
+        """Mark the game finished; winner is a seat number or None."""
+        self.game_over = True
+        self.winner = winner
+        self.player_turn_active = False
+        self.add_event('game_over', winner=winner, solution=dict(self.game.secret_envelope))
+        # Undoing and finishing again, replays and forks don't count as new games
+        if not self.analytics_recorded:
+            if not self.replaying:
+                record_finished_game(self.get_analytics_record())
+            self.analytics_recorded = True
+        if not self.replaying:
+            queue_analysis(self)
+    
+    def get_analytics_record(self):
+        """Summarize this game for the analytics store (src/clue_game/analytics)."""
+        counts = Counter(event['type'] for event in self.events)
+        # The human takes one action per turn; an AI turn is a move or a
+        # suggestion, optionally followed by an accusation
+        human_accusations = sum(1 for event in self.events
+                                if event['type'] == 'accused' and event['seat'] == 0)
+        return {
+            'seed': self.seed,
+            'human': True,
+            'characters': self.seat_characters,
+            'strategies': ['human'] + [strategy.name for strategy in self.game.ai_strategies],
+            'envelope': dict(self.game.secret_envelope),
+            'winner': self.winner,
+            'turns': counts['moved'] + counts['suggested'] + human_accusations,
+            'suggestions': counts['suggested'],
+            'disprovals': counts['disproved'],
+            'accusations': counts['accused'],
         }
-        
-        # Define colors for rooms
-        room_colors = {
-            "Kitchen": "#FF6347",        # Tomato
-            "Ballroom": "#FF69B4",       # Hot Pink
-            "Conservatory": "#98FB98",   # Pale Green
-            "Billiard Room": "#87CEEB",  # Sky Blue
-            "Library": "#DDA0DD",        # Plum
-            "Study": "#F0E68C",          # Khaki
-            "Hall": "#DEB887",           # Burlywood
-            "Lounge": "#FFB6C1",         # Light Pink
-            "Dining Room": "#20B2AA"     # Light Sea Green
+    
+    def get_analysis_input(self):
+        """Hands, envelope and events for post-game analysis (src/clue_game/analytics/postgame.py)."""
+        return {
+            'hands': [list(self.game.player_hand)] + [list(hand) for hand in self.game.ai_hands],
+            'envelope': dict(self.game.secret_envelope),
+            'characters': self.seat_characters,
+            'strategies': ['human'] + [strategy.name for strategy in self.game.ai_strategies],
+            'winner': self.winner,
+            'events': list(self.events),
         }
-        
-        # Apply suspect colors
-        for suspect, color in suspect_colors.items():
-            message = message.replace(suspect, f'<span style="color: {color}; font-weight: bold;">{suspect}</span>')
-        
-        # Apply weapon colors
-        for weapon, color in weapon_colors.items():
-            message = message.replace(weapon, f'<span style="color: {color}; font-weight: bold;">{weapon}</span>')
-        
-        # Apply room colors
-        for room, color in room_colors.items():
-            message = message.replace(room, f'<span style="color: {color}; font-weight: bold;">{room}</span>')
-        
-        # Apply generic player/AI indicators
-        message = message.replace("(You)", '<span style="color: #00FF00; font-weight: bold;">(You)</span>')
-        message = message.replace("You ", '<span style="color: #00FF00; font-weight: bold;">You</span> ')
-        message = message.replace("AI", '<span style="color: #FF4500; font-weight: bold;">AI</span>')
-        
-        return message
     
     def track_revealed_card(self, card, revealing_player):
         """Track a card that has been revealed during gameplay."""
         if self.auto_track_notebook:
-            self.revealed_cards.add(card)
+            self.revealed_cards |= {card}
             self.add_log(f"[AUTO-TRACK] {card} marked as revealed by {revealing_player}")
     
     def get_notebook_status(self):
         """Get current notebook status with all cards and their states."""
-        all_cards = self.game.SUSPECTS + self.game.WEAPONS + self.game.ROOMS
         notebook_status = {}
         
-        for card in all_cards:
+        for card in self.game.ALL_CARDS:
             if card in self.game.player_hand:
                 status = "in_hand"
             elif card in self.revealed_cards:
@@ -140,94 +236,436 @@ class WebClueGame:
         output.append(f"Current Location: {self.game.current_location}")
         output.append("")
         
-        # Game log (last 10 entries)
+        # Game log (last 10 entries), colorized only when displayed
         for log_entry in self.game_log[-10:]:
-            output.append(log_entry)
+            output.append(color_code_message(log_entry))
         
         return "<br>".join(output)
+    
+    def get_map_output(self):
+        """Mansion map with everyone's current location."""
+        map_str = MAP_HEADER + f"""You (<span style='color: #00FF00;'>{self.game.player_character}</span>): <span style='color: #DEB887;'>{self.game.current_location}</span><br>
+"""
+        for i, loc in enumerate(self.game.ai_locations):
+            ai_number = i + 1
+            map_str += f"<span style='color: #FF4500;'>{self.game.ai_characters[i]}</span> (<span style='color: #FF4500; font-weight: bold;'>AI_{ai_number}</span>): {loc}<br>"
+        return map_str
+    
+    def get_notebook_output(self):
+        """Detective's checklist tables built from the notebook status."""
+        notebook_status = self.get_notebook_status()
+        
+        cards_str = NOTEBOOK_HEADER
+        cards_str += "".join(NOTEBOOK_ROWS[card, notebook_status[card]] for card in self.game.SUSPECTS)
+        cards_str += NOTEBOOK_WEAPONS_HEADER
+        cards_str += "".join(NOTEBOOK_ROWS[card, notebook_status[card]] for card in self.game.WEAPONS)
+        cards_str += NOTEBOOK_ROOMS_HEADER
+        cards_str += "".join(NOTEBOOK_ROWS[card, notebook_status[card]] for card in self.game.ROOMS)
+        
+        cards_str += "</table><br>"
+        cards_str += f"<b>Auto-tracking: {'ON' if self.auto_track_notebook else 'OFF'}</b><br>"
+        cards_str += "Use 'toggle_autotrack' to enable/disable"
+        return cards_str
+    
+    def get_players_output(self):
+        """All players with their characters and locations."""
+        players_str = f"""
+<b>Game Players:</b><br>
+<br>
+<span style='color: #00FF00; font-weight: bold;'>You ({self.game.player_character})</span><br>
+  Character: {self.game.player_character}<br>
+  Location: {self.game.current_location}<br>
+  Cards: {len(self.game.player_hand)} cards<br>
+<br>
+"""
+        for i, (char, loc) in enumerate(zip(self.game.ai_characters, self.game.ai_locations)):
+            color = SUSPECT_COLORS.get(char, AI_COLOR)
+            ai_number = i + 1
+            players_str += f"<span style='color: {color}; font-weight: bold;'>{char}</span> (<span style='color: #FF4500; font-weight: bold;'>AI_{ai_number}</span>)<br>"
+            players_str += f"  Location: {loc}<br>"
+        return players_str
+    
+    def get_state(self, since=0):
+        """Typed game state for API clients, with events from seq ``since`` on."""
+        pending = None
+        if getattr(self, 'waiting_for_disproval', False):
+            pending = {
+                'suggestion': {key: self.pending_suggestion[key] for key in ('suspect', 'weapon', 'room')},
+                'by': self.current_ai_index + 1,
+                'cards': list(self.pending_disproval_cards)
+            }
+        return {
+            'game_id': self.game_id,
+            'version': self.version,
+            'character': self.game.player_character,
+            'location': self.game.current_location,
+            'valid_moves': list(self.game.get_valid_moves()),
+            'player_turn': self.player_turn_active,
+            'current_ai': self.current_ai_index + 1,
+            'hand': list(self.game.player_hand),
+            'notebook': self.get_notebook_status(),
+            'auto_track': self.auto_track_notebook,
+            'players': self.get_players_state(),
+            'pending_disproval': pending,
+            'game_over': self.game_over,
+            'winner': self.winner,
+            'events': self.events[since:],
+            'next_seq': len(self.events)
+        }
+    
+    def get_players_state(self):
+        """Seat, character, location and hand size of every player."""
+        players = [{
+            'seat': 0,
+            'character': self.game.player_character,
+            'location': self.game.current_location,
+            'hand_size': len(self.game.player_hand),
+            'active': True
+        }]
+        for i, char in enumerate(self.game.ai_characters):
+            players.append({
+                'seat': i + 1,
+                'character': char,
+                'location': self.game.ai_locations[i],
+                'hand_size': len(self.game.ai_hands[i]),
+                'active': i + 1 in self.game.turns
+            })
+        return players
+    
+    def get_public_state(self, since=0):
+        """What a spectator may see: get_state without hands, notebook or shown cards."""
+        return {
+            'game_id': self.game_id,
+            'player_turn': self.player_turn_active,
+            'current_ai': self.current_ai_index + 1,
+            'players': self.get_players_state(),
+            'game_over': self.game_over,
+            'winner': self.winner,
+            'events': [public_event(event) for event in self.events[since:]],
+            'next_seq': len(self.events)
+        }
+    
+    def pass_turn(self):
+        """Move on from the current AI to the next seat still playing; True if that's you."""
+        seat = self.game.turns.next(self.current_ai_index + 1)
+        if seat != ClueEngine.HUMAN_SEAT:
+            self.current_ai_index = seat - 1
+            return False
+        # The AIs' next round starts with the first one after you, if any are left
+        first_ai = self.game.turns.next(seat)
+        if first_ai != seat:
+            self.current_ai_index = first_ai - 1
+        return True
+    
+    def capture_state(self):
+        """Everything an action can change, as immutable values shared with the live game."""
+        return (self.step, self.player_turn_active, self.current_ai_index, self.player_suggested_this_turn,
+                self.revealed_cards, self.waiting_for_disproval, self.pending_suggestion,
+                self.pending_disproval_cards, self.game_over, self.winner,
+                self.game_log.version(), self.events.version(), self.game.capture_state())
+    
+    def restore_state(self, state):
+        """Return to a state from capture_state."""
+        (self.step, self.player_turn_active, self.current_ai_index, self.player_suggested_this_turn,
+         self.revealed_cards, self.waiting_for_disproval, self.pending_suggestion,
+         self.pending_disproval_cards, self.game_over, self.winner,
+         game_log, events, engine_state) = state
+        self.game_log.restore(game_log)
+        self.events.restore(events)
+        self.game.restore_state(engine_state)
+    
+    def save_undo_point(self, state):
+        self.undo_history = (state, self.undo_history)
+        self.redo_history = None
+    
+    def undo(self):
+        """Step back one action; returns False if there is nothing to undo."""
+        if self.undo_history is None:
+            return False
+        state, self.undo_history = self.undo_history
+        self.redo_history = (self.capture_state(), self.redo_history)
+        self.restore_state(state)
+        return True
+    
+    def redo(self):
+        """Re-apply the last undone action; returns False if there is nothing to redo."""
+        if self.redo_history is None:
+            return False
+        state, self.redo_history = self.redo_history
+        self.undo_history = (self.capture_state(), self.undo_history)
+        self.restore_state(state)
+        return True
+    
+    def fork(self, game_id):
+        """A new game in this game's current state, sharing its logs and undo history."""
+        child = copy.copy(self)
+        child.game_id = game_id
+        child.lock = threading.Lock()
+        child.created_at = datetime.now().isoformat()
+        child.game = self.game.fork()
+        child.game_log = self.game_log.copy()
+        child.events = self.events.copy()
+        child.command_history = self.command_history.copy()
+        child.replaying = False
+        child.analytics_recorded = True  # What-if branches stay out of the analytics
+        child.restore_state(self.capture_state())
+        return child
+    
+    def get_replay_record(self):
+        """Everything needed to reproduce this game: its seed, setup and commands."""
+        return {
+            'seed': self.seed,
+            'num_ai': self.game.num_ai,
+            'difficulty': self.game.difficulty,
+            'commands': list(self.command_history),
+            'search_iterations': list(self.game.search_iterations)
+        }
+    
+    @classmethod
+    def replay(cls, game_id, record):
+        """Rebuild a game by re-running a replay record's commands from its seed."""
+        game = cls(game_id, num_ai=record['num_ai'], difficulty=record['difficulty'], seed=record['seed'])
+        game.replaying = True
+        game.game.replay_search_iterations.extend(record.get('search_iterations', []))
+        for command in record['commands']:
+            run_command(game, command)
+        game.replaying = False
+        return game
 
-@app.route('/')
+@bp.route('/')
 def index():
     """Main game page."""
-    return render_template('game.html')
+    # The page is static, so serve the copy rendered by create_app unless
+    # the developer server is reloading templates.
+    if current_app.debug:
+        return render_template('game.html')
+    return encode_response(current_app.extensions['clue_index_html'], cache_key='index', mimetype='text/html')
 
-@app.route('/api/new_game', methods=['POST'])
+def start_game(num_ai, difficulty, seed=None):
+    """Register a new game under a fresh id, taken from the app's pool when it has one."""
+    pool = current_app.extensions.get('clue_game_pool')
+    if pool is not None:
+        game = pool.claim(num_ai, difficulty, seed)
+    else:
+        game = WebClueGame(None, num_ai=num_ai, difficulty=difficulty, seed=seed)
+    game.activate(new_game_id())
+    games[game.game_id] = game
+    return game
+
+@bp.route('/api/new_game', methods=['POST'])
 def new_game():
     """Start a new game session."""
-    data = request.get_json()
-    game_id = str(uuid.uuid4())[:8]
+    data = request.get_json(silent=True) or {}
     
     # Get player count and difficulty from frontend
     num_ai = data.get('num_ai', 2)  # Default to 2 AI
     difficulty = data.get('difficulty', 'Medium')  # Default to Medium
+    seed = data.get('seed')  # Optional, to reproduce a game
+    error = game_setup_error(num_ai, difficulty, seed)
+    if error:
+        return encode_response({'error': error}, 400)
     
-    game = WebClueGame(game_id, num_ai=num_ai, difficulty=difficulty)
-    games[game_id] = game
+    game = start_game(num_ai, difficulty, seed)
     
-    return jsonify({
-        'game_id': game_id,
+    logger.debug("New game %s created with version %s", game.game_id, game.version)
+    return encode_response({
+        'game_id': game.game_id,
         'version': game.version,
         'output': game.get_display_output(),
         'player_turn': game.player_turn_active,
         'location': game.game.current_location
     })
-    print(f"DEBUG: New game created with version: {game.version}")
 
-@app.route('/api/load_game', methods=['POST'])
+@bp.route('/api/load_game', methods=['POST'])
 def load_game():
     """Load existing game by ID."""
     data = request.get_json()
     game_id = data.get('game_id')
     
-    if game_id in games:
-        game = games[game_id]
-        return jsonify({
-            'game_id': game_id,
-            'version': game.version,
-            'output': game.get_display_output(),
-            'player_turn': game.player_turn_active
-        })
+    game = games.get(game_id)
+    if game is not None:
+        with game.lock:
+            return encode_response({
+                'game_id': game_id,
+                'version': game.version,
+                'output': game.get_display_output(),
+                'player_turn': game.player_turn_active
+            })
     else:
-        return jsonify({'error': 'Game not found'}), 404
+        return encode_response({'error': 'Game not found'}, 404)
 
-@app.route('/api/game_info', methods=['POST'])
+@bp.route('/api/game_info', methods=['POST'])
 def get_game_info():
     """Get current game state info."""
     data = request.get_json()
     game_id = data.get('game_id')
     
-    if game_id not in games:
-        return jsonify({'error': 'Game not found'}), 404
-    
-    game = games[game_id]
+    game = games.get(game_id)
+    if game is None:
+        return encode_response({'error': 'Game not found'}, 404)
     
-    print(f"DEBUG: game.game.current_location = '{game.game.current_location}'")
-    print(f"DEBUG: type: {type(game.game.current_location)}")
+    logger.debug("Game %s current_location = %r", game_id, game.game.current_location)
     
-    return jsonify({
-        'current_location': game.game.current_location,
-        'available_moves': game.game.get_valid_moves(),
-        'player_character': game.game.player_character
-    })
+    with game.lock:
+        return encode_response({
+            'current_location': game.game.current_location,
+            'available_moves': game.game.get_valid_moves(),
+            'player_character': game.game.player_character
+        })
 
-@app.route('/api/command', methods=['POST'])
+@bp.route('/api/command', methods=['POST'])
 def handle_command():
     """Process game commands."""
     data = request.get_json()
     game_id = data.get('game_id')
     command = data.get('command', '').lower().strip()
     
-    # Log all incoming commands for debugging
-    print(f"DEBUG: Received command: '{command}' for game {game_id}")
+    logger.debug("Received command %r for game %s", command, game_id)
     
-    if game_id not in games:
-        return jsonify({'error': 'Game not found'}), 404
+    game = games.get(game_id)
+    if game is None:
+        return encode_response({'error': 'Game not found'}, 404)
     
-    game = games[game_id]
+    # Commands for one game run one at a time; other games are unaffected
+    with game.lock:
+        result = run_command(game, command)
+    
+    # The rules payload only varies with whose turn it is, so encode it once
+    cache_key = f"rules:{result['player_turn']}" if command == 'rules' else None
+    return encode_response(result, cache_key=cache_key)
+
+def run_command(game, command, render=True):
+    """Apply one command to a game and return the response payload.
+
+    With ``render`` the payload carries the HTML ``output`` the web page
+    shows; without it no HTML is built at all (see web/api_v2.py).
+    Callers must hold ``game.lock``.
+    """
+    if game.moved_to:
+        # Handed off while this request waited for the lock
+        raise GameMoved(game.moved_to)
+    if command in READ_ONLY_COMMANDS:
+        # Views change nothing, so replays (and memory) can do without them
+        return _render(game, _apply_command(game, command), render)
+    
+    game.command_history.append(command)
+    if command in HISTORY_COMMANDS:
+        result = _apply_history_command(game, command)
+    else:
+        before = game.capture_state()
+        events_before = len(game.events)
+        # Randomness is drawn per action, so undoing and repeating an action
+        # repeats its outcome and saved states never copy the generator
+        game.game.rng.seed(f"{game.seed}:{game.step}")
+        result = _apply_command(game, command)
+        # Every action records an event; views, help and refused commands don't
+        if len(game.events) != events_before:
+            game.step += 1
+            game.save_undo_point(before)
+    spectate.publish(game)
+    return _render(game, result, render)
+
+def _render(game, result, render):
+    if render:
+        view = result.pop('view', None)
+        result['output'] = VIEW_RENDERERS[view](game) if view else game.get_display_output()
+    return result
+
+# Responses for commands that were refused; the game state is unchanged
+REJECTED_RESPONSES = frozenset({
+    "Not your turn", "Invalid move", "Must be in suggested room", "Already suggested this turn",
+    "Invalid suggestion format", "Use suggestion interface", "Invalid accusation format",
+    "Use accusation interface", "Invalid card choice", "Unknown command", "Game over",
+    "Nothing to undo", "Nothing to redo"
+})
+
+MAX_BATCH_COMMANDS = 50
+
+def run_batch(game, commands):
+    """Run several commands in order and stop early when one can't proceed.
+
+    Stops after the first refused command, when the game ends, or when an AI
+    suggestion needs a disproval and the next command isn't a ``disprove``.
+    Returns per-command results (without rendered output) and why it stopped.
+    Callers must hold ``game.lock`` for the whole batch.
+    """
+    results = []
+    stopped = None
+    for i, command in enumerate(commands):
+        result = run_command(game, command, render=False)
+        result.pop('view', None)
+        ok = result['response'] not in REJECTED_RESPONSES
+        results.append({'command': command, 'response': result['response'], 'ok': ok})
+        if 'fork_id' in result:
+            results[-1]['fork_id'] = result['fork_id']
+        
+        if not ok:
+            stopped = 'rejected'
+        elif game.game_over:
+            stopped = 'game_over'
+        elif result.get('waiting_for_disproval'):
+            results[-1]['available_cards'] = result['available_cards']
+            next_command = commands[i + 1] if i + 1 < len(commands) else ''
+            if not next_command.startswith('disprove'):
+                stopped = 'waiting_for_disproval'
+        if stopped:
+            break
+    return results, stopped
+
+MAX_COMPLETE_LENGTH = 200  # Longest partial command /api/complete looks at
+
+# Commands that move between saved states rather than act; allowed after the game ends
+HISTORY_COMMANDS = ('undo', 'redo', 'fork')
+
+def _apply_history_command(game, command):
+    """Undo, redo, or fork the game into a new game id; none of these are undoable."""
+    if command == 'undo':
+        if game.undo():
+            game.add_log("↩️ Undid the last action")
+            response = "Undone"
+        else:
+            game.add_log("Nothing to undo")
+            response = "Nothing to undo"
+        return {'response': response, 'player_turn': game.player_turn_active}
+    
+    if command == 'redo':
+        if game.redo():
+            game.add_log("↪️ Redid the last undone action")
+            response = "Redone"
+        else:
+            game.add_log("Nothing to redo")
+            response = "Nothing to redo"
+        return {'response': response, 'player_turn': game.player_turn_active}
+    
+    # Both branches continue from the same restored state (dropping AI search
+    # caches), so replaying either history rebuilds it exactly
+    game.restore_state(game.capture_state())
+    result = {'response': "Forked", 'player_turn': game.player_turn_active}
+    if not game.replaying:
+        fork_id = new_game_id()
+        games[fork_id] = game.fork(fork_id)
+        game.add_log(f"Forked this game as {fork_id}")
+        result['fork_id'] = fork_id
+    return result
+
+# Commands that only look at the game and are allowed after it ends
+VIEW_COMMANDS = ('help', 'map', 'rules', 'notebook', 'players', 'toggle_autotrack')
+# Of those, the ones that only render and don't even log
+READ_ONLY_COMMANDS = frozenset({'map', 'rules', 'notebook', 'players'})
+
+def _apply_command(game, command):
+    """Update game state for one command; the result names a view to render, if any."""
+    if game.game_over and command not in VIEW_COMMANDS:
+        game.add_log("The game is over. Start a new game to play again.")
+        return {
+            'response': "Game over",
+            'player_turn': game.player_turn_active,
+            'location': game.game.current_location
+        }
     
     # Process commands
     if command == 'help':
-        game.add_log("Commands: move, suggest, accuse, map, rules, notebook, players")
+        game.add_log("Commands: move, suggest, accuse, map, rules, notebook, players, undo, redo, fork")
         response = "Help displayed"
         
     elif command == 'move' and not game.player_turn_active:
@@ -253,464 +691,167 @@ def handle_command():
         game.add_log(f"Trying to move to: '{room}'")
         game.add_log(f"Available moves: {moves}")
         
-        # Try exact match first
-        if room in moves:
-            game.game.current_location = room
-            game.add_log(f"You moved to {room}")
+        # Case-insensitive match first, then whichever room the text names despite typos
+        exact_room = next((m for m in moves if m.lower() == room.lower()), None) or match_card(room, 'room')
+        if exact_room in moves:
+            game.game.current_location = exact_room
+            game.add_log(f"You moved to {exact_room}")
+            game.add_event('moved', seat=0, room=exact_room)
             game.player_turn_active = False
             game.player_suggested_this_turn = False
-            response = f"Moved to {room}"
+            response = f"Moved to {exact_room}"
         else:
-            # Try case-insensitive match
-            room_lower = room.lower()
-            moves_lower = [m.lower() for m in moves]
-            if room_lower in moves_lower:
-                # Find the exact room name
-                exact_room = moves[moves_lower.index(room_lower)]
-                game.game.current_location = exact_room
-                game.add_log(f"You moved to {exact_room}")
-                game.player_turn_active = False
-                game.player_suggested_this_turn = False
-                response = f"Moved to {exact_room}"
-            else:
-                game.add_log(f"Invalid move. Available: {', '.join(moves)}")
-                game.add_log(f"Try typing exactly: {moves[0] if moves else 'No moves available'}")
-                response = "Invalid move"
+            game.add_log(f"Invalid move. Available: {', '.join(moves)}")
+            game.add_log(f"Try typing exactly: {moves[0] if moves else 'No moves available'}")
+            response = "Invalid move"
             
     elif command.startswith('suggest') and not game.player_turn_active:
         game.add_log("⚠️ It's not your turn! Wait for AI players to finish their turns.")
         response = "Not your turn"
         
     elif command.startswith('suggest') and game.player_turn_active:
-        # Parse suggestion command: "suggest suspect with weapon in room"
-        # Handle multi-word names by looking for known game elements
-        game.add_log(f"DEBUG: Raw command: '{command}'")
+        # Parse suggestion command: "suggest suspect with weapon in room"; names
+        # may be multi-word, surnames or slightly misspelled (see web/commands.py)
         parts = command.split()
-        game.add_log(f"DEBUG: Parts: {parts}")
-        game.add_log(f"DEBUG: Length check: {len(parts)} >= 6 = {len(parts) >= 6}")
-        
-        if len(parts) >= 6 and parts[0] == 'suggest':
-            # Find the "with" and "in" keywords to parse properly
-            with_index = -1
-            in_index = -1
+        if len(parts) > 1 and parts[0] == 'suggest':
+            cards = parse_cards(command)
+            missing = [category for category in ('suspect', 'weapon', 'room') if category not in cards]
+            if missing:
+                game.add_log(f"Invalid suggestion format. Could not find a {' or '.join(missing)} in '{command}'.")
+                game.add_log("Please use: suggest [suspect] with [weapon] in [room]")
+                return {
+                    'response': "Invalid suggestion format",
+                    'player_turn': game.player_turn_active
+                }
+            suspect, weapon, room = cards['suspect'], cards['weapon'], cards['room']
             
-            for i, part in enumerate(parts):
-                if part == 'with':
-                    with_index = i
-                elif part == 'in':
-                    in_index = i
+            # Check if player is in the suggested room
+            game.add_log(f"DEBUG: Current location: '{game.game.current_location}', Suggested room: '{room}'")
+            if room != game.game.current_location:
+                game.add_log(f"You must be in the {room} to make a suggestion there!")
+                game.add_log(f"You are currently in: {game.game.current_location}")
+                return {
+                    'response': "Must be in suggested room",
+                    'player_turn': game.player_turn_active
+                }
             
-            if with_index > 1 and in_index > with_index + 1:
-                # Extract suspect (everything between "suggest" and "with")
-                suspect = " ".join(parts[1:with_index])
-                weapon = parts[with_index + 1]
-                room = " ".join(parts[in_index + 1:])
-                
-                # Validate extracted values
-                suspects = ["Miss Scarlet", "Col. Mustard", "Mrs. White", "Mr. Green", "Mrs. Peacock", "Prof. Plum"]
-                weapons = ["Candlestick", "Knife", "Lead Pipe", "Revolver", "Rope", "Wrench"]
-                rooms = ["Kitchen", "Ballroom", "Conservatory", "Billiard Room", "Library", "Study", "Hall", "Lounge", "Dining Room"]
-                
-                # Normalize room name (handle "the Kitchen" -> "Kitchen")
-                room = room.replace("the ", "").strip()
-                
-                # Case-insensitive validation
-                suspect_match = next((s for s in suspects if s.lower() == suspect.lower()), None)
-                weapon_match = next((w for w in weapons if w.lower() == weapon.lower()), None)
-                room_match = next((r for r in rooms if r.lower() == room.lower()), None)
-                
-                if suspect_match and weapon_match and room_match:
-                    # Use the properly cased versions
-                    suspect = suspect_match
-                    weapon = weapon_match
-                    room = room_match
-                    
-                    # Check if player is in the suggested room
-                    game.add_log(f"DEBUG: Current location: '{game.game.current_location}', Suggested room: '{room}'")
-                    if room != game.game.current_location:
-                        game.add_log(f"You must be in the {room} to make a suggestion there!")
-                        game.add_log(f"You are currently in: {game.game.current_location}")
-                        return jsonify({
-                            'output': game.get_display_output(),
-                            'response': "Must be in suggested room",
-                            'player_turn': game.player_turn_active
-                        })
-                    
-                    # Check if player already suggested this turn
-                    if game.player_suggested_this_turn:
-                        game.add_log("You can only make one suggestion per turn!")
-                        return jsonify({
-                            'output': game.get_display_output(),
-                            'response': "Already suggested this turn",
-                            'player_turn': game.player_turn_active
-                        })
-                    
-                    # Make the suggestion
-                    game.add_log(f"You suggest: {suspect} with {weapon} in {room}")
-                    game.player_suggested_this_turn = True
-                    
-                    # Check if AI can disprove
-                    suggestion_dict = {"suspect": suspect, "weapon": weapon, "room": room}
-                    for i in range(game.game.num_ai):
-                        if i != game.current_ai_index:
-                            disprove = game.game.check_ai_can_disprove(suggestion_dict, i)
-                            if disprove:
-                                ai_char = game.game.ai_characters[i]
-                                game.add_log(f"{ai_char} disproves with {disprove}")
-                                game.track_revealed_card(disprove, ai_char)
-                                break
-                    else:
-                        game.add_log("No one can disprove your suggestion")
-                    
-                    # Turn ends after suggestion
-                    game.player_turn_active = False
-                    game.player_suggested_this_turn = False
-                    game.add_log("Your turn has ended. AI players will now take their turns.")
-                    
-                    return jsonify({
-                        'output': game.get_display_output(),
-                        'response': "Suggestion made",
-                        'player_turn': game.player_turn_active
-                    })
-                else:
-                    game.add_log(f"Invalid suggestion format. Could not find '{room}' in valid rooms.")
-                    game.add_log(f"Valid rooms: {', '.join(rooms)}")
-                    return jsonify({
-                        'output': game.get_display_output(),
-                        'response': "Invalid suggestion format",
-                        'player_turn': game.player_turn_active
-                    })
-            else:
-                game.add_log("Invalid suggestion format. Please use: suggest [suspect] with [weapon] in [room]")
-                return jsonify({
-                    'output': game.get_display_output(),
-                    'response': "Invalid suggestion format",
+            # Check if player already suggested this turn
+            if game.player_suggested_this_turn:
+                game.add_log("You can only make one suggestion per turn!")
+                return {
+                    'response': "Already suggested this turn",
                     'player_turn': game.player_turn_active
-                })
+                }
+            
+            # Make the suggestion
+            game.add_log(f"You suggest: {suspect} with {weapon} in {room}")
+            game.add_event('suggested', seat=0, suspect=suspect, weapon=weapon, room=room)
+            game.player_suggested_this_turn = True
+            
+            # Check if AI can disprove
+            suggestion_dict = {"suspect": suspect, "weapon": weapon, "room": room}
+            passed = []  # Seats asked who couldn't disprove, in order
+            # AIs still playing are asked in seat order, starting with AI_1
+            for seat in game.game.turns.disproval_order(ClueEngine.HUMAN_SEAT):
+                disprove = game.game.check_ai_can_disprove(suggestion_dict, seat - 1)
+                if disprove:
+                    ai_char = game.game.ai_characters[seat - 1]
+                    game.add_log(f"{ai_char} disproves with {disprove}")
+                    game.add_event('disproved', seat=0, by=seat, card=disprove, passed=passed)
+                    game.track_revealed_card(disprove, ai_char)
+                    break
+                passed.append(seat)
+            else:
+                game.add_log("No one can disprove your suggestion")
+                game.add_event('not_disproved', seat=0, passed=passed)
+            
+            # Turn ends after suggestion
+            game.player_turn_active = False
+            game.player_suggested_this_turn = False
+            game.add_log("Your turn has ended. AI players will now take their turns.")
+            
+            return {
+                'response': "Suggestion made",
+                'player_turn': game.player_turn_active
+            }
         else:
             game.add_log("Make suggestion using the buttons above")
-            return jsonify({
-                'output': game.get_display_output(),
+            return {
                 'response': "Use suggestion interface",
                 'player_turn': game.player_turn_active
-            })
+            }
         
     elif command.startswith('accuse') and not game.player_turn_active:
         game.add_log("⚠️ It's not your turn! Wait for AI players to finish their turns.")
         response = "Not your turn"
         
     elif command.startswith('accuse') and game.player_turn_active:
-        # Parse accusation command: "accuse suspect with weapon in room"
-        # Handle multi-word names by finding the "with" and "in" keywords
+        # Parse accusation command: "accuse suspect with weapon in room", as for suggestions
         parts = command.split()
-        if len(parts) >= 6 and parts[0] == 'accuse':
-            # Find the "with" and "in" keywords to parse properly
-            with_index = -1
-            in_index = -1
+        if len(parts) > 1 and parts[0] == 'accuse':
+            cards = parse_cards(command)
+            missing = [category for category in ('suspect', 'weapon', 'room') if category not in cards]
+            if missing:
+                game.add_log(f"Could not parse accusation. Could not find a {' or '.join(missing)} in '{command}'.")
+                game.add_log("Please use: accuse [suspect] with [weapon] in [room]")
+                return {
+                    'response': "Invalid accusation format",
+                    'player_turn': game.player_turn_active
+                }
+            suspect, weapon, room = cards['suspect'], cards['weapon'], cards['room']
             
-            for i, part in enumerate(parts):
-                if part == 'with':
-                    with_index = i
-                elif part == 'in':
-                    in_index = i
+            # Make the accusation
+            game.add_log(f"You accuse: {suspect} with {weapon} in {room}")
             
-            if with_index > 1 and in_index > with_index + 1:
-                # Extract suspect (everything between "accuse" and "with")
-                suspect = " ".join(parts[1:with_index])
-                weapon = parts[with_index + 1]
-                room = " ".join(parts[in_index + 1:])
-                
-                # Validate extracted values
-                suspects = ["Miss Scarlet", "Col. Mustard", "Mrs. White", "Mr. Green", "Mrs. Peacock", "Prof. Plum"]
-                weapons = ["Candlestick", "Knife", "Lead Pipe", "Revolver", "Rope", "Wrench"]
-                rooms = ["Kitchen", "Ballroom", "Conservatory", "Billiard Room", "Library", "Study", "Hall", "Lounge", "Dining Room"]
-                
-                # Normalize room name (handle "the Kitchen" -> "Kitchen")
-                room = room.replace("the ", "").strip()
-                
-                # Case-insensitive validation
-                suspect_match = next((s for s in suspects if s.lower() == suspect.lower()), None)
-                weapon_match = next((w for w in weapons if w.lower() == weapon.lower()), None)
-                room_match = next((r for r in rooms if r.lower() == room.lower()), None)
-                
-                if suspect_match and weapon_match and room_match:
-                    # Use the properly cased versions
-                    suspect = suspect_match
-                    weapon = weapon_match
-                    room = room_match
-                    
-                    # Make the accusation
-                    game.add_log(f"You accuse: {suspect} with {weapon} in {room}")
-                    
-                    # Check if correct
-                    if (suspect == game.game.secret_envelope['suspect'] and 
-                        weapon == game.game.secret_envelope['weapon'] and 
-                        room == game.game.secret_envelope['room']):
-                        game.add_log(f"CORRECT! You solved the mystery!")
-                        game.add_log(f"The solution was: {game.game.secret_envelope}")
-                        game.player_turn_active = False  # Game over
-                        return jsonify({
-                            'output': game.get_display_output(),
-                            'response': "Game won!",
-                            'player_turn': game.player_turn_active
-                        })
-                    else:
-                        game.add_log(f"WRONG! The solution was: {game.game.secret_envelope}")
-                        game.add_log("You lose the game!")
-                        game.player_turn_active = False  # Game over
-                        return jsonify({
-                            'output': game.get_display_output(),
-                            'response': "Game lost!",
-                            'player_turn': game.player_turn_active
-                        })
-                else:
-                    game.add_log(f"Could not parse accusation. Found: suspect={suspect}, weapon={weapon}, room={room}")
-                    return jsonify({
-                        'output': game.get_display_output(),
-                        'response': "Invalid accusation format",
-                        'player_turn': game.player_turn_active
-                    })
+            # Check if correct
+            if (suspect == game.game.secret_envelope['suspect'] and 
+                weapon == game.game.secret_envelope['weapon'] and 
+                room == game.game.secret_envelope['room']):
+                game.add_log(f"CORRECT! You solved the mystery!")
+                game.add_log(f"The solution was: {game.game.secret_envelope}")
+                game.add_event('accused', seat=0, suspect=suspect, weapon=weapon, room=room, correct=True)
+                game.end_game(winner=0)
+                return {
+                    'response': "Game won!",
+                    'player_turn': game.player_turn_active
+                }
             else:
-                game.add_log("Invalid accusation format. Please use: accuse [suspect] with [weapon] in [room]")
-                return jsonify({
-                    'output': game.get_display_output(),
-                    'response': "Invalid accusation format",
+                game.add_log(f"WRONG! The solution was: {game.game.secret_envelope}")
+                game.add_log("You lose the game!")
+                game.add_event('accused', seat=0, suspect=suspect, weapon=weapon, room=room, correct=False)
+                game.end_game(winner=None)
+                return {
+                    'response': "Game lost!",
                     'player_turn': game.player_turn_active
-                })
+                }
         else:
             game.add_log("Make accusation using the buttons above")
-            return jsonify({
-                'output': game.get_display_output(),
+            return {
                 'response': "Use accusation interface",
                 'player_turn': game.player_turn_active
-            })
+            }
         
     elif command == 'map':
-        response = "Map shown"
-        map_str = f"""=== MANSION MAP ===<br>
-    <span style='color: #FF6347; font-family: monospace; font-weight: bold;'>KITCHEN</span> ----- <span style='color: #FF69B4; font-family: monospace; font-weight: bold;'>BALLROOM</span> ----- <span style='color: #98FB98; font-family: monospace; font-weight: bold;'>CONSERVATORY</span><br>
-        |           |              |<br>
-    <span style='color: #20B2AA; font-family: monospace; font-weight: bold;'>DINING RM</span> --- <span style='color: #DEB887; font-family: monospace; font-weight: bold;'>HALL</span> --------- <span style='color: #87CEEB; font-family: monospace; font-weight: bold;'>BILLIARD RM</span><br>
-        |           |              |<br>
-    <span style='color: #FFB6C1; font-family: monospace; font-weight: bold;'>LOUNGE</span> ------ <span style='color: #F0E68C; font-family: monospace; font-weight: bold;'>STUDY</span> -------- <span style='color: #DDA0DD; font-family: monospace; font-weight: bold;'>LIBRARY</span><br>
-<b>Current Locations:</b><br>
-You (<span style='color: #00FF00;'>{game.game.player_character}</span>): <span style='color: #DEB887;'>{game.game.current_location}</span><br>
-"""
-        for i, loc in enumerate(game.game.ai_locations):
-            ai_number = i + 1
-            map_str += f"<span style='color: #FF4500;'>{game.game.ai_characters[i]}</span> (<span style='color: #FF4500; font-weight: bold;'>AI_{ai_number}</span>): {loc}<br>"
-        return jsonify({
-            'output': map_str,
-            'response': response,
+        return {
+            'view': 'map',
+            'response': "Map shown",
             'player_turn': game.player_turn_active,
             'location': game.game.current_location
-        })
+        }
         
     elif command == 'rules':
-        response = "Rules shown"
-        rules_str = """
-=== CLUE GAME RULES ===
-
-[bold]OBJECTIVE:[/]
-Determine who committed the murder, with what weapon, and in which room.
-
-[bold]ORDER OF OPERATIONS (Game Flow):[/]
-1. YOUR TURN: Choose ONE action per turn
-   • Move to an adjacent room (see map for connections)
-   • Make a suggestion (only if in a room, one per turn)
-   • Make final accusation (ends game if wrong!)
-
-   ⚠️ **IMPORTANT**: You can ONLY do ONE action per turn - no moving and suggesting in the same turn!
-
-2. IMPORTANT: After you take any action, your turn ends and AI players take their turns
-
-3. MOVEMENT RULES:
-   • You can only move to connected rooms shown on the map
-   • Each room connects to 2-3 other rooms
-   • Use 'move' command to see available options
-
-4. SUGGESTION RULES:
-   • Must be in the room you're suggesting
-   • Only one suggestion per turn
-   • Format: "suggest [suspect] with [weapon] in [room]"
-   • Only ONE card is needed to disprove (any matching card)
-
-5. AI TURNS:
-   • Press SPACE to advance through AI turns
-   • AIs will move and make suggestions automatically
-   • You may need to disprove AI suggestions
-
-6. WINNING:
-   • Make correct final accusation to win
-   • Wrong accusation = you lose immediately!
-   • Use process of elimination to deduce solution
-
-[bold]STRATEGY TIPS:[/]
-• Use 'notebook' to track your cards and revealed cards
-• Auto-tracking marks cards when they're revealed (toggle with 'toggle_autotrack')
-• Watch other players' suggestions carefully
-• The solution cards are never in any player's hand
-• Only suggest rooms you're currently in
-
-[bold]COMMANDS:[/]
-• move - See available rooms to move to
-• move to [room] - Move to a specific room
-• suggest [suspect] [weapon] [room] - Make suggestion
-• accuse [suspect] [weapon] [room] - Make final accusation
-• map - View mansion map and locations
-• notebook - View your cards and revealed cards
-• players - See all players and locations
-• rules - Show these rules
-• toggle_autotrack - Enable/disable auto-tracking
-"""
-        return jsonify({
-            'output': rules_str,
-            'response': response,
+        return {
+            'view': 'rules',
+            'response': "Rules shown",
             'player_turn': game.player_turn_active
-        })
-        
-    elif command == 'notebook':
-        response = "Notebook shown"
-        
-        suspect_colors = {
-            "Miss Scarlet": "#FF1493", "Col. Mustard": "#FFD700", "Mrs. White": "#F0F8FF",
-            "Mr. Green": "#32CD32", "Mrs. Peacock": "#4169E1", "Prof. Plum": "#9370DB"
-        }
-        weapon_colors = {
-            "Candlestick": "#FFA500", "Knife": "#C0C0C0", "Lead Pipe": "#708090",
-            "Revolver": "#8B4513", "Rope": "#D2691E", "Wrench": "#696969"
-        }
-        room_colors = {
-            "Kitchen": "#FF6347", "Ballroom": "#FF69B4", "Conservatory": "#98FB98",
-            "Billiard Room": "#87CEEB", "Library": "#DDA0DD", "Study": "#F0E68C",
-            "Hall": "#DEB887", "Lounge": "#FFB6C1", "Dining Room": "#20B2AA"
         }
         
-        cards_str = """
-<style>
-.checklist-table {
-    width: 100%;
-    border-collapse: collapse;
-    margin: 10px 0;
-}
-.checklist-table th {
-    background: #1a1a2e;
-    color: #00FF00;
-    padding: 8px;
-    text-align: left;
-    border: 1px solid #444;
-}
-.checklist-table td {
-    padding: 5px;
-    border: 1px solid #444;
-}
-.checklist-checkbox {
-    margin-right: 8px;
-}
-.card-name {
-    font-weight: bold;
-}
-.status-in-hand {
-    color: #00FF00;
-}
-.status-revealed {
-    color: #FF6347;
-    text-decoration: line-through;
-}
-.status-unknown {
-    color: #FFFFFF;
-}
-</style>
-
-<b>DETECTIVE'S CHECKLIST</b><br><br>
-
-<b>SUSPECTS:</b><br>
-<table class="checklist-table">
-<tr><th>Status</th><th>Suspect</th></tr>
-"""
-        
-        # Add suspects
-        for suspect in game.game.SUSPECTS:
-            if suspect in game.game.player_hand:
-                status = "in_hand"
-                status_text = "✓ In Hand"
-                checkbox = "checked disabled"
-            elif suspect in game.revealed_cards:
-                status = "revealed"
-                status_text = "✗ Revealed"
-                checkbox = "checked disabled"
-            else:
-                status = "unknown"
-                status_text = "? Unknown"
-                checkbox = ""
-            
-            color = suspect_colors.get(suspect, "#FFFFFF")
-            cards_str += f"""
-<tr>
-    <td><span class="status-{status}">{status_text}</span></td>
-    <td><span class="card-name" style="color: {color};">{suspect}</span></td>
-</tr>
-"""
-        
-        cards_str += "</table><br><b>WEAPONS:</b><br><table class=\"checklist-table\"><tr><th>Status</th><th>Weapon</th></tr>"
-        
-        # Add weapons
-        for weapon in game.game.WEAPONS:
-            if weapon in game.game.player_hand:
-                status = "in_hand"
-                status_text = "✓ In Hand"
-                checkbox = "checked disabled"
-            elif weapon in game.revealed_cards:
-                status = "revealed"
-                status_text = "✗ Revealed"
-                checkbox = "checked disabled"
-            else:
-                status = "unknown"
-                status_text = "? Unknown"
-                checkbox = ""
-            
-            color = weapon_colors.get(weapon, "#FFFFFF")
-            cards_str += f"""
-<tr>
-    <td><span class="status-{status}">{status_text}</span></td>
-    <td><span class="card-name" style="color: {color};">{weapon}</span></td>
-</tr>
-"""
-        
-        cards_str += "</table><br><b>ROOMS:</b><br><table class=\"checklist-table\"><tr><th>Status</th><th>Room</th></tr>"
-        
-        # Add rooms
-        for room in game.game.ROOMS:
-            if room in game.game.player_hand:
-                status = "in_hand"
-                status_text = "✓ In Hand"
-                checkbox = "checked disabled"
-            elif room in game.revealed_cards:
-                status = "revealed"
-                status_text = "✗ Revealed"
-                checkbox = "checked disabled"
-            else:
-                status = "unknown"
-                status_text = "? Unknown"
-                checkbox = ""
-            
-            color = room_colors.get(room, "#FFFFFF")
-            cards_str += f"""
-<tr>
-    <td><span class="status-{status}">{status_text}</span></td>
-    <td><span class="card-name" style="color: {color};">{room}</span></td>
-</tr>
-"""
-        
-        cards_str += "</table><br>"
-        cards_str += f"<b>Auto-tracking: {'ON' if game.auto_track_notebook else 'OFF'}</b><br>"
-        cards_str += "Use 'toggle_autotrack' to enable/disable"
-        
-        return jsonify({
-            'output': cards_str,
-            'response': response,
+    elif command == 'notebook':
+        return {
+            'view': 'notebook',
+            'response': "Notebook shown",
             'player_turn': game.player_turn_active
-        })
+        }
         
     elif command == 'toggle_autotrack':
         game.auto_track_notebook = not game.auto_track_notebook
@@ -719,31 +860,11 @@ Determine who committed the murder, with what weapon, and in which room.
         response = f"Auto-tracking {status}"
         
     elif command == 'players':
-        response = "Players shown"
-        players_str = f"""
-<b>Game Players:</b><br>
-<br>
-<span style='color: #00FF00; font-weight: bold;'>You ({game.game.player_character})</span><br>
-  Character: {game.game.player_character}<br>
-  Location: {game.game.current_location}<br>
-  Cards: {len(game.game.player_hand)} cards<br>
-<br>
-"""
-        suspect_colors = {
-            "Miss Scarlet": "#FF1493", "Col. Mustard": "#FFD700", "Mrs. White": "#F0F8FF",
-            "Mr. Green": "#32CD32", "Mrs. Peacock": "#4169E1", "Prof. Plum": "#9370DB"
-        }
-        
-        for i, (char, loc) in enumerate(zip(game.game.ai_characters, game.game.ai_locations)):
-            color = suspect_colors.get(char, "#FF4500")
-            ai_number = i + 1
-            players_str += f"<span style='color: {color}; font-weight: bold;'>{char}</span> (<span style='color: #FF4500; font-weight: bold;'>AI_{ai_number}</span>)<br>"
-            players_str += f"  Location: {loc}<br>"
-        return jsonify({
-            'output': players_str,
-            'response': response,
+        return {
+            'view': 'players',
+            'response': "Players shown",
             'player_turn': game.player_turn_active
-        })
+        }
         
     elif command.startswith('disprove') and hasattr(game, 'waiting_for_disproval') and game.waiting_for_disproval:
         # Player is choosing which card to show for disproval
@@ -751,9 +872,14 @@ Determine who committed the murder, with what weapon, and in which room.
         game.add_log(f"Received card '{card}'")
         game.add_log(f"Available cards: {game.pending_disproval_cards}")
         
-        if card.lower() in [c.lower() for c in game.pending_disproval_cards]:
+        chosen = (next((c for c in game.pending_disproval_cards if c.lower() == card.lower()), None)
+                  or match_card(card))
+        if chosen in game.pending_disproval_cards:
             # Player chose a valid card
+            card = chosen
+            game.game.record_suggestion_result(game.current_ai_index, game.pending_suggestion, card)
             game.add_log(f"You disprove with {card}")
+            game.add_event('disproved', seat=game.current_ai_index + 1, by=0, card=card, passed=[])
             game.add_log(f"{game.pending_suggestion['player']}'s suggestion was disproven")
             
             # Clear pending state
@@ -762,12 +888,11 @@ Determine who committed the murder, with what weapon, and in which room.
             game.pending_disproval_cards = None
             
             # Continue with AI turn
-            game.current_ai_index += 1
-            if game.current_ai_index >= game.game.num_ai:
-                game.current_ai_index = 0
+            if game.pass_turn():
                 game.player_turn_active = True
                 game.add_log("Your turn!")
                 game.add_log("💡 Remember: You can only take ONE action this turn (move, suggest, or accuse).")
+                game.add_event('turn_started', seat=0)
             
             response = "Disproval completed"
         else:
@@ -775,18 +900,33 @@ Determine who committed the murder, with what weapon, and in which room.
             response = "Invalid card choice"
         
     elif command == 'space' and not game.player_turn_active and not (hasattr(game, 'waiting_for_disproval') and game.waiting_for_disproval):
+        if game.current_ai_index + 1 not in game.game.turns:
+            # Every AI is out of the game: you play on alone
+            game.player_turn_active = True
+            game.player_suggested_this_turn = False
+            game.add_log("Your turn!")
+            game.add_event('turn_started', seat=0)
+            return {
+                'response': "No AI players left",
+                'player_turn': game.player_turn_active,
+                'location': game.game.current_location
+            }
+        
         # AI turn
         ai_char = game.game.ai_characters[game.current_ai_index]
         ai_number = game.current_ai_index + 1
-        # AI chooses between move and suggest (50/50 chance)
-        if random.random() < 0.5:
+        # AI strategy chooses between move and suggest
+        if game.game.choose_ai_action(game.current_ai_index) == "move":
             # AI moves
             new_loc = game.game.get_ai_move(game.current_ai_index)
             game.add_log(f"{ai_char} (AI_{ai_number}) moved to {new_loc}")
+            game.add_event('moved', seat=ai_number, room=new_loc)
         else:
             # AI suggests
             suggestion = game.game.make_ai_suggestion(game.current_ai_index)
             game.add_log(f"{suggestion['player']} suggests: {suggestion['suspect']} with {suggestion['weapon']} in {suggestion['room']}")
+            game.add_event('suggested', seat=ai_number, suspect=suggestion['suspect'],
+                           weapon=suggestion['weapon'], room=suggestion['room'])
             
             # Check if other players can disprove (starting with player, then other AIs)
             disproven = False
@@ -812,50 +952,44 @@ Determine who committed the murder, with what weapon, and in which room.
                 game.pending_suggestion = suggestion
                 game.pending_disproval_cards = player_cards
                 game.waiting_for_disproval = True
-                return jsonify({
-                    'output': game.get_display_output(),
+                game.add_event('disproval_required', seat=ai_number, cards=player_cards)
+                return {
                     'response': "Waiting for disproval choice",
                     'player_turn': False,  # Still AI's turn, but waiting for player
                     'waiting_for_disproval': True,
                     'suggestion': suggestion,
                     'available_cards': player_cards
-                })
+                }
             else:
                 game.add_log("You cannot disprove - checking other AIs...")
-                # Check other AIs (in order starting from next AI)
-                for i in range(1, game.game.num_ai + 1):
-                    ai_to_check = (game.current_ai_index + i) % game.game.num_ai
-                    if ai_to_check != game.current_ai_index:
-                        ai_to_check_number = ai_to_check + 1
+                passed = [0]  # Seats asked who couldn't disprove, in order
+                # Check other AIs still playing, in seat order from the next one
+                for ai_to_check_number in game.game.turns.disproval_order(ai_number):
+                    if ai_to_check_number != ClueEngine.HUMAN_SEAT:
+                        ai_to_check = ai_to_check_number - 1
                         disproving_card = game.game.check_ai_can_disprove(suggestion, ai_to_check)
                         if disproving_card:
                             disproving_player = game.game.ai_characters[ai_to_check]
                             disproven = True
                             game.add_log(f"{disproving_player} (AI_{ai_to_check_number}) disproves with {disproving_card}")
+                            game.add_event('disproved', seat=ai_number, by=ai_to_check_number, card=disproving_card,
+                                           passed=passed)
                             game.track_revealed_card(disproving_card, disproving_player)
                             break
                         else:
                             game.add_log(f"{game.game.ai_characters[ai_to_check]} (AI_{ai_to_check_number}) cannot disprove")
+                            passed.append(ai_to_check_number)
             
+            game.game.record_suggestion_result(game.current_ai_index, suggestion, disproving_card)
             if not disproven:
                 game.add_log("No one can disprove the suggestion")
+                game.add_event('not_disproved', seat=ai_number, passed=passed)
         
-        # AI accusation (rare, makes game more interesting)
-        if random.random() < 0.1:  # 10% chance to make accusation
+        # AI accusation, when its strategy decides to make one
+        accusation = game.game.make_ai_accusation(game.current_ai_index)
+        if accusation:
             ai_char = game.game.ai_characters[game.current_ai_index]
             ai_number = game.current_ai_index + 1
-            # AI makes random accusation (simple strategy)
-            ai_hand = game.game.ai_hands[game.current_ai_index]
-            possible_suspects = [s for s in game.game.SUSPECTS if s not in ai_hand]
-            possible_weapons = [w for w in game.game.WEAPONS if w not in ai_hand]
-            possible_rooms = [r for r in game.game.ROOMS if r not in ai_hand]
-            
-            accusation = {
-                'suspect': random.choice(possible_suspects) if possible_suspects else random.choice(game.game.SUSPECTS),
-                'weapon': random.choice(possible_weapons) if possible_weapons else random.choice(game.game.WEAPONS),
-                'room': random.choice(possible_rooms) if possible_rooms else random.choice(game.game.ROOMS),
-                'player': ai_char
-            }
             
             game.add_log(f"{ai_char} (AI_{ai_number}) makes final accusation: {accusation['suspect']} with {accusation['weapon']} in {accusation['room']}")
             
@@ -866,25 +1000,34 @@ Determine who committed the murder, with what weapon, and in which room.
                 game.add_log(f"CORRECT! {ai_char} (AI_{ai_number}) solved the mystery!")
                 game.add_log(f"The solution was: {game.game.secret_envelope}")
                 game.add_log("You lose - AI won the game!")
-                game.player_turn_active = False  # Game over
+                game.add_event('accused', seat=ai_number, suspect=accusation['suspect'],
+                               weapon=accusation['weapon'], room=accusation['room'], correct=True)
+                game.end_game(winner=ai_number)
+                return {
+                    'response': "AI turn completed",
+                    'player_turn': game.player_turn_active,
+                    'location': game.game.current_location
+                }
             else:
                 game.add_log(f"WRONG! {ai_char} (AI_{ai_number})'s accusation was incorrect")
                 game.add_log(f"{ai_char} (AI_{ai_number}) is out of the game!")
+                game.add_event('accused', seat=ai_number, suspect=accusation['suspect'],
+                               weapon=accusation['weapon'], room=accusation['room'], correct=False)
                 # Reveal all cards of the eliminated AI to other players
                 eliminated_hand = game.game.ai_hands[game.current_ai_index]
                 game.add_log(f"{ai_char}'s cards are revealed: {', '.join(eliminated_hand)}")
                 # Mark all cards as revealed for notebook tracking
                 for card in eliminated_hand:
                     game.track_revealed_card(card, f"{ai_char} (eliminated)")
-                # Remove this AI from future turns
-                game.game.ai_characters[game.current_ai_index] = None
+                game.add_event('eliminated', seat=ai_number, cards=list(eliminated_hand))
+                # Remove this AI from future turns and disprovals
+                game.game.eliminate_ai(game.current_ai_index)
         
-        game.current_ai_index += 1
-        if game.current_ai_index >= game.game.num_ai:
-            game.current_ai_index = 0
+        if game.pass_turn():
             game.player_turn_active = True
             game.player_suggested_this_turn = False
             game.add_log("Your turn!")
+            game.add_event('turn_started', seat=0)
         
         response = "AI turn completed"
         
@@ -897,14 +1040,43 @@ Determine who committed the murder, with what weapon, and in which room.
             game.add_log("Empty command - type 'help' for available commands")
         response = "Unknown command"
     
-    return jsonify({
-        'output': game.get_display_output(),
+    return {
         'response': response,
         'player_turn': game.player_turn_active,
         'location': game.game.current_location
-    })
+    }
+
+@bp.route('/api/batch', methods=['POST'])
+def handle_batch():
+    """Run an ordered list of commands for one game and return one final display."""
+    data = request.get_json()
+    game_id = data.get('game_id')
+    commands = data.get('commands')
+    
+    if not isinstance(commands, list) or not commands:
+        return encode_response({'error': 'commands must be a non-empty list'}, 400)
+    if len(commands) > MAX_BATCH_COMMANDS:
+        return encode_response({'error': f'At most {MAX_BATCH_COMMANDS} commands per batch'}, 400)
+    
+    game = games.get(game_id)
+    if game is None:
+        return encode_response({'error': 'Game not found'}, 404)
+    
+    commands = [str(command).lower().strip() for command in commands]
+    with game.lock:
+        results, stopped = run_batch(game, commands)
+        payload = {
+            'results': results,
+            'completed': len(results),
+            'stopped': stopped,
+            'output': game.get_display_output(),
+            'player_turn': game.player_turn_active,
+            'location': game.game.current_location,
+            'waiting_for_disproval': getattr(game, 'waiting_for_disproval', False)
+        }
+    return encode_response(payload)
 
-@app.route('/api/save_game', methods=['POST'])
+@bp.route('/api/save_game', methods=['POST'])
 def save_game():
     """Save game state."""
     data = request.get_json()
@@ -913,19 +1085,51 @@ def save_game():
     if game_id in games:
         game = games[game_id]
         # In production, save to database
-        return jsonify({
+        with game.lock:
+            replay = game.get_replay_record()
+        return encode_response({
             'saved': True,
             'game_id': game_id,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': datetime.now().isoformat(),
+            'replay': replay
         })
     
-    return jsonify({'error': 'Game not found'}), 404
+    return encode_response({'error': 'Game not found'}, 404)
 
-@app.route('/api/list_games', methods=['GET'])
+@bp.route('/api/replay', methods=['POST'])
+def replay_game():
+    """Start a new game that replays a saved replay record exactly."""
+    data = request.get_json(silent=True) or {}
+    record = data.get('replay')
+    
+    error = replay_record_error(record)
+    if error:
+        return encode_response({'error': error}, 400)
+    
+    game_id = new_game_id()
+    game = WebClueGame.replay(game_id, {
+        'seed': record['seed'],
+        'num_ai': record.get('num_ai', 2),
+        'difficulty': record.get('difficulty', 'Medium'),
+        'commands': record.get('commands', []),
+        'search_iterations': record.get('search_iterations', [])
+    })
+    games[game_id] = game
+    
+    return encode_response({
+        'game_id': game_id,
+        'version': game.version,
+        'output': game.get_display_output(),
+        'player_turn': game.player_turn_active,
+        'location': game.game.current_location
+    })
+
+@bp.route('/api/list_games', methods=['GET'])
 def list_games():
     """List all active games with versions."""
     game_list = []
-    for game_id, game in games.items():
+    # Snapshot the items so games created concurrently can't break iteration
+    for game_id, game in list(games.items()):
         game_list.append({
             'game_id': game_id,
             'version': game.version,
@@ -934,7 +1138,150 @@ def list_games():
             'player_character': game.game.player_character
         })
     
-    return jsonify({'games': game_list})
+    return encode_response({'games': game_list})
+
+VIEW_RENDERERS = {
+    'map': WebClueGame.get_map_output,
+    'rules': lambda game: RULES_TEXT,
+    'notebook': WebClueGame.get_notebook_output,
+    'players': WebClueGame.get_players_output,
+}
+
+@bp.route('/api/complete', methods=['GET'])
+def complete_command():
+    """Typeahead: whole commands that finish ``?q=``, at most ``?limit=`` of them."""
+    try:
+        limit = min(max(1, int(request.args.get('limit', 10))), 50)
+    except ValueError:
+        limit = 10
+    query = request.args.get('q', '')[:MAX_COMPLETE_LENGTH]
+    return encode_response({'q': query, 'completions': complete(query, limit)})
+
+def queue_analysis(game):
+    """Start analysing a finished game in the background; returns the job's state, or None if off."""
+    queue = current_app.extensions.get('clue_analysis') if has_app_context() else None
+    if queue is None:
+        return None
+    # The newest event is the game_over one, a new object each time the game ends (undo can
+    # end it again differently in as many events) and the same one for as long as it stands
+    return queue.submit(game.game_id, game.events[-1], game.get_analysis_input())
+
+@bp.route('/api/analysis/<game_id>', methods=['GET'])
+def get_analysis(game_id):
+    """Post-game analysis of a finished game: 202 while it runs, or wait up to ``?wait=`` seconds."""
+    queue = current_app.extensions.get('clue_analysis')
+    if queue is None:
+        return encode_response({'error': 'Analysis is off'}, 404)
+    game = games.get(game_id)
+    if game is not None:
+        with game.lock:
+            if not game.game_over:
+                return encode_response({'error': 'Game is not over'}, 409)
+            # Queues it again if it was evicted, failed or the game changed since
+            state = queue_analysis(game)
+        if state == 'rejected':
+            response = encode_response({'error': 'Analysis queue is full', 'reason': 'analysis'}, 503)
+            response.headers['Retry-After'] = '1'
+            return response
+    try:
+        wait = min(max(0.0, float(request.args.get('wait', 0))), MAX_ANALYSIS_WAIT)
+    except ValueError:
+        wait = 0.0
+    state, analysis = queue.result(game_id, wait)
+    if state is None:
+        return encode_response({'error': 'Game not found'}, 404)
+    if state == 'failed':
+        return encode_response({'game_id': game_id, 'status': state, 'error': 'Analysis failed'}, 500)
+    if state == 'pending':
+        response = encode_response({'game_id': game_id, 'status': state}, 202)
+        response.headers['Retry-After'] = '1'
+        return response
+    return encode_response({'game_id': game_id, 'status': state, 'analysis': analysis})
+
+@bp.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Operational counters: admission decisions, game pool, game count, spectator streams, routing and analysis."""
+    pool = current_app.extensions.get('clue_game_pool')
+    analysis = current_app.extensions.get('clue_analysis')
+    return encode_response({
+        'games': len(games),
+        'games_evicted': dict(games.evicted),
+        'spectator_streams': spectate.stream_count(),
+        'admission': admission_metrics(),
+        'game_pool': pool.metrics() if pool is not None else None,
+        'routing': routing_metrics(),
+        'analysis': analysis.metrics() if analysis is not None else None
+    })
+
+def create_app(config=None):
+    """Build the Flask app and do all one-time precomputation up front.
+
+    Gunicorn should load this with ``--preload`` so the tables above and the
+    rendered page are built once in the master and shared by forked workers.
+    ``config`` overrides app.config, e.g. ``{'CLUE_ADMISSION': False}`` for
+    in-process load tests that would otherwise be rate limited.
+    """
+    # Imported here because the JSON API builds on the routes above
+    from web.api_v2 import bp as api_v2_bp
+    
+    app = Flask(__name__, template_folder='../templates')
+    app.secret_key = 'clue-game-secret-key'
+    app.config.update({
+        'CLUE_ADMISSION': True,
+        'CLUE_RATE_LIMITS': None,  # {'client'|'create'|'game': (per_second, burst)}
+        'CLUE_MAX_IN_FLIGHT': DEFAULT_MAX_IN_FLIGHT,
+        # Reverse proxies in front that append to X-Forwarded-For (0: clients connect directly)
+        'CLUE_PROXY_HOPS': int(os.environ.get('CLUE_PROXY_HOPS', '0')),
+        # Pre-dealt games for new-game requests, see web/pool.py. Off by default: dealing
+        # takes about a millisecond, and bench_new_game.py shows no gain from the pool
+        'CLUE_GAME_POOL': os.environ.get('CLUE_GAME_POOL') == '1',
+        'CLUE_MAX_GAMES': DEFAULT_MAX_GAMES,
+        'CLUE_GAME_IDLE_SECONDS': DEFAULT_IDLE_SECONDS,
+        # Consistent-hash routing between nodes, see web/routing.py
+        'CLUE_ROUTING_NODES': os.environ.get('CLUE_ROUTING_NODES', ''),  # Node URLs, comma-separated
+        'CLUE_ROUTING_SELF': os.environ.get('CLUE_ROUTING_SELF', ''),    # This node's URL
+        'CLUE_ROUTING_KEY': os.environ.get('CLUE_ROUTING_KEY', ''),
+        # Post-game analysis in background processes, see web/jobs.py
+        'CLUE_ANALYSIS': os.environ.get('CLUE_ANALYSIS', '1') != '0',
+        'CLUE_ANALYSIS_WORKERS': int(os.environ.get('CLUE_ANALYSIS_WORKERS', DEFAULT_WORKERS)),
+    })
+    app.config.update(config or {})
+    app.register_blueprint(bp)
+    app.register_blueprint(api_v2_bp)
+    if app.config['CLUE_PROXY_HOPS']:
+        # request.remote_addr becomes the address our own proxies saw, taken from the
+        # right of X-Forwarded-For, so clients can't choose their rate-limit key
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['CLUE_PROXY_HOPS'])
+    games.configure(max_games=app.config['CLUE_MAX_GAMES'], idle_seconds=app.config['CLUE_GAME_IDLE_SECONDS'])
+    
+    if app.config['CLUE_ADMISSION']:
+        AdmissionControl(
+            limits=app.config['CLUE_RATE_LIMITS'],
+            max_in_flight=app.config['CLUE_MAX_IN_FLIGHT']
+        ).init_app(app)
+    
+    nodes = app.config['CLUE_ROUTING_NODES']
+    if isinstance(nodes, str):
+        nodes = [node.strip() for node in nodes.split(',') if node.strip()]
+    if nodes:
+        Router(app.config['CLUE_ROUTING_SELF'], nodes, app.config['CLUE_ROUTING_KEY']).init_app(app)
+    
+    if app.config['CLUE_GAME_POOL']:
+        app.extensions['clue_game_pool'] = GamePool(
+            lambda num_ai, difficulty, seed: WebClueGame(None, num_ai=num_ai, difficulty=difficulty, seed=seed))
+    
+    if app.config['CLUE_ANALYSIS']:
+        app.extensions['clue_analysis'] = JobQueue(analyze_game, workers=app.config['CLUE_ANALYSIS_WORKERS'],
+                                                   max_results=min(MAX_RESULTS, app.config['CLUE_MAX_GAMES']))
+    games.on_evict = partial(evicted, app.extensions.get('clue_analysis'))
+    
+    # Compile and render the static page now rather than on first request
+    with app.app_context():
+        app.extensions['clue_index_html'] = render_template('game.html')
+    
+    return app
+
+app = create_app()
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)